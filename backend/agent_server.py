@@ -1,8 +1,12 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Dict, List, Optional
-from agents import TransactionData, BehavioralData, process_transaction
+import agents
+from agents import TransactionData, BehavioralData, aprocess_transaction
+from feature_store import FEATURE_STORE_RECENT_TRANSACTIONS, AccountFeatureStore
+from window_features import BEHAVIOR_FEATURE_WINDOW, serving_window_store
+from metrics import REGISTRY, CONTENT_TYPE, MetricsMiddleware
 import os
 from dotenv import load_dotenv
 
@@ -16,6 +20,12 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Per-account behavioral aggregates for requests that send an account_id; a retried
+# transaction_id gets its first features back instead of being counted twice
+feature_store = AccountFeatureStore(recent_transactions=FEATURE_STORE_RECENT_TRANSACTIONS)
+# With BEHAVIOR_FEATURE_WINDOW set, the behavioral features cover that many steps instead
+window_store = serving_window_store()
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -33,6 +43,7 @@ class TransactionRequest(BaseModel):
     oldbalanceDest: float
     newbalanceDest: float
     transaction_type: Optional[str] = None
+    step: Optional[int] = None  # Required with account_id when BEHAVIOR_FEATURE_WINDOW is set
 
 class BehavioralRequest(BaseModel):
     avg_transaction_amount: float
@@ -49,19 +60,59 @@ class BehavioralRequest(BaseModel):
 
 class AgentRequest(BaseModel):
     transaction: TransactionRequest
-    behavioral: BehavioralRequest
+    # Either client-computed behavioral features or the account (nameOrig) to compute them for
+    behavioral: Optional[BehavioralRequest] = None
+    account_id: Optional[str] = None
+    # Identifies retries of the same transaction; without it every request is a new transaction
+    transaction_id: Optional[str] = None
+    include_messages: bool = True  # Set to False to skip the agent message transcript
+    execution_mode: Optional[str] = None  # "sequential" or "parallel"; defaults to EXECUTION_MODE
+
+@app.on_event("startup")
+async def startup_event():
+    # Compile the fraud detection graph once, before the first request
+    agents.get_fraud_detection_graph(use_async=True)
+    # In local mode the models live in this process; load them before serving
+    if agents.MODEL_BACKEND == "local":
+        agents.get_local_models()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await agents.close_async_http_client()
 
 @app.get("/")
 async def root():
     return {
         "message": "Fraud Detection Agent API",
         "available_endpoints": [
-            "/process_transaction"
+            "/process_transaction",
+            "/admin/cache",
+            "/metrics"
         ]
     }
 
+@app.get("/metrics")
+async def metrics():
+    # In local mode the prediction API's stage metrics are in the same registry
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+def check_admin_token(token: Optional[str]):
+    # Same token as the prediction API's admin routes
+    if agents.API_ADMIN_TOKEN and token != agents.API_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@app.get("/admin/cache")
+async def admin_cache(x_admin_token: Optional[str] = Header(default=None)):
+    check_admin_token(x_admin_token)
+    return agents.decision_cache_stats()
+
 @app.post("/process_transaction")
 async def process_transaction_endpoint(request: AgentRequest):
+    if request.behavioral is None and request.account_id is None:
+        raise HTTPException(status_code=422, detail="Either behavioral or account_id is required")
+    if window_store is not None and request.account_id is not None and request.transaction.step is None:
+        raise HTTPException(status_code=422, detail="transaction.step is required for windowed behavioral features")
+    
     try:
         # Convert request data to TransactionData and BehavioralData
         transaction_data = TransactionData(
@@ -73,29 +124,48 @@ async def process_transaction_endpoint(request: AgentRequest):
             transaction_type=request.transaction.transaction_type
         )
 
-        behavioral_data = BehavioralData(
-            avg_transaction_amount=request.behavioral.avg_transaction_amount,
-            max_transaction_amount=request.behavioral.max_transaction_amount,
-            transaction_amount_std=request.behavioral.transaction_amount_std,
-            avg_balance=request.behavioral.avg_balance,
-            transaction_count=request.behavioral.transaction_count,
-            large_transaction_ratio=request.behavioral.large_transaction_ratio,
-            balance_change_mean=request.behavioral.balance_change_mean,
-            type_CASH_OUT_ratio=request.behavioral.type_CASH_OUT_ratio,
-            type_DEBIT_ratio=request.behavioral.type_DEBIT_ratio,
-            type_PAYMENT_ratio=request.behavioral.type_PAYMENT_ratio,
-            type_TRANSFER_ratio=request.behavioral.type_TRANSFER_ratio
-        )
+        # Every transaction with an account id goes into that account's history
+        if request.account_id is not None and window_store is not None:
+            account_features = window_store.observe(request.account_id, request.transaction.model_dump(),
+                                                    request.transaction_id)[BEHAVIOR_FEATURE_WINDOW]
+        elif request.account_id is not None:
+            account_features = feature_store.observe(request.account_id, request.transaction.model_dump(),
+                                                     request.transaction_id)
+        
+        if request.behavioral is None:
+            behavioral_data = BehavioralData(**account_features)
+        else:
+            behavioral_data = BehavioralData(
+                avg_transaction_amount=request.behavioral.avg_transaction_amount,
+                max_transaction_amount=request.behavioral.max_transaction_amount,
+                transaction_amount_std=request.behavioral.transaction_amount_std,
+                avg_balance=request.behavioral.avg_balance,
+                transaction_count=request.behavioral.transaction_count,
+                large_transaction_ratio=request.behavioral.large_transaction_ratio,
+                balance_change_mean=request.behavioral.balance_change_mean,
+                type_CASH_OUT_ratio=request.behavioral.type_CASH_OUT_ratio,
+                type_DEBIT_ratio=request.behavioral.type_DEBIT_ratio,
+                type_PAYMENT_ratio=request.behavioral.type_PAYMENT_ratio,
+                type_TRANSFER_ratio=request.behavioral.type_TRANSFER_ratio
+            )
 
-        # Process the transaction
-        result = process_transaction(transaction_data, behavioral_data)
+        # Process the transaction without blocking the event loop
+        result = await aprocess_transaction(
+            transaction_data, behavioral_data,
+            include_messages=request.include_messages,
+            execution_mode=request.execution_mode
+        )
         
         return result
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing transaction: {str(e)}")
 
+# Request counts and latency per route, around everything above
+app.add_middleware(MetricsMiddleware, routes=[route.path for route in app.routes], prefix="fraudshield_agent")
+
 if __name__ == "__main__":
+    # One process; serve.py runs several pre-forked workers
     import uvicorn
     uvicorn.run(
         app,
@@ -1,23 +1,25 @@
-from langchain.agents import Tool, AgentExecutor, LLMSingleActionAgent
-from langchain.prompts import StringPromptTemplate
-from langchain_groq import ChatGroq
-from langchain.schema import AgentAction, AgentFinish, BaseMessage, HumanMessage, AIMessage
-from langchain.chains import LLMChain
-from langchain.agents import AgentOutputParser
-from typing import List, Union, Dict, TypedDict, Annotated, Sequence
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
+from typing import List, Union, Dict, Optional, TypedDict, Annotated, Sequence
 import requests
-import json
-from pydantic import BaseModel, Field
+import httpx
+from pydantic import BaseModel
 import os
 from dotenv import load_dotenv
-import time
 from tenacity import retry, stop_after_attempt, wait_exponential
 from langgraph.graph import StateGraph, END
-from langgraph.prebuilt import ToolNode
-from operator import itemgetter
 import logging
-import pandas as pd
 import asyncio
+import copy
+import threading
+import time
+import functools
+from contextvars import ContextVar
+from decision_cache import feature_key, open_cache
+from metrics import REGISTRY, LATENCY_BUCKETS, Counter, Histogram
+from features import (
+    transaction_feature_dict, isolation_forest_feature_dict, behavioral_feature_dict,
+    transaction_row, behavioral_matrix
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -33,6 +35,8 @@ load_dotenv()
     reraise=True
 )
 def create_groq_llm():
+    # langchain_groq is only imported when an LLM is actually needed
+    from langchain_groq import ChatGroq
     return ChatGroq(
         groq_api_key=os.getenv("GROQ_API_KEY"),
         model_name="llama-3.3-70b-versatile",
@@ -41,11 +45,48 @@ def create_groq_llm():
         request_timeout=30
     )
 
-# Initialize Groq LLM
-llm = create_groq_llm()
+# The graph scores with the models only, so the LLM and the tool wrappers are built on
+# first use rather than at import: importing this module needs no GROQ_API_KEY, no
+# network and none of the langchain agent machinery
+_llm = None
+_tools = None
+_lazy_lock = threading.Lock()
+
+def get_llm():
+    global _llm
+    if _llm is None:
+        with _lazy_lock:
+            if _llm is None:
+                _llm = create_groq_llm()
+    return _llm
 
 # API endpoints
 API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
+# Sent as X-Admin-Token on the model version probe when the prediction API requires one
+API_ADMIN_TOKEN = os.getenv("API_ADMIN_TOKEN")
+
+# Latency and decision metrics, exposed by agent_server's GET /metrics
+NODE_SECONDS = REGISTRY.register(Histogram(
+    "fraudshield_agent_node_seconds", "Time spent in each graph node", LATENCY_BUCKETS, ["node"]
+))
+# cache (decision cache lookup), prepare (initial state), graph (the whole walk or the
+# parallel dispatch), graph_overhead (graph minus its nodes: LangGraph scheduling and
+# routing) and respond (building the response and caching it)
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "fraudshield_agent_stage_seconds", "Time per stage of process_transaction", LATENCY_BUCKETS, ["stage"]
+))
+HTTP_SECONDS = REGISTRY.register(Histogram(
+    "fraudshield_agent_http_seconds", "Prediction API calls, including retries", LATENCY_BUCKETS, ["path"]
+))
+HTTP_RETRIES = REGISTRY.register(Counter(
+    "fraudshield_agent_http_retries_total", "Prediction API calls retried after a failure", ["path"]
+))
+DECISIONS = REGISTRY.register(Counter(
+    "fraudshield_agent_decisions_total", "Decisions by outcome and path through the graph", ["status", "path"]
+))
+
+def count_retry(retry_state):
+    HTTP_RETRIES.inc(retry_state.args[0])
 
 class TransactionData(BaseModel):
     amount: float
@@ -56,54 +97,15 @@ class TransactionData(BaseModel):
     transaction_type: str = None
     
     def model_dump(self):
-        # Convert to the format expected by the model
-        data = {
-            "amount": self.amount,
-            "oldbalanceOrg": self.oldbalanceOrg,
-            "newbalanceOrig": self.newbalanceOrig,
-            "oldbalanceDest": self.oldbalanceDest,
-            "newbalanceDest": self.newbalanceDest,
-            "balance_difference": self.oldbalanceOrg - self.newbalanceOrig,
-            "dest_balance_difference": self.oldbalanceDest - self.newbalanceDest,
-            "large_transaction": 1.0 if self.amount > 10000 else 0.0,
-            "type_CASH_OUT": 1.0 if self.transaction_type == "CASH_OUT" else 0.0,
-            "type_DEBIT": 1.0 if self.transaction_type == "DEBIT" else 0.0,
-            "type_PAYMENT": 1.0 if self.transaction_type == "PAYMENT" else 0.0,
-            "type_TRANSFER": 1.0 if self.transaction_type == "TRANSFER" else 0.0
-        }
-        
-        # Create DataFrame to ensure feature names match exactly
-        df = pd.DataFrame([data])
-        
-        # Select only the features that the scaler expects (matching model_training.py)
-        numeric_features = [
-            'amount', 'oldbalanceOrg', 'newbalanceOrig', 'oldbalanceDest', 'newbalanceDest',
-            'balance_difference', 'dest_balance_difference'
-        ]
-        
-        # Convert to dict with exact feature names
-        result = df[numeric_features].to_dict('records')[0]
-        
-        # Add categorical features (matching model_training.py's one-hot encoding)
-        for col in ['type_CASH_OUT', 'type_DEBIT', 'type_PAYMENT', 'type_TRANSFER']:
-            result[col] = data[col]
-            
-        return result
+        # Convert to the format expected by the model (numeric features in
+        # transaction_scaler order plus the one-hot type columns, see features.py).
+        # transaction_type rides along: the prediction API one-hot encodes it from
+        # that field, and the graph rebuilds TransactionData from this dict
+        return {**transaction_feature_dict(self), "transaction_type": self.transaction_type}
     
     def get_isolation_forest_features(self):
         """Get features specifically for Isolation Forest model"""
-        # Create DataFrame with only the features used by Isolation Forest
-        iso_features = ['amount', 'oldbalanceOrg', 'newbalanceOrig', 'oldbalanceDest', 'newbalanceDest']
-        df = pd.DataFrame([{
-            "amount": self.amount,
-            "oldbalanceOrg": self.oldbalanceOrg,
-            "newbalanceOrig": self.newbalanceOrig,
-            "oldbalanceDest": self.oldbalanceDest,
-            "newbalanceDest": self.newbalanceDest
-        }])
-        
-        # Return the DataFrame directly to preserve feature names
-        return df.to_dict('records')[0]
+        return isolation_forest_feature_dict(self)
 
 class BehavioralData(BaseModel):
     avg_transaction_amount: float
@@ -119,26 +121,8 @@ class BehavioralData(BaseModel):
     type_TRANSFER_ratio: float = 0.0
     
     def model_dump(self):
-        # Convert to the format expected by the model (matching model_training.py's behavioral features)
-        data = {
-            "avg_transaction_amount": self.avg_transaction_amount,
-            "max_transaction_amount": self.max_transaction_amount,
-            "transaction_amount_std": self.transaction_amount_std,
-            "avg_balance": self.avg_balance,
-            "transaction_count": self.transaction_count,
-            "large_transaction_ratio": self.large_transaction_ratio,
-            "balance_change_mean": self.balance_change_mean,
-            "type_CASH_OUT_ratio": self.type_CASH_OUT_ratio,
-            "type_DEBIT_ratio": self.type_DEBIT_ratio,
-            "type_PAYMENT_ratio": self.type_PAYMENT_ratio,
-            "type_TRANSFER_ratio": self.type_TRANSFER_ratio
-        }
-        
-        # Create DataFrame to ensure feature names match exactly
-        df = pd.DataFrame([data])
-        
         # Return the data in the exact format expected by the behavioral model
-        return df.to_dict('records')[0]
+        return behavioral_feature_dict(self)
 
 # Define state
 class AgentState(TypedDict):
@@ -154,86 +138,239 @@ class AgentState(TypedDict):
     step: str  # Track current step in the workflow
     error: str  # Track any errors that occur
 
+# Model backend: "http" calls backend/api.py over HTTP (split deployments),
+# "local" runs the loaded models and scalers inside this process
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "http")
+
+# Keep-alive session so HTTP mode reuses connections to the prediction API
+http_session = requests.Session()
+
+_local_models = None
+_local_models_lock = threading.Lock()
+
+# Decision cache: a retried or replayed transaction with an unchanged behavioral profile
+# returns the earlier decision instead of running the graph again. Keys hash the
+# transaction and behavioral feature vectors plus the model version that made the
+# decision (decision_cache.py). DECISION_CACHE_SIZE=0 turns it off; DECISION_CACHE_SHM
+# names a shared file so every agent server worker shares one cache
+DECISION_CACHE_SIZE = int(os.getenv("DECISION_CACHE_SIZE", 10000))
+DECISION_CACHE_TTL = float(os.getenv("DECISION_CACHE_TTL", 300))
+DECISION_CACHE_SHM = os.getenv("DECISION_CACHE_SHM")
+decision_cache = open_cache(DECISION_CACHE_SIZE, DECISION_CACHE_TTL, DECISION_CACHE_SHM, slot_bytes=8192)
+# Version of the model set behind the cached decisions. Local mode reads the loaded set;
+# HTTP mode learns it from the model_version the prediction API returns
+_decision_version = None
+# HTTP mode asks the prediction API for the version it is serving (GET /admin/models)
+# before answering from the cache, at most every MODEL_VERSION_PROBE_INTERVAL seconds, so
+# after an /admin/reload cached decisions stop within that interval rather than the TTL.
+# While the probe fails the cache is bypassed
+MODEL_VERSION_PROBE_INTERVAL = float(os.getenv("MODEL_VERSION_PROBE_INTERVAL", 1.0))
+MODEL_VERSION_PROBE_TIMEOUT = 2.0
+_serving_version = None
+_version_probed_at = float("-inf")
+
+def set_model_backend(backend: str):
+    global MODEL_BACKEND
+    if backend not in ("http", "local"):
+        raise ValueError(f"Unknown model backend: {backend}")
+    MODEL_BACKEND = backend
+
+def get_local_models():
+    """Import backend/api.py and load its models once for in-process scoring"""
+    global _local_models
+    if _local_models is None:
+        with _local_models_lock:
+            if _local_models is None:
+                import api as model_api
+                if not model_api.models:
+                    model_api.load_models()
+                _local_models = model_api
+    return _local_models
+
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10), before_sleep=count_retry)
+def _post_prediction(path: str, payload: Dict) -> Dict:
+    response = http_session.post(f"{API_BASE_URL}{path}", json=payload, timeout=30)
+    response.raise_for_status()
+    return response.json()
+
+def post_prediction(path: str, payload: Dict) -> Dict:
+    with HTTP_SECONDS.time(path):
+        return _post_prediction(path, payload)
+
 # Tools for each agent with error handling
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
 def call_isolation_forest(transaction: TransactionData) -> Dict:
     try:
-        response = requests.post(
-            f"{API_BASE_URL}/predict/isolation_forest",
-            json=transaction.get_isolation_forest_features(),  # Use specific features for Isolation Forest
-            timeout=30
-        )
-        response.raise_for_status()
-        return response.json()
+        if MODEL_BACKEND == "local":
+            model_api = get_local_models()
+            return model_api.score_isolation_forest(transaction_row(transaction))[0].model_dump()
+        # Use specific features for Isolation Forest
+        return post_prediction("/predict/isolation_forest", transaction.get_isolation_forest_features())
     except Exception as e:
         logger.error(f"Error in isolation forest: {str(e)}")
         raise
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
 def call_transaction_monitoring(transaction: TransactionData) -> Dict:
     try:
-        response = requests.post(
-            f"{API_BASE_URL}/predict/transaction",
-            json=transaction.model_dump(),
-            timeout=30
-        )
-        response.raise_for_status()
-        return response.json()
+        if MODEL_BACKEND == "local":
+            model_api = get_local_models()
+            return model_api.score_transaction(transaction_row(transaction))[0].model_dump()
+        return post_prediction("/predict/transaction", transaction.model_dump())
     except Exception as e:
         logger.error(f"Error in transaction monitoring: {str(e)}")
         raise
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
 def call_behavioral_analysis(behavior: BehavioralData) -> Dict:
     try:
-        response = requests.post(
-            f"{API_BASE_URL}/predict/behavioral",
-            json=behavior.model_dump(),
-            timeout=30
-        )
-        response.raise_for_status()
-        return response.json()
+        if MODEL_BACKEND == "local":
+            model_api = get_local_models()
+            return model_api.score_behavioral(behavioral_matrix([behavior]))[0].model_dump()
+        return post_prediction("/predict/behavioral", behavior.model_dump())
     except Exception as e:
         logger.error(f"Error in behavioral analysis: {str(e)}")
         raise
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
 def call_risk_scoring(transaction: TransactionData) -> Dict:
     try:
-        response = requests.post(
-            f"{API_BASE_URL}/predict/risk_scoring",
-            json=transaction.model_dump(),
-            timeout=30
+        if MODEL_BACKEND == "local":
+            model_api = get_local_models()
+            return model_api.score_risk(transaction_row(transaction))[0].model_dump()
+        return post_prediction("/predict/risk_scoring", transaction.model_dump())
+    except Exception as e:
+        logger.error(f"Error in risk scoring: {str(e)}")
+        raise
+
+def all_models_payload(transaction: TransactionData, behavior: BehavioralData) -> Dict:
+    # Same transaction payload as the per-model calls, so results match them exactly
+    return {"transaction": transaction.model_dump(), "behavioral": behavior.model_dump()}
+
+def call_all_models(transaction: TransactionData, behavior: BehavioralData) -> Dict:
+    try:
+        if MODEL_BACKEND == "local":
+            model_api = get_local_models()
+            return model_api.score_all(transaction_row(transaction), behavioral_matrix([behavior]))[0].model_dump()
+        return post_prediction("/predict/all", all_models_payload(transaction, behavior))
+    except Exception as e:
+        logger.error(f"Error in multi-model scoring: {str(e)}")
+        raise
+
+# Shared async client: keep-alive, pooled connections to the prediction API
+API_MAX_CONNECTIONS = int(os.getenv("API_MAX_CONNECTIONS", 100))
+
+_async_http_client = None
+
+def get_async_http_client() -> httpx.AsyncClient:
+    global _async_http_client
+    if _async_http_client is None:
+        _async_http_client = httpx.AsyncClient(
+            base_url=API_BASE_URL,
+            timeout=30,
+            limits=httpx.Limits(
+                max_connections=API_MAX_CONNECTIONS,
+                max_keepalive_connections=API_MAX_CONNECTIONS
+            )
         )
-        response.raise_for_status()
-        return response.json()
+    return _async_http_client
+
+async def close_async_http_client():
+    global _async_http_client
+    if _async_http_client is not None:
+        await _async_http_client.aclose()
+        _async_http_client = None
+
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10), before_sleep=count_retry)
+async def _apost_prediction(path: str, payload: Dict) -> Dict:
+    # tenacity awaits its backoff on coroutines, so retries never block the event loop
+    response = await get_async_http_client().post(path, json=payload)
+    response.raise_for_status()
+    return response.json()
+
+async def apost_prediction(path: str, payload: Dict) -> Dict:
+    with HTTP_SECONDS.time(path):
+        return await _apost_prediction(path, payload)
+
+# Async tools: HTTP mode awaits the pooled client, local mode runs the
+# CPU-bound model call in a worker thread so the event loop stays free
+async def acall_isolation_forest(transaction: TransactionData) -> Dict:
+    if MODEL_BACKEND == "local":
+        return await asyncio.to_thread(call_isolation_forest, transaction)
+    try:
+        return await apost_prediction("/predict/isolation_forest", transaction.get_isolation_forest_features())
+    except Exception as e:
+        logger.error(f"Error in isolation forest: {str(e)}")
+        raise
+
+async def acall_transaction_monitoring(transaction: TransactionData) -> Dict:
+    if MODEL_BACKEND == "local":
+        return await asyncio.to_thread(call_transaction_monitoring, transaction)
+    try:
+        return await apost_prediction("/predict/transaction", transaction.model_dump())
+    except Exception as e:
+        logger.error(f"Error in transaction monitoring: {str(e)}")
+        raise
+
+async def acall_behavioral_analysis(behavior: BehavioralData) -> Dict:
+    if MODEL_BACKEND == "local":
+        return await asyncio.to_thread(call_behavioral_analysis, behavior)
+    try:
+        return await apost_prediction("/predict/behavioral", behavior.model_dump())
+    except Exception as e:
+        logger.error(f"Error in behavioral analysis: {str(e)}")
+        raise
+
+async def acall_risk_scoring(transaction: TransactionData) -> Dict:
+    if MODEL_BACKEND == "local":
+        return await asyncio.to_thread(call_risk_scoring, transaction)
+    try:
+        return await apost_prediction("/predict/risk_scoring", transaction.model_dump())
     except Exception as e:
         logger.error(f"Error in risk scoring: {str(e)}")
         raise
 
-# Create tools
-tools = [
-    Tool(
-        name="isolation_forest",
-        func=call_isolation_forest,
-        description="Detects anomalies in transactions using Isolation Forest model"
-    ),
-    Tool(
-        name="transaction_monitoring",
-        func=call_transaction_monitoring,
-        description="Monitors transactions using XGBoost model"
-    ),
-    Tool(
-        name="behavioral_analysis",
-        func=call_behavioral_analysis,
-        description="Analyzes user behavior patterns"
-    ),
-    Tool(
-        name="risk_scoring",
-        func=call_risk_scoring,
-        description="Assigns risk scores to transactions"
-    )
-]
+async def acall_all_models(transaction: TransactionData, behavior: BehavioralData) -> Dict:
+    if MODEL_BACKEND == "local":
+        return await asyncio.to_thread(call_all_models, transaction, behavior)
+    try:
+        return await apost_prediction("/predict/all", all_models_payload(transaction, behavior))
+    except Exception as e:
+        logger.error(f"Error in multi-model scoring: {str(e)}")
+        raise
+
+def get_tools():
+    """LangChain Tool wrappers around the model calls, for agents that drive them via an LLM"""
+    global _tools
+    if _tools is None:
+        from langchain_core.tools import Tool
+        _tools = [
+            Tool(
+                name="isolation_forest",
+                func=call_isolation_forest,
+                description="Detects anomalies in transactions using Isolation Forest model"
+            ),
+            Tool(
+                name="transaction_monitoring",
+                func=call_transaction_monitoring,
+                description="Monitors transactions using XGBoost model"
+            ),
+            Tool(
+                name="behavioral_analysis",
+                func=call_behavioral_analysis,
+                description="Analyzes user behavior patterns"
+            ),
+            Tool(
+                name="risk_scoring",
+                func=call_risk_scoring,
+                description="Assigns risk scores to transactions"
+            )
+        ]
+    return _tools
+
+def __getattr__(name: str):
+    # `agents.llm` and `agents.tools` keep working, built on first access
+    if name == "llm":
+        return get_llm()
+    if name == "tools":
+        return get_tools()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Agent functions with error handling and logging
 def anomaly_detection(state: AgentState) -> AgentState:
@@ -242,7 +379,9 @@ def anomaly_detection(state: AgentState) -> AgentState:
         state["step"] = "anomaly_detection"
         result = call_isolation_forest(TransactionData(**state["transaction"]))
         state["anomaly_result"] = result
-        state["messages"].append(AIMessage(content=f"Anomaly detection result: {result}"))
+        # Lean runs carry no transcript, which also skips stringifying the result
+        if state.get("messages") is not None:
+            state["messages"].append(AIMessage(content=f"Anomaly detection result: {result}"))
         logger.info("Completed anomaly detection")
         return state
     except Exception as e:
@@ -256,7 +395,9 @@ def behavioral_analysis(state: AgentState) -> AgentState:
         state["step"] = "behavioral_analysis"
         result = call_behavioral_analysis(BehavioralData(**state["behavior"]))
         state["behavioral_result"] = result
-        state["messages"].append(AIMessage(content=f"Behavioral analysis result: {result}"))
+        # Lean runs carry no transcript, which also skips stringifying the result
+        if state.get("messages") is not None:
+            state["messages"].append(AIMessage(content=f"Behavioral analysis result: {result}"))
         logger.info("Completed behavioral analysis")
         return state
     except Exception as e:
@@ -270,7 +411,9 @@ def transaction_monitoring(state: AgentState) -> AgentState:
         state["step"] = "transaction_monitoring"
         result = call_transaction_monitoring(TransactionData(**state["transaction"]))
         state["transaction_result"] = result
-        state["messages"].append(AIMessage(content=f"Transaction monitoring result: {result}"))
+        # Lean runs carry no transcript, which also skips stringifying the result
+        if state.get("messages") is not None:
+            state["messages"].append(AIMessage(content=f"Transaction monitoring result: {result}"))
         logger.info("Completed transaction monitoring")
         return state
     except Exception as e:
@@ -284,7 +427,9 @@ def risk_scoring(state: AgentState) -> AgentState:
         state["step"] = "risk_scoring"
         result = call_risk_scoring(TransactionData(**state["transaction"]))
         state["risk_result"] = result
-        state["messages"].append(AIMessage(content=f"Risk scoring result: {result}"))
+        # Lean runs carry no transcript, which also skips stringifying the result
+        if state.get("messages") is not None:
+            state["messages"].append(AIMessage(content=f"Risk scoring result: {result}"))
         logger.info("Completed risk scoring")
         return state
     except Exception as e:
@@ -292,107 +437,205 @@ def risk_scoring(state: AgentState) -> AgentState:
         logger.error(state["error"])
         return state
 
-def create_fraud_detection_graph() -> StateGraph:
-    workflow = StateGraph(AgentState)
+# Async agent functions, used by the graph behind aprocess_transaction
+async def anomaly_detection_async(state: AgentState) -> AgentState:
+    try:
+        logger.info("Starting anomaly detection")
+        state["step"] = "anomaly_detection"
+        result = await acall_isolation_forest(TransactionData(**state["transaction"]))
+        state["anomaly_result"] = result
+        if state.get("messages") is not None:
+            state["messages"].append(AIMessage(content=f"Anomaly detection result: {result}"))
+        logger.info("Completed anomaly detection")
+        return state
+    except Exception as e:
+        state["error"] = f"Error in anomaly detection: {str(e)}"
+        logger.error(state["error"])
+        return state
+
+async def behavioral_analysis_async(state: AgentState) -> AgentState:
+    try:
+        logger.info("Starting behavioral analysis")
+        state["step"] = "behavioral_analysis"
+        result = await acall_behavioral_analysis(BehavioralData(**state["behavior"]))
+        state["behavioral_result"] = result
+        if state.get("messages") is not None:
+            state["messages"].append(AIMessage(content=f"Behavioral analysis result: {result}"))
+        logger.info("Completed behavioral analysis")
+        return state
+    except Exception as e:
+        state["error"] = f"Error in behavioral analysis: {str(e)}"
+        logger.error(state["error"])
+        return state
+
+async def transaction_monitoring_async(state: AgentState) -> AgentState:
+    try:
+        logger.info("Starting transaction monitoring")
+        state["step"] = "transaction_monitoring"
+        result = await acall_transaction_monitoring(TransactionData(**state["transaction"]))
+        state["transaction_result"] = result
+        if state.get("messages") is not None:
+            state["messages"].append(AIMessage(content=f"Transaction monitoring result: {result}"))
+        logger.info("Completed transaction monitoring")
+        return state
+    except Exception as e:
+        state["error"] = f"Error in transaction monitoring: {str(e)}"
+        logger.error(state["error"])
+        return state
+
+async def risk_scoring_async(state: AgentState) -> AgentState:
+    try:
+        logger.info("Starting risk scoring")
+        state["step"] = "risk_scoring"
+        result = await acall_risk_scoring(TransactionData(**state["transaction"]))
+        state["risk_result"] = result
+        if state.get("messages") is not None:
+            state["messages"].append(AIMessage(content=f"Risk scoring result: {result}"))
+        logger.info("Completed risk scoring")
+        return state
+    except Exception as e:
+        state["error"] = f"Error in risk scoring: {str(e)}"
+        logger.error(state["error"])
+        return state
+
+# Edge conditions with decision layer, shared by the graph and the speculative fan-out
+def route_after_anomaly(state: AgentState) -> str:
+    if state.get("error"):
+        return END
     
-    # Add nodes
-    workflow.add_node("anomaly_detection", anomaly_detection)
-    workflow.add_node("behavioral_analysis", behavioral_analysis)
-    workflow.add_node("transaction_monitoring", transaction_monitoring)
-    workflow.add_node("risk_scoring", risk_scoring)
+    anomaly_result = state["anomaly_result"]
+    anomaly_prediction = anomaly_result["prediction"]
+    anomaly_prob = anomaly_result["fraud_probability"]
     
-    # Define edge conditions with decision layer
-    def route_after_anomaly(state: AgentState) -> str:
-        if state.get("error"):
-            return END
-        
-        anomaly_result = state["anomaly_result"]
-        anomaly_prediction = anomaly_result["prediction"]
-        anomaly_prob = anomaly_result["fraud_probability"]
-        
-        logger.info(f"Anomaly detection result: {anomaly_prediction} (probability: {anomaly_prob})")
-        
-        # Business rules for anomaly detection
-        if anomaly_prediction == "Fraudulent" and anomaly_prob > 0.8:
-            # High confidence fraud detection - go straight to risk scoring
-            state["status"] = "rejected"
-            state["reason"] = f"High confidence fraud detection (probability: {anomaly_prob:.2f})"
-            return END
-        elif anomaly_prediction == "Fraudulent":
-            # Moderate confidence fraud - proceed to transaction monitoring
-            return "transaction_monitoring"
-        else:
-            # No anomaly detected - check behavior
-            return "behavioral_analysis"
+    logger.info(f"Anomaly detection result: {anomaly_prediction} (probability: {anomaly_prob})")
     
-    def route_after_behavioral(state: AgentState) -> str:
-        if state.get("error"):
-            return END
-        
-        behavioral_result = state["behavioral_result"]
-        behavioral_prediction = behavioral_result["prediction"]
-        behavioral_prob = behavioral_result["fraud_probability"]
-        
-        logger.info(f"Behavioral analysis result: {behavioral_prediction} (probability: {behavioral_prob})")
-        
-        # Business rules for behavioral analysis
-        if behavioral_prediction == "Suspicious Behavior" and behavioral_prob > 0.8:
-            # High confidence suspicious behavior - go straight to risk scoring
-            return "risk_scoring"
-        elif behavioral_prediction == "Suspicious Behavior":
-            # Moderate confidence suspicious behavior - proceed to transaction monitoring
-            return "transaction_monitoring"
-        else:
-            # No suspicious behavior detected
-            state["status"] = "approved"
-            state["reason"] = "No suspicious behavior detected"
-            logger.info("Transaction approved - no suspicious behavior")
-            return END
+    # Business rules for anomaly detection
+    if anomaly_prediction == "Fraudulent" and anomaly_prob > 0.8:
+        # High confidence fraud detection - go straight to risk scoring
+        state["status"] = "rejected"
+        state["reason"] = f"High confidence fraud detection (probability: {anomaly_prob:.2f})"
+        return END
+    elif anomaly_prediction == "Fraudulent":
+        # Moderate confidence fraud - proceed to transaction monitoring
+        return "transaction_monitoring"
+    else:
+        # No anomaly detected - check behavior
+        return "behavioral_analysis"
+
+def route_after_behavioral(state: AgentState) -> str:
+    if state.get("error"):
+        return END
     
-    def route_after_transaction(state: AgentState) -> str:
-        if state.get("error"):
-            return END
-        
-        transaction_result = state["transaction_result"]
-        transaction_prediction = transaction_result["prediction"]
-        transaction_prob = transaction_result["fraud_probability"]
-        
-        logger.info(f"Transaction monitoring result: {transaction_prediction} (probability: {transaction_prob})")
-        
-        # Business rules for transaction monitoring
-        if transaction_prediction == "Fraudulent" and transaction_prob > 0.8:
-            # High confidence fraud - go straight to risk scoring
-            return "risk_scoring"
-        elif transaction_prediction == "Fraudulent":
-            # Moderate confidence fraud - proceed to risk scoring
-            return "risk_scoring"
-        else:
-            # No fraud detected - proceed to risk scoring for final assessment
-            return "risk_scoring"
+    behavioral_result = state["behavioral_result"]
+    behavioral_prediction = behavioral_result["prediction"]
+    behavioral_prob = behavioral_result["fraud_probability"]
     
-    def route_after_risk(state: AgentState) -> str:
-        if state.get("error"):
-            return END
-        
-        risk_result = state["risk_result"]
-        risk_prediction = risk_result["prediction"]
-        risk_prob = risk_result["fraud_probability"]
-        risk_level = risk_result["details"]["risk_level"]
-        
-        logger.info(f"Risk scoring result: {risk_prediction} (probability: {risk_prob}, level: {risk_level})")
-        
-        # Final decision based on risk scoring with more lenient thresholds
-        if risk_level == "High" or (risk_prediction == "High Risk" and risk_prob > 0.85):
-            state["status"] = "rejected"
-            state["reason"] = f"High risk transaction (probability: {risk_prob:.2f}, level: {risk_level})"
-        elif risk_level == "Medium" or (risk_prediction == "High Risk" and risk_prob > 0.6):
-            state["status"] = "review"
-            state["reason"] = f"Medium risk transaction (probability: {risk_prob:.2f}, level: {risk_level})"
-        else:
-            state["status"] = "approved"
-            state["reason"] = f"Low risk transaction (probability: {risk_prob:.2f}, level: {risk_level})"
-        
+    logger.info(f"Behavioral analysis result: {behavioral_prediction} (probability: {behavioral_prob})")
+    
+    # Business rules for behavioral analysis
+    if behavioral_prediction == "Suspicious Behavior" and behavioral_prob > 0.8:
+        # High confidence suspicious behavior - go straight to risk scoring
+        return "risk_scoring"
+    elif behavioral_prediction == "Suspicious Behavior":
+        # Moderate confidence suspicious behavior - proceed to transaction monitoring
+        return "transaction_monitoring"
+    else:
+        # No suspicious behavior detected
+        state["status"] = "approved"
+        state["reason"] = "No suspicious behavior detected"
+        logger.info("Transaction approved - no suspicious behavior")
         return END
+
+def route_after_transaction(state: AgentState) -> str:
+    if state.get("error"):
+        return END
+    
+    transaction_result = state["transaction_result"]
+    transaction_prediction = transaction_result["prediction"]
+    transaction_prob = transaction_result["fraud_probability"]
+    
+    logger.info(f"Transaction monitoring result: {transaction_prediction} (probability: {transaction_prob})")
+    
+    # Business rules for transaction monitoring
+    if transaction_prediction == "Fraudulent" and transaction_prob > 0.8:
+        # High confidence fraud - go straight to risk scoring
+        return "risk_scoring"
+    elif transaction_prediction == "Fraudulent":
+        # Moderate confidence fraud - proceed to risk scoring
+        return "risk_scoring"
+    else:
+        # No fraud detected - proceed to risk scoring for final assessment
+        return "risk_scoring"
+
+def route_after_risk(state: AgentState) -> str:
+    if state.get("error"):
+        return END
+    
+    risk_result = state["risk_result"]
+    risk_prediction = risk_result["prediction"]
+    risk_prob = risk_result["fraud_probability"]
+    risk_level = risk_result["details"]["risk_level"]
+    
+    logger.info(f"Risk scoring result: {risk_prediction} (probability: {risk_prob}, level: {risk_level})")
+    
+    # Final decision based on risk scoring with more lenient thresholds
+    if risk_level == "High" or (risk_prediction == "High Risk" and risk_prob > 0.85):
+        state["status"] = "rejected"
+        state["reason"] = f"High risk transaction (probability: {risk_prob:.2f}, level: {risk_level})"
+    elif risk_level == "Medium" or (risk_prediction == "High Risk" and risk_prob > 0.6):
+        state["status"] = "review"
+        state["reason"] = f"Medium risk transaction (probability: {risk_prob:.2f}, level: {risk_level})"
+    else:
+        state["status"] = "approved"
+        state["reason"] = f"Low risk transaction (probability: {risk_prob:.2f}, level: {risk_level})"
+    
+    return END
+
+# Seconds spent inside nodes during the current graph run, so the graph's own
+# overhead can be told apart from the model calls
+_node_seconds: ContextVar[Optional[List[float]]] = ContextVar("node_seconds", default=None)
+
+def record_node(name: str, seconds: float):
+    NODE_SECONDS.observe(seconds, name)
+    spent = _node_seconds.get()
+    if spent is not None:
+        spent[0] += seconds
+
+def timed_node(name: str, node):
+    """Wrap a graph node so every run of it is observed in NODE_SECONDS"""
+    if asyncio.iscoroutinefunction(node):
+        @functools.wraps(node)
+        async def run_async(state: AgentState) -> AgentState:
+            start = time.perf_counter()
+            try:
+                return await node(state)
+            finally:
+                record_node(name, time.perf_counter() - start)
+        return run_async
+    
+    @functools.wraps(node)
+    def run(state: AgentState) -> AgentState:
+        start = time.perf_counter()
+        try:
+            return node(state)
+        finally:
+            record_node(name, time.perf_counter() - start)
+    return run
+
+def create_fraud_detection_graph(use_async: bool = False) -> StateGraph:
+    workflow = StateGraph(AgentState)
+    
+    # Add nodes (async variants when the graph is run with ainvoke)
+    if use_async:
+        workflow.add_node("anomaly_detection", timed_node("anomaly_detection", anomaly_detection_async))
+        workflow.add_node("behavioral_analysis", timed_node("behavioral_analysis", behavioral_analysis_async))
+        workflow.add_node("transaction_monitoring", timed_node("transaction_monitoring", transaction_monitoring_async))
+        workflow.add_node("risk_scoring", timed_node("risk_scoring", risk_scoring_async))
+    else:
+        workflow.add_node("anomaly_detection", timed_node("anomaly_detection", anomaly_detection))
+        workflow.add_node("behavioral_analysis", timed_node("behavioral_analysis", behavioral_analysis))
+        workflow.add_node("transaction_monitoring", timed_node("transaction_monitoring", transaction_monitoring))
+        workflow.add_node("risk_scoring", timed_node("risk_scoring", risk_scoring))
     
     # Add edges
     workflow.set_entry_point("anomaly_detection")
@@ -426,58 +669,306 @@ def create_fraud_detection_graph() -> StateGraph:
     
     return workflow.compile()
 
-def process_transaction(transaction_data: TransactionData, behavioral_data: BehavioralData):
+# The compiled graphs hold no per-request state, so one instance per mode is shared by all requests
+_fraud_detection_graphs = {}
+_fraud_detection_graph_lock = threading.Lock()
+
+def get_fraud_detection_graph(use_async: bool = False):
+    graph = _fraud_detection_graphs.get(use_async)
+    if graph is None:
+        with _fraud_detection_graph_lock:
+            graph = _fraud_detection_graphs.get(use_async)
+            if graph is None:
+                graph = _fraud_detection_graphs[use_async] = create_fraud_detection_graph(use_async)
+    return graph
+
+# Execution mode: "sequential" walks the graph one model call at a time,
+# "parallel" scores all four models at once (one /predict/all call) and then
+# applies the same routing rules to the collected results
+EXECUTION_MODE = os.getenv("EXECUTION_MODE", "sequential")
+
+# Node name -> (state key of its result, label used in messages and errors)
+NODE_RESULTS = {
+    "anomaly_detection": ("anomaly_result", "Anomaly detection"),
+    "behavioral_analysis": ("behavioral_result", "Behavioral analysis"),
+    "transaction_monitoring": ("transaction_result", "Transaction monitoring"),
+    "risk_scoring": ("risk_result", "Risk scoring"),
+}
+
+# Node name -> key of its block in the /predict/all response
+NODE_MODELS = {
+    "anomaly_detection": "isolation_forest",
+    "behavioral_analysis": "behavioral_analysis",
+    "transaction_monitoring": "transaction_monitoring",
+    "risk_scoring": "risk_scoring",
+}
+
+# Same edges as create_fraud_detection_graph
+NODE_ROUTERS = {
+    "anomaly_detection": route_after_anomaly,
+    "behavioral_analysis": route_after_behavioral,
+    "transaction_monitoring": route_after_transaction,
+    "risk_scoring": lambda state: END,
+}
+
+def apply_routing(state: AgentState, results: Dict[str, Union[Dict, Exception]]) -> AgentState:
+    """Walk the graph's routing rules over precomputed model results.
+    
+    Only results on the path taken are recorded, so the final state matches
+    a sequential run. Routers see a copy of the state because LangGraph does
+    not persist writes made inside conditional edges either.
+    """
+    node = "anomaly_detection"
+    while node != END:
+        result_key, label = NODE_RESULTS[node]
+        state["step"] = node
+        result = results[node]
+        if isinstance(result, Exception):
+            state["error"] = f"Error in {label.lower()}: {str(result)}"
+            logger.error(state["error"])
+        else:
+            state[result_key] = result
+            if state.get("messages") is not None:
+                state["messages"].append(AIMessage(content=f"{label} result: {result}"))
+        node = NODE_ROUTERS[node](dict(state))
+    return state
+
+def dispatch_all_models(state: AgentState) -> Dict[str, Union[Dict, Exception]]:
+    """Score the transaction with all four models in one multi-model call"""
     try:
-        # Initialize the graph
-        graph = create_fraud_detection_graph()
-        
-        # Create initial state
-        initial_state = {
-            "messages": [HumanMessage(content="Starting fraud detection process")],
-            "transaction": transaction_data.model_dump(),
-            "behavior": behavioral_data.model_dump(),
-            "anomaly_result": {},
-            "behavioral_result": {},
-            "transaction_result": {},
-            "risk_result": {},
-            "status": "pending",
-            "reason": "",
-            "step": "initialized",
-            "error": ""
-        }
-        
-        # Run the graph
-        final_state = graph.invoke(initial_state)
-        
-        # Check for errors
-        if final_state.get("error"):
-            logger.error(f"Final state error: {final_state['error']}")
-            return {
-                "status": "error",
-                "error": final_state["error"],
-                "step": final_state["step"]
-            }
-        
-        # Create the response with initial pending status
-        response = {
-            "anomaly_detection": final_state["anomaly_result"],
-            "transaction_monitoring": final_state.get("transaction_result"),
-            "behavioral_analysis": final_state.get("behavioral_result"),
-            "risk_scoring": final_state["risk_result"],
-            "status": "pending",  # Start with pending status
-            "reason": final_state["reason"],
-            "step": final_state["step"],
-            "messages": [msg.content for msg in final_state["messages"]]
+        results = call_all_models(TransactionData(**state["transaction"]), BehavioralData(**state["behavior"]))
+    except Exception as e:
+        return {node: e for node in NODE_RESULTS}
+    return {node: results[model] for node, model in NODE_MODELS.items()}
+
+async def adispatch_all_models(state: AgentState) -> Dict[str, Union[Dict, Exception]]:
+    """Score the transaction with all four models in one multi-model call, without blocking"""
+    try:
+        results = await acall_all_models(TransactionData(**state["transaction"]), BehavioralData(**state["behavior"]))
+    except Exception as e:
+        return {node: e for node in NODE_RESULTS}
+    return {node: results[model] for node, model in NODE_MODELS.items()}
+
+def decision_outcome(final_state: Dict) -> tuple:
+    """(status, path): the decision the routing rules reach and the nodes that ran.
+    
+    LangGraph drops the status the routers write, so the routers are replayed
+    on copies of the final state; the graph ends after risk scoring, whose
+    verdict comes from route_after_risk.
+    """
+    if final_state.get("error"):
+        return "error", ">".join(node for node, (key, _) in NODE_RESULTS.items() if final_state.get(key)) or "none"
+    path, status, node = [], "pending", "anomaly_detection"
+    while node != END and final_state.get(NODE_RESULTS[node][0]):
+        path.append(node)
+        state = dict(final_state)
+        node = (route_after_risk if node == "risk_scoring" else NODE_ROUTERS[node])(state)
+        status = state["status"]
+    return status, ">".join(path) or "none"
+
+def observe_decision(final_state: Dict):
+    DECISIONS.inc(*decision_outcome(final_state))
+
+def _version_probe_due() -> bool:
+    global _version_probed_at
+    now = time.monotonic()
+    if now - _version_probed_at < MODEL_VERSION_PROBE_INTERVAL:
+        return False
+    # Claimed before probing, so concurrent requests do not all probe at once
+    _version_probed_at = now
+    return True
+
+def _admin_headers() -> Dict[str, str]:
+    return {"X-Admin-Token": API_ADMIN_TOKEN} if API_ADMIN_TOKEN else {}
+
+def _decisions_made_by(version: str):
+    global _decision_version
+    if version != _decision_version:
+        # The prediction API is serving a new model set; earlier decisions are stale
+        if _decision_version is not None:
+            decision_cache.clear()
+        _decision_version = version
+
+def serving_version_probed(version: Optional[str]):
+    global _serving_version
+    _serving_version = version
+    if version is not None:
+        _decisions_made_by(version)
+
+def model_version() -> Optional[str]:
+    """Version of the model set decisions are cached under; None when it is unknown"""
+    if MODEL_BACKEND == "local":
+        return get_local_models().current_models().version
+    if _version_probe_due():
+        try:
+            response = http_session.get(f"{API_BASE_URL}/admin/models", headers=_admin_headers(),
+                                        timeout=MODEL_VERSION_PROBE_TIMEOUT)
+            response.raise_for_status()
+            version = response.json().get("version")
+        except (requests.RequestException, ValueError) as e:
+            logger.warning(f"Model version probe failed, bypassing the decision cache: {str(e)}")
+            version = None
+        serving_version_probed(version)
+    return _serving_version
+
+async def amodel_version() -> Optional[str]:
+    """model_version() without blocking the event loop"""
+    if MODEL_BACKEND == "local":
+        return get_local_models().current_models().version
+    if _version_probe_due():
+        try:
+            response = await get_async_http_client().get("/admin/models", headers=_admin_headers(),
+                                                         timeout=MODEL_VERSION_PROBE_TIMEOUT)
+            response.raise_for_status()
+            version = response.json().get("version")
+        except (httpx.HTTPError, ValueError) as e:
+            logger.warning(f"Model version probe failed, bypassing the decision cache: {str(e)}")
+            version = None
+        serving_version_probed(version)
+    return _serving_version
+
+def decision_key(transaction_data: TransactionData, behavioral_data: BehavioralData, include_messages: bool,
+                 version: Optional[str]) -> bytes:
+    # Responses with and without the message transcript are cached separately
+    return feature_key(f"decision:{int(include_messages)}", version,
+                       transaction_row(transaction_data), behavioral_matrix([behavioral_data]))
+
+def cached_decision(transaction_data: TransactionData, behavioral_data: BehavioralData,
+                    include_messages: bool) -> Optional[Dict]:
+    if decision_cache is None:
+        return None
+    return _cached_decision(transaction_data, behavioral_data, include_messages, model_version())
+
+async def acached_decision(transaction_data: TransactionData, behavioral_data: BehavioralData,
+                           include_messages: bool) -> Optional[Dict]:
+    if decision_cache is None:
+        return None
+    return _cached_decision(transaction_data, behavioral_data, include_messages, await amodel_version())
+
+def _cached_decision(transaction_data: TransactionData, behavioral_data: BehavioralData, include_messages: bool,
+                     version: Optional[str]) -> Optional[Dict]:
+    if version is None:
+        return None
+    cached = decision_cache.get(decision_key(transaction_data, behavioral_data, include_messages, version))
+    if cached is None:
+        return None
+    response = copy.deepcopy(cached)
+    schedule_status_update(response)
+    return response
+
+def remember_decision(transaction_data: TransactionData, behavioral_data: BehavioralData, include_messages: bool,
+                      response: Dict):
+    """Cache a successful decision under the model version that made it"""
+    if decision_cache is None or response.get("status") == "error":
+        return
+    versions = {
+        result.get("model_version")
+        for result in (response["anomaly_detection"], response["transaction_monitoring"],
+                       response["behavioral_analysis"], response["risk_scoring"])
+        if result
+    }
+    # Scored across a model reload: nothing consistent to cache
+    if len(versions) != 1:
+        return
+    version = versions.pop()
+    _decisions_made_by(version)
+    # A copy: the background status update changes the response it was given
+    decision_cache.put(decision_key(transaction_data, behavioral_data, include_messages, version),
+                       copy.deepcopy(response))
+
+def decision_cache_stats() -> Dict:
+    if decision_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, "ttl_seconds": DECISION_CACHE_TTL, "model_version": _decision_version,
+            "version_probe_interval_seconds": MODEL_VERSION_PROBE_INTERVAL if MODEL_BACKEND == "http" else None,
+            **decision_cache.stats()}
+
+def observe_graph(seconds: float, node_seconds: float):
+    STAGE_SECONDS.observe(seconds, "graph")
+    # Parallel mode runs no nodes; its dispatch is all model time
+    if node_seconds:
+        STAGE_SECONDS.observe(max(seconds - node_seconds, 0.0), "graph_overhead")
+
+def create_initial_state(transaction_data: TransactionData, behavioral_data: BehavioralData,
+                         include_messages: bool = True) -> Dict:
+    # A lean state (include_messages=False) skips the message transcript
+    return {
+        "messages": [HumanMessage(content="Starting fraud detection process")] if include_messages else None,
+        "transaction": transaction_data.model_dump(),
+        "behavior": behavioral_data.model_dump(),
+        "anomaly_result": {},
+        "behavioral_result": {},
+        "transaction_result": {},
+        "risk_result": {},
+        "status": "pending",
+        "reason": "",
+        "step": "initialized",
+        "error": ""
+    }
+
+def build_response(final_state: Dict, include_messages: bool = True) -> Dict:
+    # Check for errors
+    if final_state.get("error"):
+        logger.error(f"Final state error: {final_state['error']}")
+        return {
+            "status": "error",
+            "error": final_state["error"],
+            "step": final_state["step"]
         }
-        
-        # Update status to processed after a short delay
-        async def update_status():
-            await asyncio.sleep(2)  # Wait for 2 seconds
-            response["status"] = "processed"
-        
-        # Run the status update in the background
-        asyncio.create_task(update_status())
-        
+    
+    # Create the response with initial pending status
+    response = {
+        "anomaly_detection": final_state["anomaly_result"],
+        "transaction_monitoring": final_state.get("transaction_result"),
+        "behavioral_analysis": final_state.get("behavioral_result"),
+        "risk_scoring": final_state["risk_result"],
+        "status": "pending",  # Start with pending status
+        "reason": final_state["reason"],
+        "step": final_state["step"],
+        "messages": [msg.content for msg in final_state["messages"]] if include_messages else []
+    }
+    
+    schedule_status_update(response)
+    return response
+
+def schedule_status_update(response: Dict):
+    # Update status to processed after a short delay
+    async def update_status():
+        await asyncio.sleep(2)  # Wait for 2 seconds
+        response["status"] = "processed"
+    
+    # Run the status update in the background when called from an event loop (scripts have none)
+    try:
+        asyncio.get_running_loop().create_task(update_status())
+    except RuntimeError:
+        pass
+
+def process_transaction(transaction_data: TransactionData, behavioral_data: BehavioralData,
+                        include_messages: bool = True, execution_mode: Optional[str] = None):
+    """Synchronous pipeline, for scripts; blocks the calling thread on every model call"""
+    try:
+        with STAGE_SECONDS.time("cache"):
+            cached = cached_decision(transaction_data, behavioral_data, include_messages)
+        if cached is not None:
+            DECISIONS.inc("cached", "cache")
+            return cached
+        with STAGE_SECONDS.time("prepare"):
+            initial_state = create_initial_state(transaction_data, behavioral_data, include_messages)
+        spent = [0.0]
+        token = _node_seconds.set(spent)
+        start = time.perf_counter()
+        try:
+            if (execution_mode or EXECUTION_MODE) == "parallel":
+                final_state = apply_routing(initial_state, dispatch_all_models(initial_state))
+            else:
+                final_state = get_fraud_detection_graph().invoke(initial_state)
+        finally:
+            _node_seconds.reset(token)
+            observe_graph(time.perf_counter() - start, spent[0])
+        with STAGE_SECONDS.time("respond"):
+            response = build_response(final_state, include_messages)
+            remember_decision(transaction_data, behavioral_data, include_messages, response)
+        observe_decision(final_state)
         return response
     except Exception as e:
         logger.error(f"Error in process_transaction: {str(e)}")
@@ -487,5 +978,40 @@ def process_transaction(transaction_data: TransactionData, behavioral_data: Beha
             "step": "process_transaction"
         }
 
+async def aprocess_transaction(transaction_data: TransactionData, behavioral_data: BehavioralData,
+                               include_messages: bool = True, execution_mode: Optional[str] = None):
+    """Non-blocking pipeline for the agent server"""
+    try:
+        with STAGE_SECONDS.time("cache"):
+            cached = await acached_decision(transaction_data, behavioral_data, include_messages)
+        if cached is not None:
+            DECISIONS.inc("cached", "cache")
+            return cached
+        with STAGE_SECONDS.time("prepare"):
+            initial_state = create_initial_state(transaction_data, behavioral_data, include_messages)
+        spent = [0.0]
+        token = _node_seconds.set(spent)
+        start = time.perf_counter()
+        try:
+            if (execution_mode or EXECUTION_MODE) == "parallel":
+                final_state = apply_routing(initial_state, await adispatch_all_models(initial_state))
+            else:
+                final_state = await get_fraud_detection_graph(use_async=True).ainvoke(initial_state)
+        finally:
+            _node_seconds.reset(token)
+            observe_graph(time.perf_counter() - start, spent[0])
+        with STAGE_SECONDS.time("respond"):
+            response = build_response(final_state, include_messages)
+            remember_decision(transaction_data, behavioral_data, include_messages, response)
+        observe_decision(final_state)
+        return response
+    except Exception as e:
+        logger.error(f"Error in aprocess_transaction: {str(e)}")
+        return {
+            "status": "error",
+            "error": str(e),
+            "step": "process_transaction"
+        }
+
 # Export the process_transaction function for use by the API
-__all__ = ['process_transaction', 'TransactionData', 'BehavioralData'] 
\ No newline at end of file
+__all__ = ['process_transaction', 'aprocess_transaction', 'close_async_http_client', 'get_fraud_detection_graph', 'TransactionData', 'BehavioralData', 'set_model_backend', 'get_local_models', 'decision_cache_stats'] 
\ No newline at end of file
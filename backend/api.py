@@ -1,15 +1,37 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Request, Header, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
 import numpy as np
-import pandas as pd
-from typing import List, Dict, Optional, Union
+from typing import Callable, List, Dict, Optional, Union
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import joblib
+import json
 import os
+import threading
+import time
+import warnings
 from dotenv import load_dotenv
+from logging_utils import configure_logging, RequestDebugSampler, elapsed_ms
+from features import (
+    TRANSACTION_NUMERIC_FEATURES, ISOLATION_FOREST_FEATURES, TRANSACTION_FEATURES, BEHAVIORAL_FEATURES,
+    NUMERIC_COLUMNS, ISOLATION_FOREST_COLUMNS,
+    transaction_matrix, transaction_row, behavioral_matrix, check_feature_names
+)
+from tree_engine import NATIVE_MODELS, compile_model
+from scaler_fusion import fuse_models
+from model_registry import MANIFEST_FILE, UNVERSIONED, ModelRegistry, RegistryView, native_name
+from micro_batching import MicroBatcher, QueueFull, SLOExceeded
+from decision_cache import feature_key, open_cache
+from metrics import REGISTRY, CONTENT_TYPE, LATENCY_BUCKETS, CallbackMetric, Histogram, MetricsMiddleware
 
 # Load environment variables
 load_dotenv()
 
+# Structured logging; per-request debug records are off unless API_DEBUG is set
+logger = configure_logging("api")
+debug_request = RequestDebugSampler.from_env(logger)
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Fraud Detection API",
@@ -17,60 +39,229 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Models are fed plain float64 matrices whose column order is checked against the
+# fitted feature names in load_models, so sklearn's per-call name check is redundant
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+# Precomputed details string for the transaction monitoring response
+FEATURES_USED = ", ".join(TRANSACTION_FEATURES)
+
 # Hardcoded models directory
 MODELS_DIR = "models"
 
-# Dictionary to store loaded models and scalers
-models = {}
-scalers = {}
+# When the artifacts are loaded: "eager" loads everything before the server starts,
+# "background" starts serving at once and loads them in a background thread, "lazy"
+# loads each one on first use. In "lazy" mode the native and fused variants
+# (TREE_ENGINE, FUSE_SCALERS) are not built
+MODEL_LOADING = os.getenv("MODEL_LOADING", "eager")
+REQUIRED_MODELS = ["isolation_forest", "transaction_monitoring", "behavioral_analysis", "risk_scoring"]
+REQUIRED_SCALERS = ["transaction_scaler", "behavior_scaler"]
+
+# Hot reload: poll models/manifest.json every MODEL_WATCH_INTERVAL seconds (0 = off) and
+# reload when it changes; model_training.py publishes a new model set by replacing it.
+# POST /admin/reload requires the X-Admin-Token header when API_ADMIN_TOKEN is set
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", 0))
+API_ADMIN_TOKEN = os.getenv("API_ADMIN_TOKEN")
+
+# Tree engine: "library" scores with xgboost/lightgbm/scikit-learn, "native" uses the
+# flattened NumPy trees from tree_engine.py up to a per-model batch size, above
+# which the libraries' compiled batch paths are faster again
+TREE_ENGINE = os.getenv("TREE_ENGINE", "library")
+NATIVE_TREE_MAX_ROWS = {"isolation_forest": 1024, "transaction_monitoring": 64, "risk_scoring": 64}
+if os.getenv("NATIVE_TREE_MAX_ROWS"):
+    NATIVE_TREE_MAX_ROWS = dict.fromkeys(NATIVE_TREE_MAX_ROWS, int(os.getenv("NATIVE_TREE_MAX_ROWS")))
+
+# Model calls run on a small thread pool instead of the event loop, so one slow batch
+# does not stall request parsing and the other connections. At most
+# INFERENCE_MAX_PENDING calls may be queued or running; beyond that requests get a
+# 503 instead of piling up. INFERENCE_THREADS=0 scores inline on the event loop
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", 1))
+INFERENCE_MAX_PENDING = int(os.getenv("INFERENCE_MAX_PENDING", 64))
+inference_executor = ThreadPoolExecutor(max_workers=INFERENCE_THREADS, thread_name_prefix="inference") \
+    if INFERENCE_THREADS > 0 else None
+inference_pending = 0
 
-# Load models at startup
+# Single-row requests are coalesced into one scoring call per model (micro_batching.py):
+# rows are collected for up to MICRO_BATCH_WAIT_MS or MICRO_BATCH_MAX_ROWS rows, and a
+# request that would wait past MICRO_BATCH_SLO_MS gets a 503. A request arriving alone,
+# with no batch in flight, is scored at once. MICRO_BATCH_MAX_ROWS=0 scores every
+# request on its own
+MICRO_BATCH_MAX_ROWS = int(os.getenv("MICRO_BATCH_MAX_ROWS", 64))
+MICRO_BATCH_WAIT_MS = float(os.getenv("MICRO_BATCH_WAIT_MS", 2))
+MICRO_BATCH_SLO_MS = float(os.getenv("MICRO_BATCH_SLO_MS", 50))
+micro_batchers: Dict[str, MicroBatcher] = {}
+
+# Single-row results are cached per scoring function, keyed on the feature vector and
+# the model version (decision_cache.py). RESULT_CACHE_SIZE=0 turns the cache off;
+# RESULT_CACHE_SHM names a shared file (e.g. /dev/shm/fraudshield-results) so every
+# worker process shares one cache
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", 10000))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", 300))
+RESULT_CACHE_SHM = os.getenv("RESULT_CACHE_SHM")
+
+# Per-stage latency for GET /metrics: features (request -> matrix), cache (result cache
+# lookup), inference (waiting for and running the scoring call, including the
+# micro-batch queue), scale, predict and respond (building the response models)
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "fraudshield_api_stage_seconds", "Prediction API time per request stage", LATENCY_BUCKETS, ["stage", "model"]
+))
+# Stage label of each scoring function
+SCORING_TARGETS = {
+    "score_isolation_forest": "isolation_forest",
+    "score_transaction": "transaction_monitoring",
+    "score_risk": "risk_scoring",
+    "score_behavioral": "behavioral_analysis",
+    "score_all": "all"
+}
+
+# Fused models read raw features: the scalers are folded into the tree thresholds and
+# the logistic regression weights at load time (see scaler_fusion.py). The fused trees
+# run on the native engine, so they follow the same batch size limits
+FUSE_SCALERS = os.getenv("FUSE_SCALERS", "").lower() in ("1", "true", "yes")
+
+class ModelSet:
+    """One version of the artifacts plus the native and fused variants built from it.
+    
+    Every scoring call reads a single ModelSet, so a reload that swaps the active
+    set never mixes versions inside one request.
+    """
+    
+    def __init__(self, registry: ModelRegistry):
+        self.registry = registry
+        self.version = registry.version
+        self.models = RegistryView("model", registry)
+        self.scalers = RegistryView("scaler", registry)
+        self.native_models = {}
+        self.fused_models = {}
+    
+    def warm(self):
+        """Load every artifact and build the native and fused variants the settings ask for"""
+        self.registry.warm(REQUIRED_SCALERS + REQUIRED_MODELS)
+        if TREE_ENGINE == "native":
+            native_models = {}
+            for name in NATIVE_MODELS:
+                # Precompiled ensembles from the registry are memory-mapped; compile the rest
+                native = native_name(name)
+                native_models[name] = (self.registry.get(native) if native in self.registry
+                                       else compile_model(name, self.models[name]))
+            self.native_models = native_models
+        if FUSE_SCALERS:
+            self.fused_models = fuse_models(self.models, self.scalers)
+    
+    def uses_fused_model(self, name: str, n_rows: int) -> bool:
+        return name in self.fused_models and n_rows <= NATIVE_TREE_MAX_ROWS.get(name, n_rows)
+    
+    def tree_model(self, name: str, n_rows: int):
+        native = self.native_models.get(name)
+        if native is not None and n_rows <= NATIVE_TREE_MAX_ROWS[name]:
+            return native
+        return self.models[name]
+    
+    # Scaling helper: inputs are feature matrices filled by features.py
+    def scale_transaction_features(self, X: np.ndarray) -> np.ndarray:
+        with STAGE_SECONDS.time("scale", "transaction_scaler"):
+            scaled = X.copy()
+            scaled[:, NUMERIC_COLUMNS] = self.scalers["transaction_scaler"].transform(X[:, NUMERIC_COLUMNS])
+        return scaled
+    
+    # Model and input matrix for a raw transaction matrix. Fused models take the raw
+    # features; the others take the scaled matrix, which callers can pass in to share
+    def transaction_model_input(self, name: str, X: np.ndarray, scaled: Optional[np.ndarray] = None):
+        # Isolation Forest reads a column slice of the transaction features
+        columns = ISOLATION_FOREST_COLUMNS if name == "isolation_forest" else slice(None)
+        if self.uses_fused_model(name, len(X)):
+            return self.fused_models[name], X[:, columns]
+        if scaled is None:
+            scaled = self.scale_transaction_features(X)
+        return self.tree_model(name, len(X)), scaled[:, columns]
+    
+    def behavioral_probabilities(self, B: np.ndarray) -> np.ndarray:
+        if self.uses_fused_model("behavioral_analysis", len(B)):
+            model, inputs = self.fused_models["behavioral_analysis"], B
+        else:
+            with STAGE_SECONDS.time("scale", "behavior_scaler"):
+                model, inputs = self.models["behavioral_analysis"], self.scalers["behavior_scaler"].transform(B)
+        with STAGE_SECONDS.time("predict", "behavioral_analysis"):
+            return model.predict_proba(inputs)[:, 1]
+
+# The model set requests are scored with; replaced as a whole by reload_models.
+# models and scalers are read-only views of its artifacts for the other modules
+active_model_set: Optional[ModelSet] = None
+models = RegistryView("model")
+scalers = RegistryView("scaler")
+reload_lock = threading.Lock()
+
+def current_models() -> ModelSet:
+    active = active_model_set
+    if active is None:
+        raise ValueError("Models are not loaded")
+    return active
+
+def activate(candidate: ModelSet):
+    global active_model_set
+    previous, active_model_set = active_model_set, candidate
+    models.bind(candidate.registry)
+    scalers.bind(candidate.registry)
+    # Cached results are keyed by version anyway; drop the old version's entries now
+    if result_cache is not None and previous is not None:
+        result_cache.clear()
+
+def open_model_set() -> ModelSet:
+    """Read the manifest in MODELS_DIR and check the required artifacts are listed"""
+    # Check if models directory exists
+    if not os.path.exists(MODELS_DIR):
+        raise ValueError(f"Models directory not found: {MODELS_DIR}")
+    
+    # Reading the manifest checks the declared feature layouts; nothing is unpickled yet
+    registry = ModelRegistry(MODELS_DIR)
+    
+    # Verify required models and scalers are present
+    missing_models = [model for model in REQUIRED_MODELS if model not in registry]
+    missing_scalers = [scaler for scaler in REQUIRED_SCALERS if scaler not in registry]
+    
+    if missing_models or missing_scalers:
+        raise ValueError(
+            f"Missing required models: {missing_models}, "
+            f"Missing required scalers: {missing_scalers}"
+        )
+    return ModelSet(registry)
+
+def warm_model_set(candidate: ModelSet):
+    try:
+        start = time.perf_counter()
+        candidate.warm()
+        logger.info("All models and scalers loaded successfully", extra={"fields": {
+            "version": candidate.version,
+            "tree_engine": TREE_ENGINE,
+            "fused_scalers": FUSE_SCALERS,
+            "models": list(candidate.models),
+            "scalers": list(candidate.scalers),
+            "warm_ms": elapsed_ms(start)
+        }})
+    except Exception:
+        logger.exception("Error warming models")
+        if MODEL_LOADING == "eager":
+            raise
+
+# Open the registry at startup; the artifacts themselves load per MODEL_LOADING
 def load_models():
     try:
-        print(f"Loading models from directory: {MODELS_DIR}")  # Debug log
-        
-        # Check if models directory exists
-        if not os.path.exists(MODELS_DIR):
-            raise ValueError(f"Models directory not found: {MODELS_DIR}")
-            
-        # List all files in models directory
-        files = os.listdir(MODELS_DIR)
-        print(f"Found files in models directory: {files}")  # Debug log
-        
-        # Load all model files from the models directory
-        for file in files:
-            if file.endswith('.pth'):
-                model_name = file.replace("_agent.pth", "").replace(".pth", "")
-                file_path = os.path.join(MODELS_DIR, file)
-                print(f"Loading {model_name} from {file_path}")  # Debug log
-                
-                if "scaler" in model_name:
-                    scalers[model_name] = joblib.load(file_path)
-                    print(f"Loaded scaler: {model_name}")  # Debug log
-                else:
-                    models[model_name] = joblib.load(file_path)
-                    print(f"Loaded model: {model_name}")  # Debug log
-        
-        # Verify required models and scalers are loaded
-        required_models = ["isolation_forest", "transaction_monitoring", "behavioral_analysis", "risk_scoring"]
-        required_scalers = ["transaction_scaler", "behavior_scaler"]
-        
-        missing_models = [model for model in required_models if model not in models]
-        missing_scalers = [scaler for scaler in required_scalers if scaler not in scalers]
-        
-        if missing_models or missing_scalers:
-            raise ValueError(
-                f"Missing required models: {missing_models}, "
-                f"Missing required scalers: {missing_scalers}"
-            )
-        
-        print("All models and scalers loaded successfully")
-        print(f"Loaded models: {list(models.keys())}")
-        print(f"Loaded scalers: {list(scalers.keys())}")
-    except Exception as e:
-        print(f"Error loading models: {str(e)}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
+        logger.info("Loading models", extra={"fields": {"models_dir": MODELS_DIR, "model_loading": MODEL_LOADING}})
+        candidate = open_model_set()
+        if MODEL_LOADING == "eager":
+            warm_model_set(candidate)
+        activate(candidate)
+        if MODEL_LOADING == "background":
+            threading.Thread(target=warm_model_set, args=(candidate,), name="model-warmup", daemon=True).start()
+        
+        logger.info("Model registry ready", extra={"fields": {
+            "version": candidate.version,
+            "model_loading": MODEL_LOADING,
+            "models": list(models),
+            "scalers": list(scalers)
+        }})
+    except Exception:
+        logger.exception("Error loading models")
         raise
 
 # Define request models
@@ -100,41 +291,345 @@ class PredictionResponse(BaseModel):
     fraud_probability: float
     model_name: str
     details: Dict[str, Union[float, str]]
+    model_version: Optional[str] = None  # manifest version of the model set that scored it
+
+class ScoreAllRequest(BaseModel):
+    transaction: TransactionRequest
+    behavioral: BehavioralRequest
+
+class ScoreAllResponse(BaseModel):
+    isolation_forest: PredictionResponse
+    transaction_monitoring: PredictionResponse
+    risk_scoring: PredictionResponse
+    behavioral_analysis: PredictionResponse
+
+# Cached results are stored as JSON in the shared backend
+def encode_cached_response(response: BaseModel) -> bytes:
+    return json.dumps({"all": isinstance(response, ScoreAllResponse), "response": response.model_dump()}).encode()
+
+def decode_cached_response(payload: bytes) -> BaseModel:
+    cached = json.loads(payload)
+    return (ScoreAllResponse if cached["all"] else PredictionResponse).model_validate(cached["response"])
+
+def response_version(response: BaseModel) -> Optional[str]:
+    return response.isolation_forest.model_version if isinstance(response, ScoreAllResponse) else response.model_version
+
+result_cache = open_cache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL, RESULT_CACHE_SHM,
+                          encode=encode_cached_response, decode=decode_cached_response)
+
+# Helper function to parse a batch body (JSON array or NDJSON) into request models
+async def parse_batch_request(request: Request, model_class):
+    body = await request.body()
+    content_type = request.headers.get("content-type", "")
+    try:
+        if "ndjson" in content_type or "jsonl" in content_type:
+            items = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            items = json.loads(body) if body.strip() else []
+        if not isinstance(items, list):
+            raise ValueError("Batch body must be a JSON array or NDJSON")
+        return [model_class(**item) for item in items]
+    except (ValueError, TypeError, ValidationError) as e:
+        raise HTTPException(status_code=422, detail=f"Invalid batch request: {str(e)}")
+
+# Response builders, shared by the per-model and the multi-model scoring paths
+def isolation_forest_responses(anomaly_scores: np.ndarray, version: Optional[str] = None) -> List[PredictionResponse]:
+    responses = []
+    for anomaly_score in anomaly_scores:
+        # IsolationForest.predict is -1 exactly where decision_function < 0
+        is_fraud = bool(anomaly_score < 0)
+        responses.append(PredictionResponse(
+            prediction="Fraudulent" if is_fraud else "Legitimate",
+            fraud_probability=float(1 - (anomaly_score + 0.5)),  # Convert anomaly score to probability-like value
+            model_name="Isolation Forest",
+            details={
+                "anomaly_score": float(anomaly_score),
+                "is_anomaly": str(is_fraud)
+            },
+            model_version=version
+        ))
+    return responses
 
-# Helper function to prepare transaction data
-def prepare_transaction_data(transaction: TransactionRequest):
-    # Create DataFrame from request data
-    df = pd.DataFrame({
-        'amount': [transaction.amount],
-        'oldbalanceOrg': [transaction.oldbalanceOrg],
-        'newbalanceOrig': [transaction.newbalanceOrig],
-        'oldbalanceDest': [transaction.oldbalanceDest],
-        'newbalanceDest': [transaction.newbalanceDest]
-    })
+def transaction_responses(fraud_probs: np.ndarray, version: Optional[str] = None) -> List[PredictionResponse]:
+    return [
+        PredictionResponse(
+            prediction="Fraudulent" if fraud_prob > 0.5 else "Legitimate",
+            fraud_probability=float(fraud_prob),
+            model_name="XGBoost Transaction Monitoring",
+            details={
+                "threshold": 0.5,
+                "features_used": FEATURES_USED
+            },
+            model_version=version
+        )
+        for fraud_prob in fraud_probs
+    ]
+
+def risk_responses(risk_probs: np.ndarray, version: Optional[str] = None) -> List[PredictionResponse]:
+    # Adjust risk levels with more lenient thresholds
+    return [
+        PredictionResponse(
+            prediction="High Risk" if risk_prob > 0.85 else "Low Risk",
+            fraud_probability=float(risk_prob),
+            model_name="LightGBM Risk Scoring",
+            details={
+                "risk_level": "High" if risk_prob > 0.85 else "Medium" if risk_prob > 0.6 else "Low",
+                "threshold": 0.85  # Updated threshold for high risk
+            },
+            model_version=version
+        )
+        for risk_prob in risk_probs
+    ]
+
+def behavioral_responses(behavior_probs: np.ndarray, version: Optional[str] = None) -> List[PredictionResponse]:
+    return [
+        PredictionResponse(
+            prediction="Suspicious Behavior" if behavior_prob > 0.5 else "Normal Behavior",
+            fraud_probability=float(behavior_prob),
+            model_name="Logistic Regression Behavioral Analysis",
+            details={
+                "behavior_profile": "Highly Suspicious" if behavior_prob > 0.8 else 
+                                   "Moderately Suspicious" if behavior_prob > 0.5 else
+                                   "Slightly Unusual" if behavior_prob > 0.3 else "Normal",
+                "threshold": 0.5
+            },
+            model_version=version
+        )
+        for behavior_prob in behavior_probs
+    ]
+
+# Vectorized scoring helpers: one scaler transform and one model call per matrix.
+# Each reads the active model set once, or scores with the one passed in
+def score_isolation_forest(X: np.ndarray, model_set: Optional[ModelSet] = None) -> List[PredictionResponse]:
+    active = model_set or current_models()
+    # One pass over the trees; the anomaly flag is derived from the score
+    model, inputs = active.transaction_model_input("isolation_forest", X)
+    with STAGE_SECONDS.time("predict", "isolation_forest"):
+        anomaly_scores = model.decision_function(inputs)
+    with STAGE_SECONDS.time("respond", "isolation_forest"):
+        return isolation_forest_responses(anomaly_scores, active.version)
+
+def score_transaction(X: np.ndarray, model_set: Optional[ModelSet] = None) -> List[PredictionResponse]:
+    active = model_set or current_models()
+    model, inputs = active.transaction_model_input("transaction_monitoring", X)
+    with STAGE_SECONDS.time("predict", "transaction_monitoring"):
+        fraud_probs = model.predict_proba(inputs)[:, 1]
+    with STAGE_SECONDS.time("respond", "transaction_monitoring"):
+        return transaction_responses(fraud_probs, active.version)
+
+def score_risk(X: np.ndarray, model_set: Optional[ModelSet] = None) -> List[PredictionResponse]:
+    active = model_set or current_models()
+    model, inputs = active.transaction_model_input("risk_scoring", X)
+    with STAGE_SECONDS.time("predict", "risk_scoring"):
+        risk_probs = model.predict_proba(inputs)[:, 1]
+    with STAGE_SECONDS.time("respond", "risk_scoring"):
+        return risk_responses(risk_probs, active.version)
+
+def score_behavioral(B: np.ndarray, model_set: Optional[ModelSet] = None) -> List[PredictionResponse]:
+    active = model_set or current_models()
+    behavior_probs = active.behavioral_probabilities(B)
+    with STAGE_SECONDS.time("respond", "behavioral_analysis"):
+        return behavioral_responses(behavior_probs, active.version)
+
+def score_all(X: np.ndarray, B: np.ndarray, model_set: Optional[ModelSet] = None) -> List[ScoreAllResponse]:
+    """Run all four models, scaling the transaction features at most once for all of them"""
+    active = model_set or current_models()
+    scaled = None
+    if not all(active.uses_fused_model(name, len(X)) for name in NATIVE_MODELS):
+        scaled = active.scale_transaction_features(X)
     
-    # Add derived features
-    df['balance_difference'] = df['oldbalanceOrg'] - df['newbalanceOrig']
-    df['dest_balance_difference'] = df['oldbalanceDest'] - df['newbalanceDest']
+    # XGBoost and LightGBM consume the same scaled matrix; Isolation Forest a column slice of it
+    model, inputs = active.transaction_model_input("isolation_forest", X, scaled)
+    with STAGE_SECONDS.time("predict", "isolation_forest"):
+        anomaly_scores = model.decision_function(inputs)
+    model, inputs = active.transaction_model_input("transaction_monitoring", X, scaled)
+    with STAGE_SECONDS.time("predict", "transaction_monitoring"):
+        fraud_probs = model.predict_proba(inputs)[:, 1]
+    model, inputs = active.transaction_model_input("risk_scoring", X, scaled)
+    with STAGE_SECONDS.time("predict", "risk_scoring"):
+        risk_probs = model.predict_proba(inputs)[:, 1]
+    behavior_probs = active.behavioral_probabilities(B)
     
-    # Add large_transaction feature (using 10000 as a default threshold)
-    df['large_transaction'] = (df['amount'] > 10000).astype(int)
+    with STAGE_SECONDS.time("respond", "all"):
+        return score_all_responses(anomaly_scores, fraud_probs, risk_probs, behavior_probs, active.version)
+
+def score_all_responses(anomaly_scores: np.ndarray, fraud_probs: np.ndarray, risk_probs: np.ndarray,
+                        behavior_probs: np.ndarray, version: Optional[str]) -> List[ScoreAllResponse]:
+    return [
+        ScoreAllResponse(
+            isolation_forest=iso,
+            transaction_monitoring=transaction,
+            risk_scoring=risk,
+            behavioral_analysis=behavior
+        )
+        for iso, transaction, risk, behavior in zip(
+            isolation_forest_responses(anomaly_scores, version),
+            transaction_responses(fraud_probs, version),
+            risk_responses(risk_probs, version),
+            behavioral_responses(behavior_probs, version)
+        )
+    ]
+
+# Warm-up inputs a new model set must score sensibly before it replaces the active one:
+# one transaction of each type, plus a batch big enough to take the library paths
+# when TREE_ENGINE=native
+WARMUP_TRANSACTIONS = [
+    TransactionRequest(amount=amount, oldbalanceOrg=old_balance, newbalanceOrig=max(old_balance - amount, 0.0),
+                       oldbalanceDest=1000.0, newbalanceDest=1000.0 + amount, transaction_type=t_type)
+    for amount, old_balance, t_type in [
+        (181.0, 181.0, "TRANSFER"), (9839.64, 170136.0, "PAYMENT"), (229133.94, 15325.0, "CASH_OUT"),
+        (5337.77, 41720.0, "DEBIT"), (1000000.0, 1000000.0, "TRANSFER"), (250.0, 5000.0, None),
+    ]
+]
+WARMUP_BEHAVIOR = BehavioralRequest(
+    avg_transaction_amount=9839.64, max_transaction_amount=9839.64, transaction_amount_std=0.0,
+    avg_balance=170136.0, transaction_count=1, large_transaction_ratio=0.0, balance_change_mean=9839.64,
+    type_PAYMENT_ratio=1.0
+)
+WARMUP_BATCH_ROWS = 2 * max(NATIVE_TREE_MAX_ROWS.values())
+
+def validate_model_set(candidate: ModelSet):
+    """Score the warm-up inputs one at a time and as a batch; raise on a bad result"""
+    X = transaction_matrix(WARMUP_TRANSACTIONS)
+    B = behavioral_matrix([WARMUP_BEHAVIOR] * len(WARMUP_TRANSACTIONS))
+    rows = np.arange(WARMUP_BATCH_ROWS) % len(X)
+    for X_part, B_part in [(X[:1], B[:1]), (X, B), (X[rows], B[rows])]:
+        for result in score_all(X_part, B_part, candidate):
+            for name, response in result:
+                if not 0.0 <= response.fraud_probability <= 1.0:
+                    raise ValueError(
+                        f"Warm-up prediction from {name} in version {candidate.version} "
+                        f"is out of range: {response.fraud_probability}"
+                    )
+
+def reload_models(force: bool = False) -> Dict:
+    """Load MODELS_DIR as a new model set, validate it and swap it in.
     
-    # Add transaction type columns if provided
-    if transaction.transaction_type:
-        # Initialize all type columns to 0
-        transaction_types = ['CASH_OUT', 'DEBIT', 'PAYMENT', 'TRANSFER']
-        for t_type in transaction_types:
-            df[f'type_{t_type}'] = 0
-        
-        # Set the provided type to 1
-        if transaction.transaction_type in transaction_types:
-            df[f'type_{transaction.transaction_type}'] = 1
+    Requests already scoring keep the model set they started with. The active set
+    stays in place if anything fails.
+    """
+    with reload_lock:
+        previous = active_model_set
+        candidate = open_model_set()
+        unchanged = (previous is not None and candidate.version == previous.version
+                     and candidate.version != UNVERSIONED)
+        if unchanged and not force:
+            return {"reloaded": False, "version": previous.version}
+        
+        start = time.perf_counter()
+        candidate.warm()
+        validate_model_set(candidate)
+        activate(candidate)
+        result = {
+            "reloaded": True,
+            "previous_version": previous.version if previous is not None else None,
+            "version": candidate.version,
+            "reload_ms": elapsed_ms(start)
+        }
+        logger.info("Models reloaded", extra={"fields": result})
+        return result
+
+def manifest_signature():
+    try:
+        stat = os.stat(os.path.join(MODELS_DIR, MANIFEST_FILE))
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+def watch_models(interval: float):
+    """Reload whenever the manifest changes; training replaces it once all artifacts are written"""
+    last = manifest_signature()
+    while True:
+        time.sleep(interval)
+        signature = manifest_signature()
+        if signature == last:
+            continue
+        last = signature
+        try:
+            reload_models()
+        except Exception:
+            logger.exception("Error reloading models", extra={"fields": {"models_dir": MODELS_DIR}})
+
+async def run_inference(score: Callable, *args):
+    """Run a score_* call on the inference pool, or reject it when the pool is saturated"""
+    global inference_pending
+    if inference_executor is None:
+        return score(*args)
+    if inference_pending >= INFERENCE_MAX_PENDING:
+        raise HTTPException(status_code=503, detail="Inference queue is full, retry later",
+                            headers={"Retry-After": "1"})
+    # Only the event loop thread touches the counter
+    inference_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(inference_executor, score, *args)
+    finally:
+        inference_pending -= 1
+
+def start_micro_batchers():
+    for score in [score_isolation_forest, score_transaction, score_risk, score_behavioral, score_all]:
+        batcher = MicroBatcher(
+            score.__name__, score, run_inference,
+            max_rows=MICRO_BATCH_MAX_ROWS,
+            max_wait_ms=MICRO_BATCH_WAIT_MS,
+            slo_ms=MICRO_BATCH_SLO_MS,
+            max_concurrency=max(INFERENCE_THREADS, 1)
+        )
+        batcher.start()
+        micro_batchers[score.__name__] = batcher
+
+async def score_single(score: Callable, *args):
+    """Score one request's row: from the result cache, else coalesced with concurrent requests"""
+    target = SCORING_TARGETS[score.__name__]
+    key = None
+    if result_cache is not None:
+        with STAGE_SECONDS.time("cache", target):
+            version = current_models().version
+            key = feature_key(score.__name__, version, *args)
+            cached = result_cache.get(key)
+        if cached is not None:
+            return [cached]
+    
+    batcher = micro_batchers.get(score.__name__)
+    with STAGE_SECONDS.time("inference", target):
+        if batcher is None or not batcher.running:
+            results = await run_inference(score, *args)
+        else:
+            try:
+                results = await batcher.submit(*args)
+            except (QueueFull, SLOExceeded) as e:
+                raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     
-    return df
+    # A reload may have swapped the model set in between; only cache under the version that scored
+    if key is not None and response_version(results[0]) == version:
+        result_cache.put(key, results[0])
+    return results
+
+# Per-request debug record; only called when debug_request() sampled the request
+def log_prediction(route: str, request: BaseModel, features: np.ndarray, response: PredictionResponse, start: float):
+    logger.debug("Prediction", extra={"fields": {
+        "route": route,
+        "request": request.model_dump(),
+        "features": features.tolist(),
+        "prediction": response.prediction,
+        "fraud_probability": response.fraud_probability,
+        "latency_ms": elapsed_ms(start)
+    }})
 
 @app.on_event("startup")
 async def startup_event():
-    load_models()
+    # serve.py loads the models before forking its workers
+    if active_model_set is None:
+        load_models()
+    if MODEL_WATCH_INTERVAL > 0:
+        threading.Thread(target=watch_models, args=(MODEL_WATCH_INTERVAL,), name="model-watch", daemon=True).start()
+    if MICRO_BATCH_MAX_ROWS > 0:
+        start_micro_batchers()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    for batcher in micro_batchers.values():
+        await batcher.stop()
+    micro_batchers.clear()
 
 @app.get("/")
 async def root():
@@ -144,222 +639,250 @@ async def root():
             "/predict/isolation_forest",
             "/predict/transaction",
             "/predict/risk_scoring",
-            "/predict/behavioral"
+            "/predict/behavioral",
+            "/predict/all",
+            "/predict/isolation_forest/batch",
+            "/predict/transaction/batch",
+            "/predict/risk_scoring/batch",
+            "/predict/behavioral/batch",
+            "/predict/all/batch",
+            "/admin/models",
+            "/admin/reload",
+            "/admin/batching",
+            "/admin/cache",
+            "/metrics"
         ]
     }
 
+def check_admin_token(token: Optional[str]):
+    if API_ADMIN_TOKEN and token != API_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@app.get("/admin/models")
+async def admin_models(x_admin_token: Optional[str] = Header(default=None)):
+    check_admin_token(x_admin_token)
+    active = active_model_set
+    if active is None:
+        raise HTTPException(status_code=503, detail="Models are not loaded")
+    return {
+        "version": active.version,
+        "models_dir": MODELS_DIR,
+        "model_loading": MODEL_LOADING,
+        "tree_engine": TREE_ENGINE,
+        "fused_scalers": FUSE_SCALERS,
+        "artifacts": {name: active.registry.is_loaded(name) for name in active.registry.names()},
+        "reload_in_progress": reload_lock.locked()
+    }
+
+@app.post("/admin/reload")
+async def admin_reload(force: bool = False, x_admin_token: Optional[str] = Header(default=None)):
+    check_admin_token(x_admin_token)
+    if reload_lock.locked():
+        raise HTTPException(status_code=409, detail="A reload is already in progress")
+    try:
+        # Load and validate off the event loop; requests keep scoring with the current set
+        return await run_in_threadpool(reload_models, force)
+    except Exception as e:
+        logger.exception("Error reloading models", extra={"fields": {"models_dir": MODELS_DIR}})
+        raise HTTPException(status_code=500, detail=f"Reload failed, still serving the previous models: {str(e)}")
+
+@app.get("/admin/batching")
+async def admin_batching(x_admin_token: Optional[str] = Header(default=None)):
+    check_admin_token(x_admin_token)
+    return {
+        "enabled": bool(micro_batchers),
+        "max_rows": MICRO_BATCH_MAX_ROWS,
+        "max_wait_ms": MICRO_BATCH_WAIT_MS,
+        "slo_ms": MICRO_BATCH_SLO_MS,
+        "batchers": {
+            name: {**batcher.metrics.snapshot(), "service_time_ms": round(batcher.service_time * 1000, 3)}
+            for name, batcher in micro_batchers.items()
+        }
+    }
+
+@app.get("/metrics")
+async def metrics():
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+@app.get("/admin/cache")
+async def admin_cache(x_admin_token: Optional[str] = Header(default=None)):
+    check_admin_token(x_admin_token)
+    if result_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, "ttl_seconds": RESULT_CACHE_TTL, **result_cache.stats()}
+
 @app.post("/predict/isolation_forest", response_model=PredictionResponse)
 async def predict_isolation_forest(transaction: TransactionRequest):
+    debug = debug_request()
+    start = time.perf_counter() if debug else 0.0
     try:
-        print(f"Received transaction data: {transaction}")  # Debug log
-        
-        # Prepare features for Isolation Forest (needs all features for scaling)
-        df = prepare_transaction_data(transaction)
-        print(f"Prepared DataFrame: {df}")  # Debug log
-        
-        # Select features needed for Isolation Forest prediction
-        iso_features = ['amount', 'oldbalanceOrg', 'newbalanceOrig', 'oldbalanceDest', 'newbalanceDest']
-        
-        # Get all features needed for scaling
-        scaling_features = [
-            'amount', 'oldbalanceOrg', 'newbalanceOrig', 'oldbalanceDest', 'newbalanceDest',
-            'balance_difference', 'dest_balance_difference'
-        ]
-        
-        # Scale all required features
-        try:
-            scaled_features = scalers["transaction_scaler"].transform(df[scaling_features])
-            print(f"Scaled features shape: {scaled_features.shape}")  # Debug log
-            
-            # Select only the features needed for prediction after scaling
-            scaled_features_df = pd.DataFrame(scaled_features, columns=scaling_features)
-            prediction_features = scaled_features_df[iso_features]
-            print(f"Prediction features: {prediction_features}")  # Debug log
-        except Exception as e:
-            print(f"Error during scaling: {str(e)}")  # Debug log
-            raise
-        
         # Check if model exists
         if "isolation_forest" not in models:
             raise ValueError("Isolation Forest model not found. Please ensure models are loaded correctly.")
-            
-        # Get anomaly score and prediction
-        try:
-            anomaly_score = models["isolation_forest"].decision_function(prediction_features)[0]
-            prediction = models["isolation_forest"].predict(prediction_features)[0]
-            print(f"Anomaly score: {anomaly_score}, Prediction: {prediction}")  # Debug log
-        except Exception as e:
-            print(f"Error during prediction: {str(e)}")  # Debug log
-            raise
-        
-        # Isolation Forest returns -1 for anomalies and 1 for normal points
-        is_fraud = prediction == -1
         
-        return PredictionResponse(
-            prediction="Fraudulent" if is_fraud else "Legitimate",
-            fraud_probability=float(1 - (anomaly_score + 0.5)),  # Convert anomaly score to probability-like value
-            model_name="Isolation Forest",
-            details={
-                "anomaly_score": float(anomaly_score),
-                "is_anomaly": str(is_fraud)
-            }
-        )
+        # Prepare features for Isolation Forest (needs all numeric features for scaling)
+        with STAGE_SECONDS.time("features", "isolation_forest"):
+            X = transaction_row(transaction)
+        response = (await score_single(score_isolation_forest, X))[0]
+        if debug:
+            log_prediction("isolation_forest", transaction, X, response, start)
+        return response
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Detailed error in predict_isolation_forest: {str(e)}")  # Debug log
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")  # Debug log
+        logger.exception("Prediction error", extra={"fields": {"route": "isolation_forest"}})
         raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
 
 @app.post("/predict/transaction", response_model=PredictionResponse)
 async def predict_transaction(transaction: TransactionRequest):
+    debug = debug_request()
+    start = time.perf_counter() if debug else 0.0
     try:
-        print(f"Received transaction data: {transaction}")  # Debug log
-        
         # Prepare features for XGBoost
-        df = prepare_transaction_data(transaction)
-        print(f"Prepared DataFrame: {df}")  # Debug log
-        
-        # Get all columns that the XGBoost model was trained on
-        required_columns = [
-            'amount', 'oldbalanceOrg', 'newbalanceOrig', 'oldbalanceDest', 'newbalanceDest',
-            'balance_difference', 'dest_balance_difference', 'large_transaction'
-        ]
-        
-        # Add transaction type columns
-        transaction_types = ['CASH_OUT', 'DEBIT', 'PAYMENT', 'TRANSFER']
-        for t_type in transaction_types:
-            df[f'type_{t_type}'] = 0.0  # Initialize all types to 0
-        
-        # Set the provided type to 1 if it exists
-        if transaction.transaction_type in transaction_types:
-            df[f'type_{transaction.transaction_type}'] = 1.0
-        
-        required_columns.extend([f'type_{t_type}' for t_type in transaction_types])
-        print(f"Required columns: {required_columns}")  # Debug log
-        
-        # Scale numeric features
-        numeric_features = ['amount', 'oldbalanceOrg', 'newbalanceOrig', 'oldbalanceDest', 'newbalanceDest', 
-                           'balance_difference', 'dest_balance_difference']
-        
-        # Create a copy of the features for scaling
-        features_df = df[required_columns].copy()
-        features_df[numeric_features] = scalers["transaction_scaler"].transform(features_df[numeric_features])
-        print(f"Scaled features shape: {features_df.shape}")  # Debug log
-        
-        # Get prediction probabilities
-        fraud_prob = models["transaction_monitoring"].predict_proba(features_df)[0][1]
-        
-        return PredictionResponse(
-            prediction="Fraudulent" if fraud_prob > 0.5 else "Legitimate",
-            fraud_probability=float(fraud_prob),
-            model_name="XGBoost Transaction Monitoring",
-            details={
-                "threshold": 0.5,
-                "features_used": ", ".join(required_columns)
-            }
-        )
+        with STAGE_SECONDS.time("features", "transaction_monitoring"):
+            X = transaction_row(transaction)
+        response = (await score_single(score_transaction, X))[0]
+        if debug:
+            log_prediction("transaction", transaction, X, response, start)
+        return response
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error in predict_transaction: {str(e)}")  # Debug log
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")  # Debug log
+        logger.exception("Prediction error", extra={"fields": {"route": "transaction"}})
         raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
 
 @app.post("/predict/risk_scoring", response_model=PredictionResponse)
 async def predict_risk_scoring(transaction: TransactionRequest):
+    debug = debug_request()
+    start = time.perf_counter() if debug else 0.0
     try:
-        print(f"Received transaction data: {transaction}")  # Debug log
-        
         # Prepare features for LightGBM
-        df = prepare_transaction_data(transaction)
-        print(f"Prepared DataFrame: {df}")  # Debug log
-        
-        # Get all columns that the LightGBM model was trained on
-        required_columns = [
-            'amount', 'oldbalanceOrg', 'newbalanceOrig', 'oldbalanceDest', 'newbalanceDest',
-            'balance_difference', 'dest_balance_difference', 'large_transaction'
-        ]
-        
-        # Add transaction type columns
-        transaction_types = ['CASH_OUT', 'DEBIT', 'PAYMENT', 'TRANSFER']
-        for t_type in transaction_types:
-            df[f'type_{t_type}'] = 0.0  # Initialize all types to 0
-        
-        # Set the provided type to 1 if it exists
-        if transaction.transaction_type in transaction_types:
-            df[f'type_{transaction.transaction_type}'] = 1.0
-        
-        required_columns.extend([f'type_{t_type}' for t_type in transaction_types])
-        print(f"Required columns: {required_columns}")  # Debug log
-        
-        # Scale numeric features
-        numeric_features = ['amount', 'oldbalanceOrg', 'newbalanceOrig', 'oldbalanceDest', 'newbalanceDest', 
-                           'balance_difference', 'dest_balance_difference']
-        
-        # Create a copy of the features for scaling
-        features_df = df[required_columns].copy()
-        features_df[numeric_features] = scalers["transaction_scaler"].transform(features_df[numeric_features])
-        print(f"Scaled features shape: {features_df.shape}")  # Debug log
-        
-        # Get prediction probabilities
-        risk_prob = models["risk_scoring"].predict_proba(features_df)[0][1]
-        
-        # Adjust risk levels with more lenient thresholds
-        risk_level = "High" if risk_prob > 0.85 else "Medium" if risk_prob > 0.6 else "Low"
-        
-        return PredictionResponse(
-            prediction="High Risk" if risk_prob > 0.85 else "Low Risk",
-            fraud_probability=float(risk_prob),
-            model_name="LightGBM Risk Scoring",
-            details={
-                "risk_level": risk_level,
-                "threshold": 0.85  # Updated threshold for high risk
-            }
-        )
+        with STAGE_SECONDS.time("features", "risk_scoring"):
+            X = transaction_row(transaction)
+        response = (await score_single(score_risk, X))[0]
+        if debug:
+            log_prediction("risk_scoring", transaction, X, response, start)
+        return response
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error in predict_risk_scoring: {str(e)}")  # Debug log
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")  # Debug log
+        logger.exception("Prediction error", extra={"fields": {"route": "risk_scoring"}})
         raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
 
 @app.post("/predict/behavioral", response_model=PredictionResponse)
 async def predict_behavioral(behavior: BehavioralRequest):
     try:
-        # Convert behavioral features to DataFrame
-        df = pd.DataFrame({
-            'avg_transaction_amount': [behavior.avg_transaction_amount],
-            'max_transaction_amount': [behavior.max_transaction_amount],
-            'transaction_amount_std': [behavior.transaction_amount_std],
-            'avg_balance': [behavior.avg_balance],
-            'transaction_count': [behavior.transaction_count],
-            'large_transaction_ratio': [behavior.large_transaction_ratio],
-            'balance_change_mean': [behavior.balance_change_mean],
-            'type_CASH_OUT_ratio': [behavior.type_CASH_OUT_ratio],
-            'type_DEBIT_ratio': [behavior.type_DEBIT_ratio],
-            'type_PAYMENT_ratio': [behavior.type_PAYMENT_ratio],
-            'type_TRANSFER_ratio': [behavior.type_TRANSFER_ratio]
-        })
-        
-        # Scale features
-        scaled_features = scalers["behavior_scaler"].transform(df)
-        
-        # Get prediction probabilities
-        behavior_prob = models["behavioral_analysis"].predict_proba(scaled_features)[0][1]
-        
-        return PredictionResponse(
-            prediction="Suspicious Behavior" if behavior_prob > 0.5 else "Normal Behavior",
-            fraud_probability=float(behavior_prob),
-            model_name="Logistic Regression Behavioral Analysis",
-            details={
-                "behavior_profile": "Highly Suspicious" if behavior_prob > 0.8 else 
-                                   "Moderately Suspicious" if behavior_prob > 0.5 else
-                                   "Slightly Unusual" if behavior_prob > 0.3 else "Normal",
-                "threshold": 0.5
-            }
+        with STAGE_SECONDS.time("features", "behavioral_analysis"):
+            B = behavioral_matrix([behavior])
+        return (await score_single(score_behavioral, B))[0]
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+
+@app.post("/predict/all", response_model=ScoreAllResponse)
+async def predict_all(request: ScoreAllRequest):
+    try:
+        with STAGE_SECONDS.time("features", "all"):
+            X, B = transaction_row(request.transaction), behavioral_matrix([request.behavioral])
+        return (await score_single(score_all, X, B))[0]
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+
+@app.post("/predict/isolation_forest/batch", response_model=List[PredictionResponse])
+async def predict_isolation_forest_batch(request: Request):
+    transactions = await parse_batch_request(request, TransactionRequest)
+    if not transactions:
+        return []
+    try:
+        return await run_inference(score_isolation_forest, transaction_matrix(transactions))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+
+@app.post("/predict/transaction/batch", response_model=List[PredictionResponse])
+async def predict_transaction_batch(request: Request):
+    transactions = await parse_batch_request(request, TransactionRequest)
+    if not transactions:
+        return []
+    try:
+        return await run_inference(score_transaction, transaction_matrix(transactions))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+
+@app.post("/predict/risk_scoring/batch", response_model=List[PredictionResponse])
+async def predict_risk_scoring_batch(request: Request):
+    transactions = await parse_batch_request(request, TransactionRequest)
+    if not transactions:
+        return []
+    try:
+        return await run_inference(score_risk, transaction_matrix(transactions))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+
+@app.post("/predict/behavioral/batch", response_model=List[PredictionResponse])
+async def predict_behavioral_batch(request: Request):
+    behaviors = await parse_batch_request(request, BehavioralRequest)
+    if not behaviors:
+        return []
+    try:
+        return await run_inference(score_behavioral, behavioral_matrix(behaviors))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+
+@app.post("/predict/all/batch", response_model=List[ScoreAllResponse])
+async def predict_all_batch(request: Request):
+    items = await parse_batch_request(request, ScoreAllRequest)
+    if not items:
+        return []
+    try:
+        return await run_inference(
+            score_all,
+            transaction_matrix([item.transaction for item in items]),
+            behavioral_matrix([item.behavioral for item in items])
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
 
+# Values owned by other components, read when /metrics is scraped
+def model_info():
+    active = active_model_set
+    return {(active.version, TREE_ENGINE, str(FUSE_SCALERS).lower()): 1} if active is not None else {}
+
+def result_cache_events():
+    if result_cache is None:
+        return {}
+    stats = result_cache.stats()
+    return {(event,): stats[event] for event in ["hits", "misses", "evictions", "expirations", "invalidations"]}
+
+REGISTRY.register(CallbackMetric(
+    "fraudshield_api_model_info", "Model set being served", "gauge", ["version", "tree_engine", "fused_scalers"],
+    model_info
+))
+REGISTRY.register(CallbackMetric(
+    "fraudshield_api_result_cache_events_total", "Result cache lookups and removals", "counter", ["event"],
+    result_cache_events
+))
+REGISTRY.register(CallbackMetric(
+    "fraudshield_api_inference_pending", "Scoring calls queued or running on the inference pool", "gauge", [],
+    lambda: {(): inference_pending}
+))
+# Request counts and latency per route, around everything above
+app.add_middleware(MetricsMiddleware, routes=[route.path for route in app.routes], prefix="fraudshield_api")
+
 if __name__ == "__main__":
+    # One process; serve.py runs several workers that share the loaded models
     import uvicorn
     uvicorn.run(
         app, 
@@ -0,0 +1,93 @@
+"""Load test /process_transaction at increasing concurrency.
+
+Starts backend/api.py and backend/agent_server.py as local uvicorn processes
+and reports throughput and latency per concurrency level. With the async
+pipeline, throughput should grow with concurrency until the prediction API
+saturates instead of staying at the single-request rate, and the agent
+server's root endpoint (probe_p50_ms) should stay responsive under load.
+
+Run from backend/:  python -m benchmarks.bench_concurrency --requests 400 --concurrency 1 4 16 32
+Add --execution-mode parallel to measure the speculative fan-out.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+
+import httpx
+
+from benchmarks.common import agent_requests, serve_in_subprocess, summarize
+
+
+async def load(base_url: str, payloads: list, total: int, concurrency: int) -> dict:
+    queue = itertools.islice(itertools.cycle(payloads), total)
+    latencies = []
+    errors = 0
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120,
+                                 limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def worker():
+            nonlocal errors
+            for payload in queue:
+                start = time.perf_counter()
+                response = await client.post("/process_transaction", json=payload)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200 or response.json().get("status") == "error":
+                    errors += 1
+
+        # A blocked event loop shows up as slow responses to the trivial root endpoint
+        probe_latencies = []
+        done = asyncio.Event()
+
+        async def probe():
+            # Own connection, so the probe never queues behind the load pool
+            async with httpx.AsyncClient(base_url=base_url, timeout=120) as probe_client:
+                while not done.is_set():
+                    start = time.perf_counter()
+                    await probe_client.get("/")
+                    probe_latencies.append(time.perf_counter() - start)
+                    await asyncio.sleep(0.05)
+
+        probe_task = asyncio.create_task(probe())
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await probe_task
+
+    return {"concurrency": concurrency, "throughput_rps": total / elapsed, "errors": errors,
+            **summarize(latencies), "probe_p50_ms": summarize(probe_latencies)["p50_ms"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--backend", choices=["http", "local"], default="http")
+    parser.add_argument("--execution-mode", choices=["sequential", "parallel"], default="sequential")
+    parser.add_argument("--api-port", type=int, default=8770)
+    parser.add_argument("--agent-port", type=int, default=8771)
+    args = parser.parse_args()
+
+    payloads = [dict(p, include_messages=False) for p in agent_requests(limit=200)]
+
+    with serve_in_subprocess("api:app", args.api_port) as api_url:
+        agent_env = {
+            "API_BASE_URL": api_url,
+            "MODEL_BACKEND": args.backend,
+            "EXECUTION_MODE": args.execution_mode,
+            # The agents module builds its Groq client at import time; no request is sent
+            "GROQ_API_KEY": "benchmark",
+        }
+        with serve_in_subprocess("agent_server:app", args.agent_port, env=agent_env) as agent_url:
+            results = [
+                asyncio.run(load(agent_url, payloads, args.requests, concurrency))
+                for concurrency in args.concurrency
+            ]
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Per-request CPU time and allocations of process_transaction: graph rebuilt per
+request (the old behaviour) vs the cached compiled graph, with and without the
+message transcript. Models run in-process so no HTTP time is included.
+
+Run from backend/:  python -m benchmarks.bench_graph_overhead --requests 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import tracemalloc
+
+# The agents module builds its Groq client at import time; no request is sent
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+import agents
+from benchmarks.common import agent_requests
+
+
+async def run(requests_: list, include_messages: bool, rounds: int) -> dict:
+    inputs = [
+        (agents.TransactionData(**r["transaction"]), agents.BehavioralData(**r["behavioral"]))
+        for r in requests_
+    ]
+
+    # Best of several rounds, since model scoring dominates and is noisy
+    cpu_ms = float("inf")
+    for _ in range(rounds):
+        cpu_start = time.process_time()
+        for transaction, behavior in inputs:
+            agents.process_transaction(transaction, behavior, include_messages=include_messages)
+        cpu_ms = min(cpu_ms, (time.process_time() - cpu_start) * 1000.0 / len(inputs))
+
+    tracemalloc.start()
+    for transaction, behavior in inputs:
+        agents.process_transaction(transaction, behavior, include_messages=include_messages)
+    _, peak = tracemalloc.get_traced_memory()
+    blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.stop()
+
+    return {"cpu_ms_per_request": cpu_ms, "traced_peak_kib": peak / 1024.0, "live_blocks": blocks}
+
+
+async def main_async(args):
+    requests_ = agent_requests(limit=args.requests)
+    agents.set_model_backend("local")
+    agents.get_local_models()
+
+    results = {}
+    cached = agents.get_fraud_detection_graph
+    agents.get_fraud_detection_graph = agents.create_fraud_detection_graph
+    try:
+        results["rebuild_per_request"] = await run(requests_, include_messages=True, rounds=args.rounds)
+    finally:
+        agents.get_fraud_detection_graph = cached
+    results["cached_graph"] = await run(requests_, include_messages=True, rounds=args.rounds)
+    results["cached_graph_lean_state"] = await run(requests_, include_messages=False, rounds=args.rounds)
+    print(json.dumps(results, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=3)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Micro-benchmark of the single-transaction prediction handlers with per-request
+debug logging off (the production default) and fully on.
+
+The handlers are awaited directly, without HTTP, so the difference between
+the two runs is the cost of request logging. stdout and stderr go to
+/dev/null so terminal speed does not count.
+
+Run from backend/:  python -m benchmarks.bench_logging --requests 500
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import sys
+import time
+
+import api
+from benchmarks.common import agent_requests
+
+HANDLERS = ["predict_isolation_forest", "predict_transaction", "predict_risk_scoring"]
+
+
+async def time_handler(handler, requests_: list) -> float:
+    start = time.perf_counter()
+    for request in requests_:
+        await handler(request)
+    return (time.perf_counter() - start) * 1e6 / len(requests_)
+
+
+async def run(requests_: list) -> dict:
+    return {name: await time_handler(getattr(api, name), requests_) for name in HANDLERS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    requests_ = [api.TransactionRequest(**r["transaction"]) for r in agent_requests(limit=args.requests)]
+    sampler = getattr(api, "debug_request", None)
+    results = {}
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        logging.getLogger().handlers = [logging.StreamHandler(devnull)]
+        api.load_models()
+        asyncio.run(run(requests_[:20]))  # warm-up
+
+        if sampler is not None:
+            sampler.enabled = False
+            results["debug_off_us_per_call"] = asyncio.run(run(requests_))
+            sampler.enabled, sampler.sample_rate = True, 1.0
+            api.logger.setLevel(logging.DEBUG)
+            results["debug_on_us_per_call"] = asyncio.run(run(requests_))
+        else:
+            # Trees without the logging layer print unconditionally
+            results["unconditional_print_us_per_call"] = asyncio.run(run(requests_))
+
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Single-row /predict/all with and without request micro-batching.
+
+Starts backend/api.py twice, once with MICRO_BATCH_MAX_ROWS=0 (every
+request scored on its own) and once with the coalescer on, and drives
+single-transaction requests at increasing concurrency. With batching,
+throughput should keep growing with concurrency instead of staying at the
+single-request rate; requests the coalescer would have queued past
+MICRO_BATCH_SLO_MS come back as 503s and are counted as errors.
+/admin/batching's batch size and queue delay histograms show how many rows
+each model call actually got.
+
+Before timing, every payload is scored through both servers and the
+responses compared, so batching must not change any prediction. The load
+comes from several client processes (--clients): one asyncio client with
+dozens of connections slows down enough to hide the server's behaviour.
+
+Run from backend/:  python -m benchmarks.bench_micro_batching --requests 2000 --concurrency 1 8 32 64 --clients 4
+"""
+import argparse
+import asyncio
+import json
+import math
+
+import httpx
+
+from benchmarks.common import agent_requests, post_from_processes, serve_in_subprocess, summarize
+
+
+def load(base_url: str, payloads: list, total: int, clients: int, concurrency: int) -> dict:
+    latencies, errors, elapsed = post_from_processes(base_url, "/predict/all", payloads, total, clients,
+                                                     max(concurrency // clients, 1))
+    return {
+        "concurrency": concurrency,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "errors": errors,
+        **{key: round(value, 2) for key, value in summarize(latencies).items()},
+    }
+
+
+async def score_each(base_url: str, payloads: list, concurrency: int) -> list:
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def score(payload):
+            async with semaphore:
+                response = await client.post("/predict/all", json=payload)
+                response.raise_for_status()
+                return response.json()
+
+        return await asyncio.gather(*(score(payload) for payload in payloads))
+
+
+def same_predictions(a: dict, b: dict) -> bool:
+    # Probabilities may differ in the last bits: BLAS sums a batch in a different order
+    return all(
+        a[model]["prediction"] == b[model]["prediction"]
+        and math.isclose(a[model]["fraud_probability"], b[model]["fraud_probability"], rel_tol=1e-9, abs_tol=1e-12)
+        for model in a
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64],
+                        help="open connections in total, split over the client processes")
+    parser.add_argument("--clients", type=int, default=4, help="load generator processes")
+    parser.add_argument("--max-rows", type=int, default=64)
+    parser.add_argument("--wait-ms", type=float, default=2.0)
+    parser.add_argument("--slo-ms", type=float, default=50.0)
+    parser.add_argument("--port", type=int, default=8790)
+    args = parser.parse_args()
+
+    payloads = agent_requests(limit=500)
+    settings = {
+        "unbatched": {"MICRO_BATCH_MAX_ROWS": "0"},
+        "batched": {"MICRO_BATCH_MAX_ROWS": str(args.max_rows), "MICRO_BATCH_WAIT_MS": str(args.wait_ms),
+                    "MICRO_BATCH_SLO_MS": str(args.slo_ms)},
+    }
+    results, parity = {}, {}
+    for name, env in settings.items():
+        # A generous pending limit so the comparison measures batching, not load shedding
+        env = {**env, "LOG_LEVEL": "WARNING", "INFERENCE_MAX_PENDING": "1024"}
+        with serve_in_subprocess("api:app", args.port, env=env) as base_url:
+            parity[name] = asyncio.run(score_each(base_url, payloads, max(args.concurrency)))
+            results[name] = [load(base_url, payloads, args.requests, min(args.clients, concurrency), concurrency)
+                             for concurrency in args.concurrency]
+            if name == "batched":
+                batching = httpx.get(f"{base_url}/admin/batching").json()["batchers"]["score_all"]
+                results["batching_metrics"] = {
+                    key: batching[key] for key in ["requests", "batches", "rejected_slo", "rejected_queue_full"]
+                }
+                results["batching_metrics"]["mean_batch_size"] = batching["batch_size"]["mean"]
+                results["batching_metrics"]["mean_queue_delay_ms"] = round(
+                    batching["queue_delay_seconds"]["mean"] * 1000, 3
+                )
+
+    mismatches = sum(not same_predictions(a, b) for a, b in zip(parity["unbatched"], parity["batched"]))
+    results["parity"] = {"payloads": len(payloads), "mismatches": mismatches}
+    print(json.dumps(results, indent=2))
+    if mismatches:
+        raise SystemExit(f"{mismatches} responses differ between batched and unbatched scoring")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Compare end-to-end /process_transaction latency with the HTTP and local model backends.
+
+Both backends must score the same inputs, so the run also checks that
+every response matches between them (model results, reason, step and
+messages), as well as every direct model call (call_isolation_forest,
+call_transaction_monitoring, call_risk_scoring, call_behavioral_analysis,
+call_all_models), and exits with status 1 on any mismatch. The decision cache is
+off, or the second backend would be answered from the first one's cache.
+
+Run from backend/:  python -m benchmarks.bench_model_backends --requests 200
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+# The agents module builds its Groq client at import time; no request is sent
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+os.environ["DECISION_CACHE_SIZE"] = "0"
+
+from fastapi.testclient import TestClient
+
+import agents
+import api
+import agent_server
+from benchmarks.common import agent_requests, serve_in_thread, summarize
+
+
+def run(client: TestClient, requests_: list, warmup: int) -> tuple:
+    for payload in requests_[:warmup]:
+        client.post("/process_transaction", json=payload)
+
+    latencies, responses = [], []
+    for payload in requests_:
+        start = time.perf_counter()
+        response = client.post("/process_transaction", json=payload)
+        latencies.append(time.perf_counter() - start)
+        response.raise_for_status()
+        # status flips from pending to processed in the background, on its own clock
+        responses.append({key: value for key, value in response.json().items() if key != "status"})
+    return summarize(latencies), responses
+
+
+def call_models(requests_: list) -> list:
+    """Results of every direct model call for each request, with the current backend"""
+    results = []
+    for payload in requests_:
+        transaction = agents.TransactionData(**payload["transaction"])
+        behavior = agents.BehavioralData(**payload["behavioral"])
+        results.append({
+            "isolation_forest": agents.call_isolation_forest(transaction),
+            "transaction_monitoring": agents.call_transaction_monitoring(transaction),
+            "risk_scoring": agents.call_risk_scoring(transaction),
+            "behavioral_analysis": agents.call_behavioral_analysis(behavior),
+            "all": agents.call_all_models(transaction, behavior),
+        })
+    return results
+
+
+def mismatches(http_responses: list, local_responses: list) -> list:
+    """Indexes of the requests whose responses differ between the backends"""
+    return [i for i, (http, local) in enumerate(zip(http_responses, local_responses)) if http != local]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    requests_ = agent_requests(limit=args.requests)
+    results = {}
+
+    with TestClient(agent_server.app) as client:
+        # HTTP mode: the prediction API runs on a local port
+        with serve_in_thread(api.app, args.port) as base_url:
+            agents.API_BASE_URL = base_url
+            agents.set_model_backend("http")
+            results["http"], http_responses = run(client, requests_, args.warmup)
+            http_calls = call_models(requests_)
+
+        agents.set_model_backend("local")
+        agents.get_local_models()
+        results["local"], local_responses = run(client, requests_, args.warmup)
+        local_calls = call_models(requests_)
+
+    results["speedup_p50"] = results["http"]["p50_ms"] / results["local"]["p50_ms"]
+    different = mismatches(http_responses, local_responses)
+    different_calls = mismatches(http_calls, local_calls)
+    results["parity"] = {"requests": len(requests_), "response_mismatches": different[:10],
+                         "model_call_mismatches": different_calls[:10],
+                         "mismatches": len(different) + len(different_calls)}
+    print(json.dumps(results, indent=2))
+    if results["parity"]["mismatches"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
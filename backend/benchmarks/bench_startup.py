@@ -0,0 +1,105 @@
+"""Cold import and time-to-serving of the backend services.
+
+For each module, runs `python -X importtime -c "import <module>"` in a
+fresh interpreter and reports the total import time plus the most expensive
+top-level imports (cumulative, in ms). Then starts each app under uvicorn
+and measures the time from process start until its root endpoint answers.
+
+Everything runs without GROQ_API_KEY and with the HTTP(S) proxies pointed
+at a closed local port, so an import that needs an API key or the network
+fails or shows up as slow here, the way it would on an offline machine.
+
+Run from backend/:  python -m benchmarks.bench_startup [--modules agents agent_server api] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Dict, List
+
+from benchmarks.common import BACKEND_DIR
+
+# Nothing listens on the discard port; requests through these proxies fail immediately
+OFFLINE_ENV = {"HTTP_PROXY": "http://127.0.0.1:9", "HTTPS_PROXY": "http://127.0.0.1:9",
+               "http_proxy": "http://127.0.0.1:9", "https_proxy": "http://127.0.0.1:9",
+               "NO_PROXY": "127.0.0.1,localhost", "no_proxy": "127.0.0.1,localhost"}
+
+APPS = {"agent_server": "agent_server:app", "api": "api:app"}
+
+
+def offline_env() -> Dict[str, str]:
+    env = {key: value for key, value in os.environ.items() if key != "GROQ_API_KEY"}
+    return {**env, **OFFLINE_ENV, "LOG_LEVEL": "WARNING"}
+
+
+def import_profile(module: str, top: int) -> Dict:
+    """Parse -X importtime output: total and the slowest imports directly under module"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=BACKEND_DIR,
+                            env=offline_env(), capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        imports.append((depth, name.strip(), int(cumulative_us)))
+
+    total_us = next(cumulative for depth, name, cumulative in imports if depth == 0 and name == module)
+    # Children of the module itself are printed before it, one level deeper
+    children = sorted(((cumulative, name) for depth, name, cumulative in imports if depth == 1), reverse=True)
+    return {
+        "module": module,
+        "import_ms": round(total_us / 1000, 1),
+        "slowest": {name: round(cumulative / 1000, 1) for cumulative, name in children[:top]},
+    }
+
+
+def time_to_serving(app_path: str, port: int, timeout: float = 60.0) -> float:
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app_path, "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=offline_env(), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    try:
+        while True:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1).close()
+                return time.perf_counter() - start
+            except OSError:
+                if process.poll() is not None:
+                    raise RuntimeError(f"{app_path} exited during startup:\n{process.stderr.read().decode()[-2000:]}")
+                if time.perf_counter() - start > timeout:
+                    raise RuntimeError(f"{app_path} did not start within {timeout} s")
+                time.sleep(0.01)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modules", nargs="+", default=["agents", "agent_server", "api"])
+    parser.add_argument("--top", type=int, default=8, help="slowest direct imports to list")
+    parser.add_argument("--repeat", type=int, default=3, help="startups per app; the median is reported")
+    parser.add_argument("--port", type=int, default=8810)
+    args = parser.parse_args()
+
+    results: List[Dict] = []
+    for module in args.modules:
+        result = import_profile(module, args.top)
+        if module in APPS:
+            timings = sorted(time_to_serving(APPS[module], args.port) for _ in range(args.repeat))
+            result["serving_seconds"] = round(timings[len(timings) // 2], 3)
+        results.append(result)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
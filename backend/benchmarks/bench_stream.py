@@ -0,0 +1,68 @@
+"""Sustained throughput of the Kafka stream consumer against the in-memory broker.
+
+Publishes the sample dataset to an in-memory financial_transactions topic
+(the same messages kafka/src/producer.ts sends: every CSV field as a
+string, keyed by nameOrig), drains it with StreamScorer at each batch size,
+and checks that every transaction got exactly one decision and that the
+committed offsets reached the end of every partition.
+
+Run from backend/:  python -m benchmarks.bench_stream --transactions 20000 --batch-sizes 1 50 500
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import time
+
+import api
+from benchmarks.common import read_sample_rows
+from feature_store import AccountFeatureStore
+from memory_broker import InMemoryBroker
+from stream_consumer import INPUT_TOPIC, OUTPUT_TOPIC, StreamScorer, ThroughputMeter, single_transaction_behavior
+
+
+def run(rows: list, total: int, batch_size: int, behavior: str) -> dict:
+    broker = InMemoryBroker()
+    producer = broker.producer()
+    for row in itertools.islice(itertools.cycle(rows), total):
+        producer.send(INPUT_TOPIC, key=row["nameOrig"].encode(), value=json.dumps(row).encode())
+
+    behavior_source = AccountFeatureStore().observe_batch if behavior == "store" else single_transaction_behavior
+    scorer = StreamScorer(broker.consumer(INPUT_TOPIC, "benchmark"), broker.producer(),
+                          batch_size=batch_size, poll_timeout_ms=0, behavior_source=behavior_source,
+                          meter=ThroughputMeter(report_interval=1e9))
+    start = time.perf_counter()
+    scorer.run(stop_when_idle=True)
+    elapsed = time.perf_counter() - start
+
+    decisions = broker.records(OUTPUT_TOPIC)
+    scored = {(d["partition"], d["offset"]) for d in (json.loads(record.value) for record in decisions)}
+    return {
+        "batch_size": batch_size,
+        "behavior": behavior,
+        "transactions": total,
+        "throughput_tps": round(total / elapsed, 1),
+        "sustained_tps": scorer.meter.snapshot()["sustained_tps"],
+        "decisions_ok": len(decisions) == total and len(scored) == total,
+        "offsets_committed": broker.committed("benchmark", INPUT_TOPIC) == broker.end_offsets(INPUT_TOPIC),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transactions", type=int, default=20000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 50, 500])
+    parser.add_argument("--behavior", choices=["store", "single"], default="store",
+                        help="per-account feature store or the stateless single-transaction profile")
+    args = parser.parse_args()
+
+    rows = read_sample_rows()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        api.load_models()
+    results = [run(rows, args.transactions, batch_size, args.behavior) for batch_size in args.batch_sizes]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Per-event cost of the sliding-window features as an account's history grows.
+
+Feeds one account a long stream of transactions (several per step) through
+WindowedFeatureStore and times consecutive slices of the stream. The
+per-event cost should stay flat however long the history gets. For
+contrast, the same windows are recomputed by rescanning the full history
+with NumPy, which grows linearly.
+
+Run from backend/:  python -m benchmarks.bench_windows --events 100000 --per-step 20
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks.common import read_sample_rows
+from window_features import BEHAVIOR_WINDOWS, WindowedFeatureStore
+
+
+def event_stream(rows: list, total: int, per_step: int) -> list:
+    return [
+        {"nameOrig": "C0", "step": i // per_step, "amount": float(row["amount"]),
+         "oldbalanceOrg": float(row["oldbalanceOrg"]), "newbalanceOrig": float(row["newbalanceOrig"]),
+         "transaction_type": row["type"]}
+        for i, row in zip(range(total), (rows[i % len(rows)] for i in range(total)))
+    ]
+
+
+def rescan_us(events: list, upto: int, samples: int) -> float:
+    # Rebuild the window aggregates from the whole history on each event
+    steps = np.array([e["step"] for e in events[:upto]])
+    amounts = np.array([e["amount"] for e in events[:upto]])
+    start = time.perf_counter()
+    for i in range(upto - samples, upto):
+        for length in BEHAVIOR_WINDOWS:
+            window = amounts[:i + 1][steps[:i + 1] > steps[i] - length]
+            window.mean(), window.max(), window.std(ddof=1) if window.size > 1 else 0.0
+    return (time.perf_counter() - start) * 1e6 / samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--per-step", type=int, default=20, help="transactions per step for the account")
+    parser.add_argument("--slices", type=int, default=5)
+    args = parser.parse_args()
+
+    events = event_stream(read_sample_rows(), args.events, args.per_step)
+    store = WindowedFeatureStore()
+    slice_size = args.events // args.slices
+    results = []
+    for k in range(args.slices):
+        chunk = events[k * slice_size:(k + 1) * slice_size]
+        start = time.perf_counter()
+        for event in chunk:
+            store.observe_batch([event])
+        elapsed = time.perf_counter() - start
+        history = (k + 1) * slice_size
+        results.append({
+            "history_events": history,
+            "window_us_per_event": round(elapsed * 1e6 / len(chunk), 2),
+            "rescan_us_per_event": round(rescan_us(events, history, samples=200), 2),
+        })
+    print(json.dumps({"windows": BEHAVIOR_WINDOWS, "per_step": args.per_step, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Throughput scaling and shared model memory of serve.py across worker counts.
+
+Starts `python serve.py api:app --workers N` for each N and drives
+/predict/all with single-transaction requests from several client
+processes, so the load generator is not the bottleneck on one core.
+Reports throughput, latency and the scaling efficiency against one
+worker: throughput(N) / (N * throughput(1)). Near-linear scaling needs at
+least N free cores for the workers plus some for the clients.
+
+Memory comes from /proc/<pid>/smaps_rollup of each worker: shared_mb is
+what the workers share with the preloading parent (the models), private_mb
+what each worker holds on its own, and pss_mb the proportional share.
+
+Run from backend/:  python -m benchmarks.bench_workers --workers 1 2 4 --clients 4 --requests 4000
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.common import BACKEND_DIR, agent_requests, post_from_processes, summarize, wait_until_serving
+
+
+def worker_memory(parent_pid: int) -> Dict[str, float]:
+    """Average smaps_rollup figures over the parent's child processes, in MB"""
+    with open(f"/proc/{parent_pid}/task/{parent_pid}/children") as f:
+        pids = [int(pid) for pid in f.read().split()]
+    totals = {"rss_mb": 0.0, "pss_mb": 0.0, "shared_mb": 0.0, "private_mb": 0.0}
+    for pid in pids:
+        fields = {}
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1]) / 1024.0
+        totals["rss_mb"] += fields["Rss"]
+        totals["pss_mb"] += fields["Pss"]
+        totals["shared_mb"] += fields["Shared_Clean"] + fields["Shared_Dirty"]
+        totals["private_mb"] += fields["Private_Clean"] + fields["Private_Dirty"]
+    return {"worker_processes": len(pids), **{key: round(value / max(len(pids), 1), 1) for key, value in totals.items()}}
+
+
+def run(workers: int, port: int, payloads: list, total: int, clients: int, concurrency: int) -> Dict:
+    process = subprocess.Popen(
+        [sys.executable, "serve.py", "api:app", "--workers", str(workers), "--host", "127.0.0.1",
+         "--port", str(port)],
+        cwd=BACKEND_DIR, env={**os.environ, "LOG_LEVEL": "WARNING"}, stdout=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_serving(base_url, process)
+        # Warm every worker's connection and model paths before timing
+        asyncio.run(_warm(base_url, payloads, 20 * workers))
+
+        latencies, errors, elapsed = post_from_processes(base_url, "/predict/all", payloads, total, clients,
+                                                         concurrency)
+        memory = worker_memory(process.pid)
+    finally:
+        process.terminate()
+        process.wait()
+
+    return {
+        "workers": workers,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "errors": errors,
+        **{key: round(value, 2) for key, value in summarize(latencies).items()},
+        **memory,
+    }
+
+
+async def _warm(base_url: str, payloads: list, count: int):
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        await asyncio.gather(*(client.post("/predict/all", json=payload)
+                               for payload in itertools.islice(itertools.cycle(payloads), count)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=4, help="load generator processes")
+    parser.add_argument("--concurrency", type=int, default=8, help="connections per client process")
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--port", type=int, default=8780)
+    args = parser.parse_args()
+
+    payloads = agent_requests(limit=200)
+    results: List[Dict] = []
+    for workers in args.workers:
+        results.append(run(workers, args.port, payloads, args.requests, args.clients, args.concurrency))
+        baseline = results[0]["throughput_rps"] / results[0]["workers"]
+        results[-1]["scaling_efficiency"] = round(results[-1]["throughput_rps"] / (workers * baseline), 2)
+    print(json.dumps({"cpu_count": os.cpu_count(), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
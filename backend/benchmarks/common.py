@@ -0,0 +1,189 @@
+import asyncio
+import contextlib
+import csv
+import itertools
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from features import LARGE_TRANSACTION_THRESHOLD
+
+# Sample data shipped with the frontend (same schema as Fraud.csv)
+SAMPLE_DATASET = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "frontend", "public", "trimmed_dataset.csv"
+)
+
+
+def read_sample_rows(path: str = SAMPLE_DATASET, limit: Optional[int] = None) -> List[Dict]:
+    rows = []
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            rows.append(row)
+            if limit is not None and len(rows) >= limit:
+                break
+    return rows
+
+
+def transaction_payload(row: Dict) -> Dict:
+    return {
+        "amount": float(row["amount"]),
+        "oldbalanceOrg": float(row["oldbalanceOrg"]),
+        "newbalanceOrig": float(row["newbalanceOrig"]),
+        "oldbalanceDest": float(row["oldbalanceDest"]),
+        "newbalanceDest": float(row["newbalanceDest"]),
+        "transaction_type": row["type"],
+    }
+
+
+def behavioral_payload(row: Dict) -> Dict:
+    # Single-transaction profile, as the frontend builds for a new account
+    amount = float(row["amount"])
+    return {
+        "avg_transaction_amount": amount,
+        "max_transaction_amount": amount,
+        "transaction_amount_std": 0.0,
+        "avg_balance": float(row["oldbalanceOrg"]),
+        "transaction_count": 1,
+        "large_transaction_ratio": 1.0 if amount > LARGE_TRANSACTION_THRESHOLD else 0.0,
+        # Same sign as training and the feature store: what left the origin account
+        "balance_change_mean": float(row["oldbalanceOrg"]) - float(row["newbalanceOrig"]),
+        "type_CASH_OUT_ratio": 1.0 if row["type"] == "CASH_OUT" else 0.0,
+        "type_DEBIT_ratio": 1.0 if row["type"] == "DEBIT" else 0.0,
+        "type_PAYMENT_ratio": 1.0 if row["type"] == "PAYMENT" else 0.0,
+        "type_TRANSFER_ratio": 1.0 if row["type"] == "TRANSFER" else 0.0,
+    }
+
+
+def agent_requests(limit: Optional[int] = None) -> List[Dict]:
+    return [
+        {"transaction": transaction_payload(row), "behavioral": behavioral_payload(row)}
+        for row in read_sample_rows(limit=limit)
+    ]
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds"""
+    samples = np.asarray(latencies) * 1000.0
+    return {
+        "count": int(samples.size),
+        "mean_ms": float(samples.mean()),
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p95_ms": float(np.percentile(samples, 95)),
+        "p99_ms": float(np.percentile(samples, 99)),
+        "max_ms": float(samples.max()),
+    }
+
+
+@contextlib.contextmanager
+def serve_in_thread(app, port: int) -> Iterator[str]:
+    """Run a FastAPI app on a local port for the duration of the block"""
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+# backend/ directory, the working directory the services expect (models/ is relative)
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@contextlib.contextmanager
+def serve_in_subprocess(app_path: str, port: int, env: Optional[Dict[str, str]] = None,
+                        extra_args: Optional[List[str]] = None, startup_timeout: float = 60.0) -> Iterator[str]:
+    """Run `uvicorn <app_path>` from backend/ in a child process for the duration of the block"""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app_path, "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"] + (extra_args or []),
+        cwd=BACKEND_DIR,
+        env={**os.environ, **(env or {})},
+        stdout=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_serving(base_url, process, startup_timeout)
+        yield base_url
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def wait_until_serving(base_url: str, process: subprocess.Popen, timeout: float = 60.0):
+    """Poll the server's root endpoint until it answers; raise if the process exits or times out"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            urllib.request.urlopen(f"{base_url}/", timeout=1).close()
+            return
+        except OSError:
+            if process.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError(f"Server for {base_url} failed to start")
+            time.sleep(0.1)
+
+
+def _client_process(base_url: str, path: str, payloads: list, total: int, concurrency: int, results):
+    import httpx
+
+    async def run():
+        queue = itertools.islice(itertools.cycle(payloads), total)
+        latencies, errors = [], 0
+        async with httpx.AsyncClient(base_url=base_url, timeout=60,
+                                     limits=httpx.Limits(max_connections=concurrency)) as client:
+            async def worker():
+                nonlocal errors
+                for payload in queue:
+                    start = time.perf_counter()
+                    response = await client.post(path, json=payload)
+                    latencies.append(time.perf_counter() - start)
+                    errors += response.status_code != 200
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return latencies, errors
+
+    results.put(asyncio.run(run()))
+
+
+def post_from_processes(base_url: str, path: str, payloads: list, total: int, clients: int,
+                        concurrency: int) -> Tuple[List[float], int, float]:
+    """POST total payloads from several client processes, each with concurrency connections.
+
+    One asyncio client with many connections slows down with the connection
+    count and, on a small machine, ends up measuring itself; splitting the
+    load keeps the server the bottleneck. Returns (latencies, errors, elapsed seconds).
+    """
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_client_process,
+                                         args=(base_url, path, payloads, total // clients, concurrency, results))
+                 for _ in range(clients)]
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    outcomes = [results.get() for _ in processes]
+    elapsed = time.perf_counter() - start
+    for process in processes:
+        process.join()
+    return [latency for outcome in outcomes for latency in outcome[0]], sum(outcome[1] for outcome in outcomes), elapsed
+
+
+def process_memory(pid: int) -> Dict[str, float]:
+    """Current and peak resident set size of a process, in MB"""
+    fields = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name in ("VmRSS", "VmHWM"):
+                fields[name] = int(value.split()[0]) / 1024.0
+    return {"rss_mb": round(fields["VmRSS"], 1), "peak_rss_mb": round(fields["VmHWM"], 1)}
@@ -0,0 +1,104 @@
+"""Compare two benchmarks.suite result files and flag regressions.
+
+Every numeric result present in both files is compared. Metrics ending in
+_ms or _mb, and error counts, are better lower; _rps and rows_per_s are
+better higher; anything else (counts, settings, and max_ms, which is a
+single sample) is listed but never judged. A change past --tolerance in
+the worse direction is a regression, and the exit status is 1 when there
+is at least one, so the comparison can gate a CI job.
+
+Results are only comparable from the same machine, mode and data source;
+differences in those are printed first.
+
+Run from backend/:  python -m benchmarks.compare base.json head.json [--tolerance 0.1] [--all]
+"""
+import argparse
+import json
+import sys
+from typing import Dict, Optional
+
+LOWER_IS_BETTER = ("_ms", "_mb", "errors")
+HIGHER_IS_BETTER = ("_rps", "rows_per_s")
+# One outlier decides these; too noisy to judge
+NOT_JUDGED = ("max_ms",)
+# Environment fields that make two runs incomparable when they differ
+SETUP_FIELDS = ["cpu_count", "platform", "mode", "source", "cache", "model_version", "packages"]
+
+
+def flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    values = {}
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            values.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[path] = value
+    return values
+
+
+def direction(metric: str) -> Optional[int]:
+    """-1 when lower is better, 1 when higher is better, None when not judged"""
+    name = metric.rsplit(".", 1)[-1]
+    if name in NOT_JUDGED:
+        return None
+    if name.endswith(LOWER_IS_BETTER):
+        return -1
+    if name.endswith(HIGHER_IS_BETTER):
+        return 1
+    return None
+
+
+def compare(base: Dict, head: Dict, tolerance: float) -> Dict:
+    base_values = flatten({key: value for key, value in base.items() if key != "environment"})
+    head_values = flatten({key: value for key, value in head.items() if key != "environment"})
+    rows = []
+    for metric in sorted(base_values.keys() & head_values.keys()):
+        old, new = base_values[metric], head_values[metric]
+        better = direction(metric)
+        change = (new - old) / old if old else (0.0 if new == old else float("inf"))
+        regression = better is not None and -better * change > tolerance
+        improvement = better is not None and better * change > tolerance
+        rows.append({"metric": metric, "base": old, "head": new, "change": change,
+                     "verdict": "REGRESSION" if regression else "improved" if improvement else ""})
+    return {
+        "setup_differences": {
+            field: [base["environment"].get(field), head["environment"].get(field)]
+            for field in SETUP_FIELDS if base["environment"].get(field) != head["environment"].get(field)
+        },
+        "rows": rows,
+        "regressions": [row["metric"] for row in rows if row["verdict"] == "REGRESSION"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="relative change treated as noise")
+    parser.add_argument("--all", action="store_true", help="list unchanged metrics too")
+    parser.add_argument("--json", action="store_true", help="print the comparison as JSON")
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+    result = compare(base, head, args.tolerance)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"base {base['environment'].get('commit')}  head {head['environment'].get('commit')}")
+        for field, (old, new) in result["setup_differences"].items():
+            print(f"warning: {field} differs: {old} -> {new}")
+        width = max((len(row["metric"]) for row in result["rows"]), default=0)
+        for row in result["rows"]:
+            if args.all or row["verdict"]:
+                print(f"{row['metric']:<{width}}  {row['base']:>12g}  {row['head']:>12g}  "
+                      f"{row['change']:>+8.1%}  {row['verdict']}")
+        print(f"{len(result['regressions'])} regression(s) beyond {args.tolerance:.0%}")
+    sys.exit(1 if result["regressions"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""Reproducible latency, throughput and memory benchmark of api.py and agent_server.py.
+
+Replays frontend/public/trimmed_dataset.csv (or --dataset, or --synthetic
+rows from benchmarks.synthetic) against both services. It measures:
+- latency: sequential single-row requests on one keep-alive connection,
+  per endpoint; percentiles in ms;
+- throughput: concurrent single-row requests from several client processes;
+- batch: rows per second through /predict/all/batch at each batch size;
+  rows stream from the source, so --batch-rows can run to millions;
+- memory: current and peak RSS of each service after the load.
+
+--mode port runs each service under uvicorn in its own process. The
+agent calls the prediction API over HTTP, as deployed, and memory is per
+service. --mode inprocess serves both apps from threads of this process,
+with the agent scoring in-process (MODEL_BACKEND=local). That variant
+leaves out the network hop, but the client shares the process, so memory
+is reported for the process as a whole.
+
+The result and decision caches are off unless --cache is given, so
+repeated payloads measure the models and not the cache. Everything is
+written as one JSON document together with the commit, machine and
+package versions. Compare two runs with benchmarks.compare.
+
+Run from backend/:
+    python -m benchmarks.suite --out base.json
+    python -m benchmarks.suite --mode inprocess --synthetic --batch-rows 1000000 --out head.json
+"""
+import argparse
+import contextlib
+import datetime
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from importlib import metadata
+from typing import Dict, Iterator, List, Optional
+
+import httpx
+
+from benchmarks.common import (
+    BACKEND_DIR, SAMPLE_DATASET, behavioral_payload, post_from_processes, process_memory, read_sample_rows,
+    serve_in_thread, summarize, transaction_payload, wait_until_serving
+)
+from benchmarks.synthetic import synthetic_rows
+
+# Endpoint name -> (path, payload builder)
+API_ENDPOINTS = {
+    "isolation_forest": ("/predict/isolation_forest", lambda row: transaction_payload(row)),
+    "transaction": ("/predict/transaction", lambda row: transaction_payload(row)),
+    "risk_scoring": ("/predict/risk_scoring", lambda row: transaction_payload(row)),
+    "behavioral": ("/predict/behavioral", lambda row: behavioral_payload(row)),
+    "all": ("/predict/all", lambda row: all_payload(row)),
+}
+PACKAGES = ["numpy", "scikit-learn", "xgboost", "lightgbm", "fastapi", "uvicorn", "langgraph"]
+# Bumped whenever the layout of the results changes
+SCHEMA_VERSION = 1
+
+
+def all_payload(row: Dict) -> Dict:
+    return {"transaction": transaction_payload(row), "behavioral": behavioral_payload(row)}
+
+
+def agent_payload(row: Dict) -> Dict:
+    return {**all_payload(row), "include_messages": False}
+
+
+def source_rows(args) -> Iterator[Dict]:
+    """The rows to replay, endlessly: the data set repeated, or fresh synthetic rows"""
+    if args.synthetic:
+        return synthetic_rows(sys.maxsize, seed=args.seed)
+    return itertools.cycle(read_sample_rows(args.dataset))
+
+
+def service_env(args) -> Dict[str, str]:
+    env = {"LOG_LEVEL": "WARNING"}
+    if not args.cache:
+        env.update({"RESULT_CACHE_SIZE": "0", "DECISION_CACHE_SIZE": "0"})
+    return env
+
+
+def measure_latency(client: httpx.Client, path: str, payloads: List[Dict], requests: int, warmup: int) -> Dict:
+    for payload in itertools.islice(itertools.cycle(payloads), warmup):
+        client.post(path, json=payload)
+    latencies, errors = [], 0
+    for payload in itertools.islice(itertools.cycle(payloads), requests):
+        start = time.perf_counter()
+        response = client.post(path, json=payload)
+        latencies.append(time.perf_counter() - start)
+        errors += response.status_code != 200 or response.json().get("status") == "error"
+    return {**rounded(summarize(latencies)), "errors": errors}
+
+
+def measure_throughput(base_url: str, path: str, payloads: List[Dict], args) -> Dict:
+    latencies, errors, elapsed = post_from_processes(base_url, path, payloads, args.throughput_requests,
+                                                     args.clients, args.concurrency)
+    return {"throughput_rps": round(len(latencies) / elapsed, 1), "errors": errors,
+            "clients": args.clients, "concurrency": args.concurrency, **rounded(summarize(latencies))}
+
+
+def measure_batches(client: httpx.Client, rows: Iterator[Dict], batch_size: int, total_rows: int) -> Dict:
+    # Build each body before starting the clock; generating rows is not the service's time
+    latencies, errors, scored, elapsed = [], 0, 0, 0.0
+    while scored < total_rows:
+        body = [all_payload(row) for row in itertools.islice(rows, min(batch_size, total_rows - scored))]
+        start = time.perf_counter()
+        response = client.post("/predict/all/batch", json=body)
+        latencies.append(time.perf_counter() - start)
+        elapsed += latencies[-1]
+        errors += response.status_code != 200
+        scored += len(body)
+    return {"batch_size": batch_size, "rows": scored, "rows_per_s": round(scored / elapsed, 1), "errors": errors,
+            **rounded(summarize(latencies))}
+
+
+def rounded(summary: Dict) -> Dict:
+    return {key: round(value, 3) if isinstance(value, float) else value for key, value in summary.items()}
+
+
+@contextlib.contextmanager
+def run_services(args) -> Iterator[Dict]:
+    """Start both services; yields {"api": base url, "agent": base url, "pids": {service: pid}}"""
+    api_port, agent_port = args.port, args.port + 1
+    if args.mode == "inprocess":
+        os.environ.update(service_env(args))
+        os.environ["MODEL_BACKEND"] = "local"
+        import agent_server
+        import api
+
+        with serve_in_thread(api.app, api_port) as api_url, serve_in_thread(agent_server.app, agent_port) as agent_url:
+            yield {"api": api_url, "agent": agent_url, "pids": {"process": os.getpid()}}
+        return
+
+    processes = {}
+    urls = {"api": f"http://127.0.0.1:{api_port}", "agent": f"http://127.0.0.1:{agent_port}"}
+    try:
+        for service, app_path, port, extra in [
+            ("api", "api:app", api_port, {}),
+            ("agent", "agent_server:app", agent_port, {"MODEL_BACKEND": "http", "API_BASE_URL": urls["api"]}),
+        ]:
+            processes[service] = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", app_path, "--host", "127.0.0.1", "--port", str(port),
+                 "--log-level", "warning"],
+                cwd=BACKEND_DIR, env={**os.environ, **service_env(args), **extra}, stdout=subprocess.DEVNULL,
+            )
+            wait_until_serving(urls[service], processes[service])
+        yield {**urls, "pids": {service: process.pid for service, process in processes.items()}}
+    finally:
+        for process in processes.values():
+            process.terminate()
+            process.wait()
+
+
+def environment(args) -> Dict:
+    def git(*command) -> Optional[str]:
+        try:
+            return subprocess.run(["git", *command], cwd=BACKEND_DIR, capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    packages = {}
+    for package in PACKAGES:
+        try:
+            packages[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            packages[package] = None
+    return {
+        "schema": SCHEMA_VERSION,
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "packages": packages,
+        "mode": args.mode,
+        "source": f"synthetic(seed={args.seed})" if args.synthetic else os.path.relpath(args.dataset, BACKEND_DIR),
+        "cache": args.cache,
+        "settings": {key: value for key, value in vars(args).items() if key not in ("out", "dataset")},
+    }
+
+
+def run_suite(args) -> Dict:
+    rows = source_rows(args)
+    replay = list(itertools.islice(rows, args.rows))
+    results = {"environment": environment(args), "api": {}, "agent": {}}
+
+    with run_services(args) as services:
+        with httpx.Client(base_url=services["api"], timeout=120) as client:
+            results["environment"]["model_version"] = client.get("/admin/models").json().get("version")
+            results["api"]["latency"] = {
+                name: measure_latency(client, path, [build(row) for row in replay], args.requests, args.warmup)
+                for name, (path, build) in API_ENDPOINTS.items()
+            }
+            results["api"]["batch"] = {
+                str(batch_size): measure_batches(client, rows, batch_size, args.batch_rows)
+                for batch_size in args.batch_sizes
+            }
+        results["api"]["throughput"] = measure_throughput(services["api"], "/predict/all",
+                                                          [all_payload(row) for row in replay], args)
+
+        agent_payloads = [agent_payload(row) for row in replay]
+        with httpx.Client(base_url=services["agent"], timeout=120) as client:
+            results["agent"]["latency"] = {
+                "process_transaction": measure_latency(client, "/process_transaction", agent_payloads,
+                                                       args.requests, args.warmup)
+            }
+        results["agent"]["throughput"] = measure_throughput(services["agent"], "/process_transaction",
+                                                            agent_payloads, args)
+
+        memory = {service: process_memory(pid) for service, pid in services["pids"].items()}
+    if args.mode == "inprocess":
+        results["memory"] = memory
+    else:
+        results["api"]["memory"], results["agent"]["memory"] = memory["api"], memory["agent"]
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=["port", "inprocess"], default="port")
+    parser.add_argument("--dataset", default=SAMPLE_DATASET, help="PaySim-format CSV to replay")
+    parser.add_argument("--synthetic", action="store_true", help="replay synthetic rows instead of --dataset")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic rows")
+    parser.add_argument("--rows", type=int, default=1000, help="distinct rows cycled by the single-row runs")
+    parser.add_argument("--requests", type=int, default=300, help="sequential requests per latency run")
+    parser.add_argument("--warmup", type=int, default=30)
+    parser.add_argument("--throughput-requests", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=2, help="load generator processes")
+    parser.add_argument("--concurrency", type=int, default=8, help="connections per client process")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[16, 256])
+    parser.add_argument("--batch-rows", type=int, default=20000, help="rows scored per batch size")
+    parser.add_argument("--cache", action="store_true", help="keep the result and decision caches on")
+    parser.add_argument("--port", type=int, default=8830, help="api port; the agent server uses the next one")
+    parser.add_argument("--out", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = json.dumps(run_suite(args), indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(results + "\n")
+    print(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""PaySim-style synthetic transactions for scaling the benchmarks past the sample.
+
+The shipped sample (frontend/public/trimmed_dataset.csv) has 1000 rows. The
+generator fits simple per-type distributions to it: the type mix,
+log-normal amounts and balances, and how often balances are zero. It then
+draws any number of rows with the same columns. Each draw is clipped to the
+range the sample shows for its type and column, since the log-normal tail
+would otherwise reach balances of ~1e11 in a few million rows. The balance updates follow
+PaySim's rules:
+- debits (PAYMENT, DEBIT, TRANSFER, CASH_OUT) reduce the origin balance and
+  CASH_IN raises it;
+- merchants (M...) carry no balances;
+- fraud only happens on TRANSFER and CASH_OUT and empties the origin account;
+- isFlaggedFraud marks fraudulent transfers above 200,000.
+
+The same seed always gives the same rows. Rows are drawn in vectorized
+chunks, so millions of them stream without holding the whole set in memory.
+
+Run from backend/:  python -m benchmarks.synthetic --rows 6000000 --out /tmp/paysim.csv [--seed 0]
+"""
+import argparse
+import csv
+import sys
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from benchmarks.common import SAMPLE_DATASET, read_sample_rows
+
+COLUMNS = ["step", "type", "amount", "nameOrig", "oldbalanceOrg", "newbalanceOrig", "nameDest",
+           "oldbalanceDest", "newbalanceDest", "isFraud", "isFlaggedFraud"]
+DEBIT_TYPES = ["PAYMENT", "DEBIT", "TRANSFER", "CASH_OUT"]
+FRAUD_TYPES = ["TRANSFER", "CASH_OUT"]
+# Share of fraudulent transactions in the full PaySim data set
+PAYSIM_FRAUD_RATE = 0.00129
+# One month of hourly steps
+STEPS = 743
+
+
+def _log_normal(values: np.ndarray) -> Dict[str, float]:
+    positive = values[values > 0] if (values > 0).any() else np.ones(1)
+    logs = np.log(positive)
+    return {"mean": float(logs.mean()), "std": float(logs.std()) or 1.0,
+            "min": float(positive.min()), "max": float(positive.max())}
+
+
+def _draw(rng: np.random.Generator, params: Dict[str, float], k: int) -> np.ndarray:
+    # Clipped to the sample's observed range of nonzero values
+    return np.clip(rng.lognormal(params["mean"], params["std"], k), params["min"], params["max"])
+
+
+def fit_profile(path: str = SAMPLE_DATASET) -> Dict:
+    """Per-type distribution parameters fitted to a PaySim-format CSV"""
+    rows = read_sample_rows(path)
+    types = sorted({row["type"] for row in rows})
+    profile = {"types": types, "type_p": [], "per_type": {}}
+    for transaction_type in types:
+        subset = [row for row in rows if row["type"] == transaction_type]
+        columns = {column: np.array([float(row[column]) for row in subset])
+                   for column in ["amount", "oldbalanceOrg", "oldbalanceDest"]}
+        profile["type_p"].append(len(subset) / len(rows))
+        profile["per_type"][transaction_type] = {
+            "amount": _log_normal(columns["amount"]),
+            "origin": _log_normal(columns["oldbalanceOrg"]),
+            "origin_zero": float((columns["oldbalanceOrg"] == 0).mean()),
+            "dest": _log_normal(columns["oldbalanceDest"]),
+            "dest_zero": float((columns["oldbalanceDest"] == 0).mean()),
+        }
+    return profile
+
+
+def synthetic_chunks(rows: int, seed: int = 0, chunk_rows: int = 100_000, fraud_rate: float = PAYSIM_FRAUD_RATE,
+                     profile: Optional[Dict] = None) -> Iterator[Dict[str, np.ndarray]]:
+    """Columns (COLUMNS -> array) of rows synthetic transactions, chunk_rows at a time"""
+    profile = profile or fit_profile()
+    rng = np.random.default_rng(seed)
+    types = np.array(profile["types"])
+    fraud_candidates = np.isin(types, FRAUD_TYPES)
+    # Fraud is drawn among TRANSFER and CASH_OUT, so scale the rate to their share
+    fraud_share = float(np.dot(profile["type_p"], fraud_candidates)) or 1.0
+
+    for start in range(0, rows, chunk_rows):
+        n = min(chunk_rows, rows - start)
+        type_index = rng.choice(len(types), size=n, p=profile["type_p"])
+        amount, origin, dest = np.empty(n), np.empty(n), np.empty(n)
+        for index, transaction_type in enumerate(types):
+            mask = type_index == index
+            k = int(mask.sum())
+            params = profile["per_type"][transaction_type]
+            amount[mask] = _draw(rng, params["amount"], k)
+            origin[mask] = np.where(rng.random(k) < params["origin_zero"], 0.0, _draw(rng, params["origin"], k))
+            dest[mask] = np.where(rng.random(k) < params["dest_zero"], 0.0, _draw(rng, params["dest"], k))
+        amount = np.round(amount, 2)
+        origin = np.round(origin, 2)
+        dest = np.round(dest, 2)
+
+        transaction_types = types[type_index]
+        fraud = fraud_candidates[type_index] & (rng.random(n) < fraud_rate / fraud_share)
+        # Fraud empties the origin account
+        origin = np.where(fraud, amount, origin)
+        debit = np.isin(transaction_types, DEBIT_TYPES)
+        new_origin = np.where(debit, np.maximum(origin - amount, 0.0), origin + amount)
+        merchant = transaction_types == "PAYMENT"
+        dest = np.where(merchant, 0.0, dest)
+        new_dest = np.where(merchant, 0.0,
+                            np.where(transaction_types == "CASH_IN", np.maximum(dest - amount, 0.0), dest + amount))
+
+        yield {
+            "step": rng.integers(1, STEPS + 1, n),
+            "type": transaction_types,
+            "amount": amount,
+            "nameOrig": np.char.add("C", rng.integers(10 ** 8, 2 * 10 ** 9, n).astype(str)),
+            "oldbalanceOrg": origin,
+            "newbalanceOrig": np.round(new_origin, 2),
+            "nameDest": np.char.add(np.where(merchant, "M", "C"), rng.integers(10 ** 8, 2 * 10 ** 9, n).astype(str)),
+            "oldbalanceDest": dest,
+            "newbalanceDest": np.round(new_dest, 2),
+            "isFraud": fraud.astype(int),
+            "isFlaggedFraud": (fraud & (transaction_types == "TRANSFER") & (amount > 200_000)).astype(int),
+        }
+
+
+def synthetic_rows(rows: int, seed: int = 0, **kwargs) -> Iterator[Dict[str, str]]:
+    """Synthetic transactions as CSV-style dicts, like read_sample_rows returns"""
+    for chunk in synthetic_chunks(rows, seed, **kwargs):
+        columns = [chunk[column].astype(str) for column in COLUMNS]
+        for values in zip(*columns):
+            yield dict(zip(COLUMNS, values))
+
+
+def write_csv(path: str, rows: int, seed: int = 0, **kwargs) -> int:
+    written = 0
+    with (open(path, "w", newline="") if path != "-" else sys.stdout) as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for chunk in synthetic_chunks(rows, seed, **kwargs):
+            columns: List[np.ndarray] = [chunk[column].astype(str) for column in COLUMNS]
+            writer.writerows(zip(*columns))
+            written += len(columns[0])
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--out", default="-", help="CSV path, - for stdout")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fraud-rate", type=float, default=PAYSIM_FRAUD_RATE)
+    parser.add_argument("--sample", default=SAMPLE_DATASET, help="CSV the distributions are fitted to")
+    args = parser.parse_args()
+    write_csv(args.out, args.rows, args.seed, fraud_rate=args.fraud_rate, profile=fit_profile(args.sample))
+
+
+if __name__ == "__main__":
+    main()
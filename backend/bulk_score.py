@@ -0,0 +1,283 @@
+"""Offline bulk scoring of PaySim-format CSVs (the trimmed_dataset.csv / Fraud.csv schema).
+
+Re-scoring a historical file used to mean one HTTP request per row through
+the agent server. This reads the CSV in chunks and writes one decision per
+row, in file order.
+
+Each chunk goes through two steps. The main process builds the chunk's
+transaction features (vectorized) and its behavioral features. Those come
+from an AccountFeatureStore keyed by nameOrig, updated row by row in file
+order, so every row is scored with its account's history up to and
+including itself, as the stream consumer does. The two matrices are then
+handed to a process pool. There each worker runs api.score_all over the
+whole chunk and applies the agent's routing rules (agents.apply_routing)
+to reach a decision per row: approved, review or rejected, and the path
+through the graph.
+
+Memory stays bounded:
+- at most 2 * workers chunks are in flight;
+- results are written as soon as the next chunk in order is done;
+- the feature store keeps at most --max-accounts accounts. An evicted
+  account starts a fresh history, and evictions are reported.
+
+Output is CSV, or Parquet with one row group per chunk; Parquet needs
+pyarrow. Progress (rows, rows per second) is logged every
+--report-interval seconds. A JSON summary is printed at the end: totals,
+decision counts and the peak RSS of the reading process (the workers hold
+a copy of the models each on top of that).
+
+Usage from backend/:
+    python bulk_score.py --data Fraud.csv --out decisions.csv [--chunksize 50000] [--workers N]
+    python bulk_score.py --data Fraud.csv --out decisions.parquet --max-accounts 2000000
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from feature_store import FEATURE_STORE_MAX_ACCOUNTS, AccountFeatureStore
+from features import ISOLATION_FOREST_FEATURES, transaction_columns_matrix
+from logging_utils import configure_logging
+from training_data import peak_rss_mb
+
+logger = configure_logging("bulk_score")
+
+DEFAULT_CHUNKSIZE = 50000
+REPORT_INTERVAL = 10.0
+
+# Input columns; isFraud is copied to the output when the file has it, for offline evaluation
+INPUT_DTYPES = {
+    'step': np.int32,
+    'type': object,
+    'amount': np.float64,
+    'nameOrig': object,
+    'oldbalanceOrg': np.float64,
+    'newbalanceOrig': np.float64,
+    'nameDest': object,
+    'oldbalanceDest': np.float64,
+    'newbalanceDest': np.float64,
+    'isFraud': np.int8,
+}
+REQUIRED_COLUMNS = ['type', 'nameOrig'] + ISOLATION_FOREST_FEATURES
+PASSTHROUGH_COLUMNS = ['step', 'type', 'amount', 'nameOrig', 'nameDest', 'isFraud']
+# ScoreAllResponse field -> output column prefix
+MODEL_COLUMNS = {
+    'isolation_forest': 'anomaly',
+    'transaction_monitoring': 'transaction',
+    'risk_scoring': 'risk',
+    'behavioral_analysis': 'behavioral',
+}
+SCORE_COLUMNS = [f'{prefix}_probability' for prefix in MODEL_COLUMNS.values()] + \
+    ['risk_level', 'decision', 'path', 'model_version']
+
+
+def read_chunks(path: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    header = pd.read_csv(path, nrows=0).columns
+    missing = [column for column in REQUIRED_COLUMNS if column not in header]
+    if missing:
+        raise ValueError(f"{path} is missing columns: {', '.join(missing)}")
+    columns = [column for column in INPUT_DTYPES if column in header]
+    return pd.read_csv(path, usecols=columns, dtype={column: INPUT_DTYPES[column] for column in columns},
+                       chunksize=chunksize)
+
+
+def behavioral_features(chunk: pd.DataFrame, store: AccountFeatureStore) -> np.ndarray:
+    """Per-account behavioral features for every row, updating the store in file order"""
+    transactions = [
+        {"nameOrig": account, "amount": amount, "oldbalanceOrg": old, "newbalanceOrig": new, "transaction_type": t}
+        for account, amount, old, new, t in zip(chunk['nameOrig'].to_numpy(), chunk['amount'].to_numpy(),
+                                                chunk['oldbalanceOrg'].to_numpy(), chunk['newbalanceOrig'].to_numpy(),
+                                                chunk['type'].to_numpy())
+    ]
+    return store.observe_batch(transactions)
+
+
+def init_worker(threads: int):
+    """Load the models once per worker process, with threads BLAS/OpenMP threads"""
+    import logging
+
+    from threadpoolctl import threadpool_limits
+
+    import api
+
+    threadpool_limits(threads)
+    # The routers log every decision at INFO
+    logging.getLogger("agents").setLevel(logging.WARNING)
+    api.load_models()
+
+
+def score_chunk(X: np.ndarray, B: np.ndarray) -> Dict[str, list]:
+    """Model scores and routed decisions for one chunk, as output columns"""
+    import agents
+    import api
+
+    columns = {column: [] for column in SCORE_COLUMNS}
+    for response in api.score_all(X, B):
+        results = {node: getattr(response, model).model_dump() for node, model in agents.NODE_MODELS.items()}
+        state = {"messages": None, "anomaly_result": {}, "behavioral_result": {}, "transaction_result": {},
+                 "risk_result": {}, "status": "pending", "reason": "", "step": "initialized", "error": ""}
+        status, path = agents.decision_outcome(agents.apply_routing(state, results))
+        for node, model in agents.NODE_MODELS.items():
+            columns[f'{MODEL_COLUMNS[model]}_probability'].append(results[node]["fraud_probability"])
+        columns['risk_level'].append(results["risk_scoring"]["details"]["risk_level"])
+        columns['decision'].append(status)
+        columns['path'].append(path)
+        columns['model_version'].append(results["risk_scoring"].get("model_version"))
+    return columns
+
+
+class CsvWriter:
+    def __init__(self, path: str):
+        self._file = open(path, "w", newline="") if path != "-" else sys.stdout
+        self._writer = csv.writer(self._file)
+        self._header = False
+
+    def write(self, columns: Dict[str, list]):
+        if not self._header:
+            self._writer.writerow(columns)
+            self._header = True
+        self._writer.writerows(zip(*columns.values()))
+
+    def close(self):
+        if self._file is not sys.stdout:
+            self._file.close()
+
+
+class ParquetWriter:
+    """One row group per chunk; the schema comes from the first chunk"""
+
+    def __init__(self, path: str):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet output needs pyarrow: pip install pyarrow")
+        self._pa, self._pq = pa, pq
+        self._path = path
+        self._writer = None
+
+    def write(self, columns: Dict[str, list]):
+        table = self._pa.Table.from_pydict(columns)
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self._path, table.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def open_writer(path: str, output_format: Optional[str] = None):
+    output_format = output_format or ("parquet" if path.endswith((".parquet", ".pq")) else "csv")
+    return ParquetWriter(path) if output_format == "parquet" else CsvWriter(path)
+
+
+class Progress:
+    """Rows written and the rate, logged every report_interval seconds"""
+
+    def __init__(self, report_interval: float = REPORT_INTERVAL):
+        self.report_interval = report_interval
+        self.rows = 0
+        self.decisions = Counter()
+        self.started = time.perf_counter()
+        self._last_report = self.started
+
+    def record(self, columns: Dict[str, list]):
+        self.rows += len(columns['decision'])
+        self.decisions.update(columns['decision'])
+        now = time.perf_counter()
+        if now - self._last_report >= self.report_interval:
+            logger.info("Bulk scoring progress", extra={"fields": {
+                "rows": self.rows, "rows_per_s": round(self.rows / (now - self.started), 1)
+            }})
+            self._last_report = now
+
+    def summary(self) -> Dict:
+        seconds = time.perf_counter() - self.started
+        return {
+            "rows": self.rows,
+            "seconds": round(seconds, 3),
+            "rows_per_s": round(self.rows / seconds, 1) if seconds > 0 else 0.0,
+            "decisions": dict(self.decisions),
+        }
+
+
+def bulk_score(data_path: str, out_path: str, chunksize: int = DEFAULT_CHUNKSIZE, workers: int = 1,
+               threads: int = 1, max_accounts: int = FEATURE_STORE_MAX_ACCOUNTS, output_format: Optional[str] = None,
+               report_interval: float = REPORT_INTERVAL) -> Dict:
+    """Score every row of data_path and write the decisions to out_path; returns the summary.
+
+    workers=0 scores in this process, with no pool.
+    """
+    store = AccountFeatureStore(max_accounts)
+    writer = open_writer(out_path, output_format)
+    progress = Progress(report_interval)
+
+    def emit(chunk: pd.DataFrame, scores: Dict[str, list]):
+        columns = {column: chunk[column].tolist() for column in PASSTHROUGH_COLUMNS if column in chunk}
+        writer.write({**columns, **scores})
+        progress.record(scores)
+
+    try:
+        if workers == 0:
+            init_worker(threads)
+            for chunk in read_chunks(data_path, chunksize):
+                emit(chunk, score_chunk(transaction_columns_matrix(chunk), behavioral_features(chunk, store)))
+        else:
+            # spawn: workers start clean and load the models themselves
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=init_worker, initargs=(threads,)) as pool:
+                pending = deque()
+                for chunk in read_chunks(data_path, chunksize):
+                    # Behavioral features depend on earlier rows, so they are built here, in order
+                    X, B = transaction_columns_matrix(chunk), behavioral_features(chunk, store)
+                    pending.append((chunk, pool.submit(score_chunk, X, B)))
+                    while len(pending) >= 2 * workers:
+                        chunk, future = pending.popleft()
+                        emit(chunk, future.result())
+                while pending:
+                    chunk, future = pending.popleft()
+                    emit(chunk, future.result())
+    finally:
+        writer.close()
+
+    return {
+        **progress.summary(),
+        "accounts": len(store),
+        "account_evictions": store.evictions,
+        "workers": workers,
+        "chunksize": chunksize,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a PaySim-format CSV in bulk")
+    parser.add_argument("--data", required=True, help="CSV to score (trimmed_dataset.csv / Fraud.csv schema)")
+    parser.add_argument("--out", required=True, help="output file (.csv or .parquet), - for CSV on stdout")
+    parser.add_argument("--format", choices=["csv", "parquet"], default=None, help="default: from --out")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--workers", type=int, default=max((os.cpu_count() or 1) - 1, 1),
+                        help="scoring processes; 0 scores in the reading process")
+    parser.add_argument("--threads", type=int, default=1, help="BLAS/OpenMP threads per worker")
+    parser.add_argument("--max-accounts", type=int, default=FEATURE_STORE_MAX_ACCOUNTS,
+                        help="accounts whose history is kept for the behavioral features")
+    parser.add_argument("--report-interval", type=float, default=REPORT_INTERVAL)
+    args = parser.parse_args()
+
+    summary = bulk_score(args.data, args.out, args.chunksize, args.workers, args.threads, args.max_accounts,
+                         args.format, args.report_interval)
+    print(json.dumps(summary, indent=2), file=sys.stderr if args.out == "-" else sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
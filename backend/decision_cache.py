@@ -0,0 +1,243 @@
+"""Bounded caches for model decisions, keyed on the feature vectors.
+
+Upstream retries, Kafka replays and accounts whose behavioral profile has
+not changed send the same feature vectors again and again, and every one
+of them used to run the models again. The models are deterministic for a
+given version, so a decision can be reused as long as the same version is
+serving.
+
+feature_key() hashes the canonical float64 feature vectors together with a
+namespace (which model or pipeline) and the model version, so a reload
+never serves a decision from the previous version. Two backends share one
+interface (get, put, clear, stats):
+
+    DecisionCache        in-process LRU with a TTL
+    SharedDecisionCache  a fixed table of slots in a file mapped with
+                         MAP_SHARED (e.g. under /dev/shm), so every worker
+                         process that opens the same path shares the hits
+
+The shared table is 4-way set associative: a key may live in any of the
+four slots of its bucket, and a new key arriving at a full bucket evicts
+the entry written longest ago. Writers take a byte-range lock on their
+bucket; readers take none and use each slot's sequence counter to detect
+and skip a slot that changed mid-read. Values are stored encoded (JSON by
+default), so only plain data fits there.
+
+Counters (hits, misses, evictions, expirations, invalidations) are kept
+per process.
+"""
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+
+def feature_key(namespace: str, version: Optional[str], *arrays) -> bytes:
+    """128-bit digest of the feature vectors, the namespace and the model version"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{namespace}\0{version}\0".encode())
+    for array in arrays:
+        # + 0.0 turns -0.0 into 0.0 so both spellings of zero share a key
+        array = np.ascontiguousarray(array, dtype=np.float64) + 0.0
+        digest.update(repr(array.shape).encode())
+        digest.update(array.tobytes())
+    return digest.digest()
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def snapshot(self, entries: int, capacity: int) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "capacity": capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+class DecisionCache:
+    """In-process LRU cache; entries expire ttl seconds after they were stored"""
+
+    backend = "memory"
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.counters = CacheStats()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: bytes) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.counters.misses += 1
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                self.counters.expirations += 1
+                self.counters.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters.hits += 1
+            return value
+
+    def put(self, key: bytes, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.counters.invalidations += 1
+
+    def stats(self) -> Dict:
+        return {"backend": self.backend, **self.counters.snapshot(len(self._entries), self.max_entries)}
+
+
+_HEADER = struct.Struct("<8sII")
+_MAGIC = b"FSDCACHE"
+# Sequence counter, key digest, expiry (wall clock), payload length
+_SLOT = struct.Struct("<Q16sdI4x")
+# Slots per bucket: a key may live in any slot of its bucket
+WAYS = 4
+
+
+class SharedDecisionCache:
+    """Fixed-size table of slots in a shared file mapping, usable from several processes.
+
+    Every process opening the same path with the same slots and slot_bytes
+    shares the entries. Values are stored as encode(value) bytes; one that
+    does not fit in a slot is simply not cached.
+    """
+
+    backend = "shared"
+
+    def __init__(self, path: str, slots: int, ttl: float, slot_bytes: int = 2048,
+                 encode: Callable[[Any], bytes] = lambda value: json.dumps(value).encode(),
+                 decode: Callable[[bytes], Any] = json.loads):
+        self.path = path
+        self.slots = -(-slots // WAYS) * WAYS
+        self.slot_bytes = slot_bytes
+        self.ttl = ttl
+        self.encode = encode
+        self.decode = decode
+        self.counters = CacheStats()
+        self.size = _HEADER.size + self.slots * slot_bytes
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.lockf(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size < self.size:
+                os.ftruncate(self._fd, self.size)
+            self._map = mmap.mmap(self._fd, self.size, mmap.MAP_SHARED)
+            magic, existing_slots, existing_bytes = _HEADER.unpack_from(self._map, 0)
+            if magic != _MAGIC:
+                self._map[:self.size] = bytes(self.size)
+                _HEADER.pack_into(self._map, 0, _MAGIC, self.slots, slot_bytes)
+            elif (existing_slots, existing_bytes) != (self.slots, slot_bytes):
+                raise ValueError(f"{path} holds a cache of {existing_slots} x {existing_bytes} bytes, "
+                                 f"not {self.slots} x {slot_bytes}")
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+    def _bucket(self, key: bytes) -> int:
+        return _HEADER.size + (int.from_bytes(key[:8], "little") % (self.slots // WAYS)) * WAYS * self.slot_bytes
+
+    def get(self, key: bytes) -> Optional[Any]:
+        bucket = self._bucket(key)
+        for offset in range(bucket, bucket + WAYS * self.slot_bytes, self.slot_bytes):
+            sequence, stored_key, expires, length = _SLOT.unpack_from(self._map, offset)
+            if sequence % 2 or stored_key != key:
+                continue
+            start = offset + _SLOT.size
+            payload = self._map[start:start + length]
+            # The slot was rewritten while it was being read: treat it as a miss
+            if struct.unpack_from("<Q", self._map, offset)[0] != sequence:
+                break
+            if expires < time.time():
+                self.counters.expirations += 1
+                break
+            self.counters.hits += 1
+            return self.decode(payload)
+        self.counters.misses += 1
+        return None
+
+    def put(self, key: bytes, value: Any):
+        payload = self.encode(value)
+        if len(payload) > self.slot_bytes - _SLOT.size:
+            return
+        bucket = self._bucket(key)
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, WAYS * self.slot_bytes, bucket)
+        try:
+            now = time.time()
+            # The key's own slot, else a free or expired one, else the one written longest ago
+            slots = [(offset, *_SLOT.unpack_from(self._map, offset)[:3])
+                     for offset in range(bucket, bucket + WAYS * self.slot_bytes, self.slot_bytes)]
+            offset, sequence, stored_key, expires = min(
+                slots, key=lambda slot: (slot[2] != key, slot[3] >= now, slot[3])
+            )
+            if stored_key != key and expires >= now:
+                self.counters.evictions += 1
+            # Odd while the slot is being written, so concurrent readers skip it
+            struct.pack_into("<Q", self._map, offset, sequence + 1)
+            start = offset + _SLOT.size
+            self._map[start:start + len(payload)] = payload
+            _SLOT.pack_into(self._map, offset, sequence + 1, key, now + self.ttl, len(payload))
+            struct.pack_into("<Q", self._map, offset, sequence + 2)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, WAYS * self.slot_bytes, bucket)
+
+    def clear(self):
+        fcntl.lockf(self._fd, fcntl.LOCK_EX)
+        try:
+            for index in range(self.slots):
+                offset = _HEADER.size + index * self.slot_bytes
+                sequence = struct.unpack_from("<Q", self._map, offset)[0]
+                # Keep the sequence advancing so a reader never mistakes the reset slot for the old one
+                _SLOT.pack_into(self._map, offset, sequence + 2 + sequence % 2, bytes(16), 0.0, 0)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN)
+        self.counters.invalidations += 1
+
+    def stats(self) -> Dict:
+        now = time.time()
+        entries = 0
+        for index in range(self.slots):
+            _, key, expires, _ = _SLOT.unpack_from(self._map, _HEADER.size + index * self.slot_bytes)
+            entries += key != bytes(16) and expires >= now
+        return {"backend": self.backend, "path": self.path, **self.counters.snapshot(entries, self.slots)}
+
+
+def open_cache(max_entries: int, ttl: float, shared_path: Optional[str] = None, slot_bytes: int = 2048,
+               encode: Optional[Callable[[Any], bytes]] = None, decode: Optional[Callable[[bytes], Any]] = None):
+    """The configured cache, or None when max_entries is 0 (caching off)"""
+    if max_entries <= 0:
+        return None
+    if shared_path:
+        codec = {key: value for key, value in (("encode", encode), ("decode", decode)) if value is not None}
+        return SharedDecisionCache(shared_path, max_entries, ttl, slot_bytes, **codec)
+    return DecisionCache(max_entries, ttl)
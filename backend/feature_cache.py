@@ -0,0 +1,167 @@
+"""Memory-mapped columnar cache of the engineered training matrices.
+
+Every training run used to re-parse Fraud.csv and redo the feature
+engineering (balance differences, the large_transaction quantile, the
+one-hot types and the per-account aggregates). prepare() runs
+training_data.load_training_data once and stores the result under
+
+    FEATURE_CACHE_DIR/<key>/
+        manifest.json        feature names, shapes, dtypes, threshold, source
+        X_transaction.npy    (rows, TRANSACTION_FEATURES) float32, column-major
+        y_transaction.npy    (rows,) int8
+        X_behavior.npy       (accounts, BEHAVIORAL_FEATURES) float32, column-major
+        y_behavior.npy       (accounts,) int8
+
+The matrices are stored in Fortran (column-major) order, so each feature
+column is one contiguous run of the file and the 2-D matrix the models
+take is still a single zero-copy np.load(mmap_mode='r'). The key hashes
+the source file's bytes together with the feature configuration, so
+changing either the data or the feature code builds a new entry instead
+of reusing a stale one.
+
+Usage from backend/:
+    python feature_cache.py --data Fraud.csv [--rebuild]   # prepare, then time a cached load
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+from features import BEHAVIORAL_FEATURES, TRANSACTION_FEATURES
+from training_data import (
+    CSV_DTYPES, DATASET_TYPES, DEFAULT_CHUNKSIZE, LARGE_TRANSACTION_QUANTILE, TrainingData,
+    load_training_data, peak_rss_mb,
+)
+
+FEATURE_CACHE_DIR = os.getenv("FEATURE_CACHE_DIR", "feature_cache")
+# Bump when the on-disk layout or the feature engineering changes in a way the config below does not capture
+CACHE_FORMAT_VERSION = 1
+
+MANIFEST = "manifest.json"
+ARRAYS = ["X_transaction", "y_transaction", "X_behavior", "y_behavior"]
+
+
+def feature_config() -> Dict:
+    """Everything besides the source bytes that determines the cached arrays"""
+    return {
+        "format_version": CACHE_FORMAT_VERSION,
+        "transaction_features": TRANSACTION_FEATURES,
+        "behavioral_features": BEHAVIORAL_FEATURES,
+        "dataset_types": DATASET_TYPES,
+        "large_transaction_quantile": LARGE_TRANSACTION_QUANTILE,
+        "csv_dtypes": {column: str(dtype) for column, dtype in CSV_DTYPES.items()},
+    }
+
+
+def source_digest(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(path: str) -> str:
+    config = json.dumps(feature_config(), sort_keys=True).encode()
+    return hashlib.sha256(source_digest(path).encode() + config).hexdigest()[:32]
+
+
+def prepare(path: str, cache_dir: str = FEATURE_CACHE_DIR, chunksize: int = DEFAULT_CHUNKSIZE,
+            rebuild: bool = False) -> str:
+    """Build the cache entry for path unless it already exists; returns the entry directory"""
+    key = cache_key(path)
+    entry = os.path.join(cache_dir, key)
+    if os.path.exists(os.path.join(entry, MANIFEST)) and not rebuild:
+        return entry
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # Build in a scratch directory and rename it into place, so a crashed or concurrent
+    # prepare never leaves a half-written entry behind a manifest
+    work_dir = tempfile.mkdtemp(prefix=f".{key}_", dir=cache_dir)
+    try:
+        def allocate(name, shape, dtype):
+            # The second pass writes the transaction matrix straight to disk
+            return np.lib.format.open_memmap(os.path.join(work_dir, f"{name}.npy"), mode="w+", dtype=dtype,
+                                             shape=shape, fortran_order=len(shape) > 1)
+
+        data = load_training_data(path, chunksize, spill_dir=work_dir, allocate=allocate)
+        for name in ["X_transaction", "y_transaction"]:
+            getattr(data, name).flush()
+        np.save(os.path.join(work_dir, "X_behavior.npy"), np.asfortranarray(data.X_behavior))
+        np.save(os.path.join(work_dir, "y_behavior.npy"), data.y_behavior)
+
+        manifest = {
+            "key": key,
+            "source": {"path": os.path.abspath(path), "bytes": os.path.getsize(path)},
+            "config": feature_config(),
+            "large_threshold": data.large_threshold,
+            "arrays": {name: {"shape": list(getattr(data, name).shape), "dtype": str(getattr(data, name).dtype)}
+                       for name in ARRAYS},
+            "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        del data
+        with open(os.path.join(work_dir, MANIFEST), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        if rebuild:
+            shutil.rmtree(entry, ignore_errors=True)
+        try:
+            os.replace(work_dir, entry)
+        except OSError:
+            # Another process finished the same entry first; its arrays are identical
+            if not os.path.exists(os.path.join(entry, MANIFEST)):
+                raise
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return entry
+
+
+def load_cached(entry: str) -> TrainingData:
+    """Memory-map a cache entry; nothing is read until the arrays are touched"""
+    with open(os.path.join(entry, MANIFEST)) as f:
+        manifest = json.load(f)
+    arrays = {name: np.load(os.path.join(entry, f"{name}.npy"), mmap_mode="r") for name in ARRAYS}
+    for name, spec in manifest["arrays"].items():
+        if list(arrays[name].shape) != spec["shape"] or str(arrays[name].dtype) != spec["dtype"]:
+            raise ValueError(f"Cache entry {entry} is inconsistent with its manifest ({name})")
+    return TrainingData(large_threshold=manifest["large_threshold"], **arrays)
+
+
+def cached_training_data(path: str, cache_dir: str = FEATURE_CACHE_DIR, chunksize: int = DEFAULT_CHUNKSIZE,
+                         rebuild: bool = False) -> TrainingData:
+    """load_training_data(path), built once per source file and feature config and memory-mapped after"""
+    return load_cached(prepare(path, cache_dir, chunksize, rebuild))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prepare the columnar training feature cache")
+    parser.add_argument("--data", required=True, help="path to Fraud.csv")
+    parser.add_argument("--cache-dir", default=FEATURE_CACHE_DIR)
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--rebuild", action="store_true", help="rebuild even if the entry exists")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    entry = prepare(args.data, args.cache_dir, args.chunksize, args.rebuild)
+    prepare_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    data = cached_training_data(args.data, args.cache_dir)
+    # Touch every page once so the timing includes actually reading the features
+    checksum = float(data.X_transaction.sum(dtype=np.float64)) + float(data.X_behavior.sum(dtype=np.float64))
+    load_seconds = time.perf_counter() - start
+    if not np.isfinite(checksum):
+        sys.exit(f"Non-finite values in {entry}")
+    print(f"entry={entry} rows={len(data.X_transaction)} accounts={len(data.X_behavior)} "
+          f"prepare_seconds={prepare_seconds:.1f} load_seconds={load_seconds:.2f} peak_rss_mb={peak_rss_mb():.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Online per-account behavioral features.
+
+The behavioral model was trained on per-account aggregates computed with a
+pandas groupby('nameOrig') over each account's whole history
+(model_training.py, CHUNK 6). AccountFeatureStore keeps the same
+aggregates as running state per account and updates them in O(1) per
+transaction: running sums and counts for the means and ratios, the running
+max, and Welford's algorithm for the amount standard deviation.
+
+The features after an update match the training groupby on the account's
+history so far:
+- transaction_amount_std is the sample std (ddof=1), 0.0 for one transaction
+- balance_change_mean averages oldbalanceOrg - newbalanceOrig
+- large_transaction_ratio uses the serving LARGE_TRANSACTION_THRESHOLD
+- type_*_ratio covers the four types the model knows; CASH_IN counts toward
+  transaction_count only
+
+Memory is bounded by evicting the least recently updated account once
+max_accounts is reached.
+
+Retries and replays: with recent_transactions > 0 each account remembers
+the features returned for its last recent_transactions transactions. A
+transaction seen again gets the same features back and is not added to the
+history a second time. Only transactions that come with a transaction id
+are recognised: two genuine transactions can share every field (say two
+equal PAYMENTs from an empty account), so without an id every observation
+counts.
+
+tests/test_feature_store.py checks the parity against the training groupby
+and the handling of retries.
+"""
+import math
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from features import BEHAVIORAL_FEATURES, LARGE_TRANSACTION_THRESHOLD, TRANSACTION_TYPES
+
+FEATURE_STORE_MAX_ACCOUNTS = int(os.getenv("FEATURE_STORE_MAX_ACCOUNTS", 100000))
+# Transaction ids per account remembered to recognise retries (0 counts every observation)
+FEATURE_STORE_RECENT_TRANSACTIONS = int(os.getenv("FEATURE_STORE_RECENT_TRANSACTIONS", 16))
+
+_TYPE_INDEX = {t_type: i for i, t_type in enumerate(TRANSACTION_TYPES)}
+
+
+class AccountState:
+    __slots__ = ["count", "amount_mean", "amount_m2", "amount_max", "balance_sum", "balance_change_sum",
+                 "large_count", "type_counts", "recent"]
+
+    def __init__(self):
+        self.count = 0
+        self.amount_mean = 0.0
+        self.amount_m2 = 0.0
+        self.amount_max = -math.inf
+        self.balance_sum = 0.0
+        self.balance_change_sum = 0.0
+        self.large_count = 0
+        self.type_counts = [0] * len(TRANSACTION_TYPES)
+        # Transaction id -> features returned for it, oldest first; only when deduplicating
+        self.recent: Optional[OrderedDict] = None
+
+    def update(self, transaction: Dict):
+        amount = transaction["amount"]
+        self.count += 1
+        # Welford's update for the running mean and sum of squared deviations
+        delta = amount - self.amount_mean
+        self.amount_mean += delta / self.count
+        self.amount_m2 += delta * (amount - self.amount_mean)
+        self.amount_max = max(self.amount_max, amount)
+        self.balance_sum += transaction["oldbalanceOrg"]
+        self.balance_change_sum += transaction["oldbalanceOrg"] - transaction["newbalanceOrig"]
+        self.large_count += amount > LARGE_TRANSACTION_THRESHOLD
+        type_index = _TYPE_INDEX.get(transaction.get("transaction_type"))
+        if type_index is not None:
+            self.type_counts[type_index] += 1
+
+    def features(self, out: np.ndarray):
+        """Write the behavioral features, in BEHAVIORAL_FEATURES order, into out"""
+        count = self.count
+        out[0] = self.amount_mean
+        out[1] = self.amount_max
+        out[2] = math.sqrt(self.amount_m2 / (count - 1)) if count > 1 else 0.0
+        out[3] = self.balance_sum / count
+        out[4] = count
+        out[5] = self.large_count / count
+        out[6] = self.balance_change_sum / count
+        out[7:] = [type_count / count for type_count in self.type_counts]
+
+
+class AccountFeatureStore:
+    """Running behavioral aggregates keyed by account id (nameOrig), LRU-bounded.
+
+    recent_transactions=0 (the default) adds every observation to the history,
+    as a replay of a data file needs; the services pass
+    FEATURE_STORE_RECENT_TRANSACTIONS to count retried transactions once.
+    """
+
+    def __init__(self, max_accounts: int = FEATURE_STORE_MAX_ACCOUNTS, recent_transactions: int = 0):
+        self.max_accounts = max_accounts
+        self.recent_transactions = recent_transactions
+        self.evictions = 0
+        self.duplicates = 0
+        self._accounts: "OrderedDict[str, AccountState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._accounts)
+
+    def _update(self, account_id: str, transaction: Dict, transaction_id: Optional[str], out: np.ndarray):
+        state = self._accounts.get(account_id)
+        if state is None:
+            if len(self._accounts) >= self.max_accounts:
+                self._accounts.popitem(last=False)
+                self.evictions += 1
+            state = self._accounts[account_id] = AccountState()
+        else:
+            self._accounts.move_to_end(account_id)
+        if not self.recent_transactions or transaction_id is None:
+            state.update(transaction)
+            state.features(out)
+            return
+
+        if state.recent is None:
+            state.recent = OrderedDict()
+        seen = state.recent.get(transaction_id)
+        if seen is not None:
+            # A retry or replay: same features as the first time, history unchanged
+            out[:] = seen
+            self.duplicates += 1
+            return
+        state.update(transaction)
+        state.features(out)
+        state.recent[transaction_id] = out.copy()
+        if len(state.recent) > self.recent_transactions:
+            state.recent.popitem(last=False)
+
+    def observe(self, account_id: str, transaction: Dict, transaction_id: Optional[str] = None) -> Dict[str, float]:
+        """Add a transaction to the account's history and return its behavioral features"""
+        row = np.empty(len(BEHAVIORAL_FEATURES))
+        with self._lock:
+            self._update(account_id, transaction, transaction_id, row)
+        return _feature_dict(row)
+
+    def observe_batch(self, transactions: List[Dict], account_field: str = "nameOrig",
+                      id_field: Optional[str] = None) -> np.ndarray:
+        """observe() for a batch in order; a repeated account sees its earlier rows of the batch"""
+        out = np.empty((len(transactions), len(BEHAVIORAL_FEATURES)))
+        with self._lock:
+            for i, transaction in enumerate(transactions):
+                transaction_id = transaction.get(id_field) if id_field is not None else None
+                self._update(transaction[account_field], transaction, transaction_id, out[i])
+        return out
+
+    def features(self, account_id: str) -> Optional[Dict[str, float]]:
+        """Current features for an account without updating it, or None if unknown"""
+        with self._lock:
+            state = self._accounts.get(account_id)
+            if state is None:
+                return None
+            row = np.empty(len(BEHAVIORAL_FEATURES))
+            state.features(row)
+        return _feature_dict(row)
+
+
+def _feature_dict(row: np.ndarray) -> Dict[str, float]:
+    features = dict(zip(BEHAVIORAL_FEATURES, row.tolist()))
+    features["transaction_count"] = int(features["transaction_count"])
+    return features
+
@@ -0,0 +1,158 @@
+import numpy as np
+from typing import Dict, Optional, Sequence
+
+# Feature layouts shared by the prediction API and the agents.
+# Column order must match model_training.py (CHUNK 3, 4 and 6) exactly.
+TRANSACTION_TYPES = ['CASH_OUT', 'DEBIT', 'PAYMENT', 'TRANSFER']
+
+# Features scaled by transaction_scaler, in the order it was fitted on
+TRANSACTION_NUMERIC_FEATURES = [
+    'amount', 'oldbalanceOrg', 'newbalanceOrig', 'oldbalanceDest', 'newbalanceDest',
+    'balance_difference', 'dest_balance_difference'
+]
+
+# Isolation Forest uses the first five scaled numeric features
+ISOLATION_FOREST_FEATURES = TRANSACTION_NUMERIC_FEATURES[:5]
+
+# Full input of the XGBoost and LightGBM models
+TRANSACTION_FEATURES = (
+    TRANSACTION_NUMERIC_FEATURES
+    + ['large_transaction']
+    + [f'type_{t_type}' for t_type in TRANSACTION_TYPES]
+)
+
+# Per-account aggregates used by behavior_scaler and the behavioral model
+BEHAVIORAL_FEATURES = [
+    'avg_transaction_amount', 'max_transaction_amount', 'transaction_amount_std', 'avg_balance',
+    'transaction_count', 'large_transaction_ratio', 'balance_change_mean',
+    'type_CASH_OUT_ratio', 'type_DEBIT_ratio', 'type_PAYMENT_ratio', 'type_TRANSFER_ratio'
+]
+
+# Threshold for the large_transaction flag at serving time
+LARGE_TRANSACTION_THRESHOLD = 10000
+
+# Column positions inside a transaction matrix
+NUMERIC_COLUMNS = slice(0, len(TRANSACTION_NUMERIC_FEATURES))
+ISOLATION_FOREST_COLUMNS = slice(0, len(ISOLATION_FOREST_FEATURES))
+LARGE_TRANSACTION_COLUMN = TRANSACTION_FEATURES.index('large_transaction')
+TYPE_COLUMNS = {t_type: TRANSACTION_FEATURES.index(f'type_{t_type}') for t_type in TRANSACTION_TYPES}
+TYPE_COLUMN_SLICE = slice(min(TYPE_COLUMNS.values()), max(TYPE_COLUMNS.values()) + 1)
+
+_RAW_TRANSACTION_FIELDS = ISOLATION_FOREST_FEATURES
+
+
+def _field(record, name, default=None):
+    # Records may be pydantic models or plain dicts (agent graph state)
+    if isinstance(record, dict):
+        return record.get(name, default)
+    return getattr(record, name, default)
+
+
+def transaction_matrix(transactions: Sequence, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Fill an (n, len(TRANSACTION_FEATURES)) float64 matrix of unscaled transaction features."""
+    n = len(transactions)
+    if out is None:
+        out = np.empty((n, len(TRANSACTION_FEATURES)), dtype=np.float64)
+
+    out[:, :5] = [[_field(t, name) for name in _RAW_TRANSACTION_FIELDS] for t in transactions]
+    _derive_features(out)
+
+    # One-hot transaction type; unknown or missing types stay all-zero
+    out[:, TYPE_COLUMN_SLICE] = 0.0
+    for i, t in enumerate(transactions):
+        column = TYPE_COLUMNS.get(_field(t, 'transaction_type'))
+        if column is not None:
+            out[i, column] = 1.0
+
+    return out
+
+
+def transaction_columns_matrix(columns, type_column: str = 'type', out: Optional[np.ndarray] = None) -> np.ndarray:
+    """transaction_matrix for columnar input (a DataFrame or a dict of arrays), vectorized over rows.
+
+    type_column names the transaction type column: 'type' in the dataset CSVs.
+    """
+    types = np.asarray(columns[type_column])
+    if out is None:
+        out = np.empty((len(types), len(TRANSACTION_FEATURES)), dtype=np.float64)
+
+    for i, name in enumerate(_RAW_TRANSACTION_FIELDS):
+        out[:, i] = columns[name]
+    _derive_features(out)
+    for t_type, column in TYPE_COLUMNS.items():
+        out[:, column] = types == t_type
+
+    return out
+
+
+def _derive_features(out: np.ndarray):
+    # Balance differences and the large-transaction flag, from the five raw columns
+    np.subtract(out[:, 1], out[:, 2], out=out[:, 5])
+    np.subtract(out[:, 3], out[:, 4], out=out[:, 6])
+    np.greater(out[:, 0], LARGE_TRANSACTION_THRESHOLD, out=out[:, LARGE_TRANSACTION_COLUMN])
+
+
+def transaction_row(transaction, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Fill a (1, len(TRANSACTION_FEATURES)) matrix for a single transaction."""
+    if out is None:
+        out = np.zeros((1, len(TRANSACTION_FEATURES)), dtype=np.float64)
+    else:
+        out[0, TYPE_COLUMN_SLICE] = 0.0
+
+    row = out[0]
+    row[0] = amount = _field(transaction, 'amount')
+    row[1] = old_org = _field(transaction, 'oldbalanceOrg')
+    row[2] = new_org = _field(transaction, 'newbalanceOrig')
+    row[3] = old_dest = _field(transaction, 'oldbalanceDest')
+    row[4] = new_dest = _field(transaction, 'newbalanceDest')
+    row[5] = old_org - new_org
+    row[6] = old_dest - new_dest
+    row[LARGE_TRANSACTION_COLUMN] = 1.0 if amount > LARGE_TRANSACTION_THRESHOLD else 0.0
+
+    column = TYPE_COLUMNS.get(_field(transaction, 'transaction_type'))
+    if column is not None:
+        row[column] = 1.0
+
+    return out
+
+
+def behavioral_matrix(behaviors: Sequence, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Fill an (n, len(BEHAVIORAL_FEATURES)) float64 matrix of unscaled behavioral features."""
+    if out is None:
+        out = np.empty((len(behaviors), len(BEHAVIORAL_FEATURES)), dtype=np.float64)
+
+    # Optional ratio fields may be None in the request models
+    out[:] = [[_field(b, name) or 0.0 for name in BEHAVIORAL_FEATURES] for b in behaviors]
+    return out
+
+
+def transaction_feature_dict(transaction) -> Dict[str, float]:
+    """Numeric and one-hot type features keyed by name (the agents' model payload)."""
+    row = transaction_row(transaction)[0]
+    result = dict(zip(TRANSACTION_NUMERIC_FEATURES, row[NUMERIC_COLUMNS].tolist()))
+    for t_type, column in TYPE_COLUMNS.items():
+        result[f'type_{t_type}'] = float(row[column])
+    return result
+
+
+def isolation_forest_feature_dict(transaction) -> Dict[str, float]:
+    """Raw Isolation Forest features keyed by name."""
+    return {name: _field(transaction, name) for name in ISOLATION_FOREST_FEATURES}
+
+
+def behavioral_feature_dict(behavior) -> Dict[str, float]:
+    """Behavioral features keyed by name in model order."""
+    return {name: _field(behavior, name) for name in BEHAVIORAL_FEATURES}
+
+
+def check_feature_names(estimator, expected: Sequence[str], name: str):
+    """Raise if a fitted estimator's recorded feature names disagree with a declared layout."""
+    fitted = getattr(estimator, 'feature_names_in_', None)
+    if fitted is None:
+        # LightGBM records names on the sklearn wrapper as feature_name_
+        fitted = getattr(estimator, 'feature_name_', None)
+    if fitted is not None and list(fitted) != list(expected):
+        raise ValueError(
+            f"Feature layout mismatch for {name}: "
+            f"model expects {list(fitted)}, layout declares {list(expected)}"
+        )
@@ -0,0 +1,71 @@
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+# Logging for the backend services.
+# LOG_LEVEL   - root level (default INFO)
+# LOG_FORMAT  - "json" for one JSON object per line, "text" for plain lines (default json)
+# API_DEBUG   - enable per-request debug logging on the prediction paths (default off)
+# API_DEBUG_SAMPLE_RATE - fraction of requests logged when API_DEBUG is on (default 1.0)
+
+class JsonFormatter(logging.Formatter):
+    """Render records as single-line JSON; keyword fields come from extra={"fields": {...}}"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            payload.update(fields)
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+def configure_logging(name: str) -> logging.Logger:
+    """Configure the root handler once from the environment and return the named logger"""
+    root = logging.getLogger()
+    if not getattr(root, "_fraudshield_configured", False):
+        handler = logging.StreamHandler(sys.stderr)
+        if os.getenv("LOG_FORMAT", "json") == "json":
+            handler.setFormatter(JsonFormatter())
+        else:
+            handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        root.handlers = [handler]
+        root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+        root._fraudshield_configured = True
+    return logging.getLogger(name)
+
+
+class RequestDebugSampler:
+    """Cheap per-request gate for debug logs, so the default path formats nothing"""
+
+    def __init__(self, enabled: bool, sample_rate: float, logger: logging.Logger):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.logger = logger
+        if enabled:
+            # Debug output is requested explicitly, so make sure the logger passes it through
+            logger.setLevel(logging.DEBUG)
+
+    @classmethod
+    def from_env(cls, logger: logging.Logger) -> "RequestDebugSampler":
+        return cls(
+            enabled=os.getenv("API_DEBUG", "").lower() in ("1", "true", "yes"),
+            sample_rate=float(os.getenv("API_DEBUG_SAMPLE_RATE", 1.0)),
+            logger=logger,
+        )
+
+    def __call__(self) -> bool:
+        return self.enabled and (self.sample_rate >= 1.0 or random.random() < self.sample_rate)
+
+
+def elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000.0, 3)
@@ -0,0 +1,102 @@
+"""In-process stand-in for a Kafka broker.
+
+Implements the part of the kafka-python consumer/producer API that
+stream_consumer.py uses (poll, commit, committed, send, flush), so the
+consumer can be exercised and benchmarked without a running cluster.
+Topics are partitioned by key like Kafka's default partitioner, and each
+consumer group tracks committed offsets per partition.
+"""
+import threading
+import zlib
+from collections import defaultdict, namedtuple
+from typing import Dict, List, Optional
+
+TopicPartition = namedtuple("TopicPartition", ["topic", "partition"])
+ConsumerRecord = namedtuple("ConsumerRecord", ["topic", "partition", "offset", "key", "value"])
+
+
+class InMemoryBroker:
+    def __init__(self, num_partitions: int = 3):
+        self.num_partitions = num_partitions
+        self._logs: Dict[str, List[List[ConsumerRecord]]] = {}
+        self._committed: Dict[str, Dict[TopicPartition, int]] = defaultdict(dict)
+        self._lock = threading.Lock()
+
+    def _partitions(self, topic: str) -> List[List[ConsumerRecord]]:
+        if topic not in self._logs:
+            self._logs[topic] = [[] for _ in range(self.num_partitions)]
+        return self._logs[topic]
+
+    def append(self, topic: str, key: Optional[bytes], value: bytes) -> ConsumerRecord:
+        with self._lock:
+            partitions = self._partitions(topic)
+            partition = zlib.crc32(key) % self.num_partitions if key is not None else 0
+            record = ConsumerRecord(topic, partition, len(partitions[partition]), key, value)
+            partitions[partition].append(record)
+            return record
+
+    def records(self, topic: str) -> List[ConsumerRecord]:
+        with self._lock:
+            return [record for partition in self._partitions(topic) for record in partition]
+
+    def end_offsets(self, topic: str) -> Dict[TopicPartition, int]:
+        with self._lock:
+            return {TopicPartition(topic, p): len(log) for p, log in enumerate(self._partitions(topic))}
+
+    def committed(self, group_id: str, topic: str) -> Dict[TopicPartition, int]:
+        with self._lock:
+            return {tp: offset for tp, offset in self._committed[group_id].items() if tp.topic == topic}
+
+    def consumer(self, topic: str, group_id: str) -> "InMemoryConsumer":
+        return InMemoryConsumer(self, topic, group_id)
+
+    def producer(self) -> "InMemoryProducer":
+        return InMemoryProducer(self)
+
+
+class InMemoryConsumer:
+    """A single group member that owns every partition of one topic"""
+
+    def __init__(self, broker: InMemoryBroker, topic: str, group_id: str):
+        self.broker = broker
+        self.topic = topic
+        self.group_id = group_id
+        # Resume from the group's committed offsets, like a restarted consumer
+        committed = broker.committed(group_id, topic)
+        self._positions = {tp: committed.get(tp, 0) for tp in broker.end_offsets(topic)}
+
+    def poll(self, timeout_ms: int = 0, max_records: Optional[int] = None) -> Dict[TopicPartition, List[ConsumerRecord]]:
+        batch = {}
+        remaining = max_records if max_records is not None else float("inf")
+        with self.broker._lock:
+            partitions = self.broker._partitions(self.topic)
+            for tp, position in self._positions.items():
+                if remaining <= 0:
+                    break
+                records = partitions[tp.partition][position:position + int(min(remaining, len(partitions[tp.partition])))]
+                if records:
+                    batch[tp] = records
+                    self._positions[tp] = position + len(records)
+                    remaining -= len(records)
+        return batch
+
+    def commit(self):
+        with self.broker._lock:
+            self.broker._committed[self.group_id].update(self._positions)
+
+    def close(self):
+        pass
+
+
+class InMemoryProducer:
+    def __init__(self, broker: InMemoryBroker):
+        self.broker = broker
+
+    def send(self, topic: str, value: bytes, key: Optional[bytes] = None):
+        self.broker.append(topic, key, value)
+
+    def flush(self, timeout: Optional[float] = None):
+        pass
+
+    def close(self):
+        pass
@@ -0,0 +1,223 @@
+"""Low-overhead counters and histograms in the Prometheus text format.
+
+The services expose GET /metrics for Prometheus to scrape. There is no
+client library dependency: the metric types here cover what the backend
+records (counters, fixed-bucket histograms and values read from other
+components at scrape time), and render() writes exposition format 0.0.4.
+
+Recording is a lock, a bisect and two additions, so the hot paths can time
+every stage of a request. Counter names carry their _total suffix. Label
+values are positional, in labelnames order:
+
+    STAGE_SECONDS = REGISTRY.register(Histogram(
+        "fraudshield_api_stage_seconds", "Time per scoring stage", LATENCY_BUCKETS, ["stage", "model"]))
+    with STAGE_SECONDS.time("predict", "risk_scoring"):
+        ...
+
+Every process keeps its own values. With several workers (serve.py) a
+scrape sees the worker that answered it; scrape each worker separately
+or run one worker per port when exact totals matter.
+"""
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Seconds; from sub-millisecond model calls to multi-second retries
+LATENCY_BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = list(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield self.name, dict(zip(self.labelnames, labels)), value
+
+
+class _HistogramValues:
+    __slots__ = ["counts", "count", "sum"]
+
+    def __init__(self, n_buckets: int):
+        self.counts = [0] * (n_buckets + 1)
+        self.count = 0
+        self.sum = 0.0
+
+
+class _Timer:
+    __slots__ = ["histogram", "labels", "start"]
+
+    def __init__(self, histogram: "Histogram", labels: Tuple[str, ...]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+class Histogram:
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = sorted(buckets)
+        self.labelnames = list(labelnames)
+        self._values: Dict[Tuple[str, ...], _HistogramValues] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            values = self._values.get(labels)
+            if values is None:
+                values = self._values[labels] = _HistogramValues(len(self.buckets))
+            values.counts[index] += 1
+            values.count += 1
+            values.sum += value
+
+    def time(self, *labels: str) -> _Timer:
+        """Context manager observing the seconds spent in its block"""
+        return _Timer(self, labels)
+
+    def snapshot(self, *labels: str) -> Dict:
+        """Cumulative bucket counts, count, sum and mean for one label combination"""
+        with self._lock:
+            values = self._values.get(labels) or _HistogramValues(len(self.buckets))
+            counts, count, total = list(values.counts), values.count, values.sum
+        cumulative, running = {}, 0
+        for bound, n in zip(self.buckets + [float("inf")], counts):
+            running += n
+            cumulative["+Inf" if bound == float("inf") else str(bound)] = running
+        return {"buckets": cumulative, "count": count, "sum": round(total, 6),
+                "mean": round(total / count, 6) if count else 0.0}
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            values = [(labels, list(v.counts), v.count, v.sum) for labels, v in self._values.items()]
+        for labels, counts, count, total in values:
+            base = dict(zip(self.labelnames, labels))
+            running = 0
+            for bound, n in zip(self.buckets + [float("inf")], counts):
+                running += n
+                yield self.name + "_bucket", {**base, "le": _format_value(bound)}, running
+            yield self.name + "_count", base, count
+            yield self.name + "_sum", base, total
+
+
+class CallbackMetric:
+    """Values owned by another component (cache counters, queue sizes), read at scrape time.
+
+    collect() returns {label values tuple: value}.
+    """
+
+    def __init__(self, name: str, documentation: str, metric_type: str, labelnames: Sequence[str],
+                 collect: Callable[[], Dict[Tuple[str, ...], float]]):
+        self.name = name
+        self.documentation = documentation
+        self.metric_type = metric_type
+        self.labelnames = list(labelnames)
+        self.collect = collect
+
+    def samples(self) -> Iterable[Sample]:
+        for labels, value in self.collect().items():
+            yield self.name, dict(zip(self.labelnames, labels)), value
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Add a metric; registering the same name again returns the first one"""
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.metric_type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class MetricsMiddleware:
+    """ASGI middleware counting requests and timing them per route and status code.
+
+    Paths outside routes are reported as "other" so unknown URLs cannot grow
+    the label set without bound.
+    """
+
+    def __init__(self, app, routes: Iterable[str], prefix: str):
+        self.app = app
+        self.routes = set(routes)
+        self.requests = REGISTRY.register(Counter(
+            f"{prefix}_requests_total", "HTTP requests by route and status code", ["route", "status"]))
+        self.latency = REGISTRY.register(Histogram(
+            f"{prefix}_request_seconds", "HTTP request latency by route", LATENCY_BUCKETS, ["route"]))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route = scope["path"] if scope["path"] in self.routes else "other"
+        status = "500"
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.latency.observe(time.perf_counter() - start, route)
+            self.requests.inc(route, status)
@@ -0,0 +1,240 @@
+"""Coalesce concurrent single-row scoring requests into vectorized batches.
+
+Upstream callers send one transaction per request, and a model call costs
+nearly the same for one row as for dozens: the per-call overhead of the
+scaler and of predict_proba dominates. A MicroBatcher collects the rows of
+concurrent requests for up to max_wait_ms (or until max_rows are waiting),
+stacks them, makes one scoring call for the whole batch and hands each
+waiting request its own slice of the result.
+
+The delay the coalescer adds is capped by slo_ms: a batch is dispatched
+early when waiting any longer would push its oldest request past the SLO
+given the recent batch service time, and a request that has already waited
+past the SLO by the time its batch starts is failed with SLOExceeded
+instead of being scored late. The queue itself is bounded by max_queue
+rows.
+
+Batches are collected while the previous ones are being scored, so under
+load they grow on their own and throughput rises instead of latency. A
+lone request, with nothing else queued and no batch in flight, is
+dispatched at once: the window is only spent when there is concurrency to
+coalesce.
+
+Batch sizes, queue delays and rejections are recorded in the metrics
+registry (metrics.py), labelled by batcher, for /metrics and the admin
+endpoint.
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from metrics import REGISTRY, Counter, Histogram
+
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512]
+QUEUE_DELAY_BUCKETS = [0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0]
+
+BATCH_ROWS = REGISTRY.register(Histogram(
+    "fraudshield_micro_batch_rows", "Rows per coalesced scoring call", BATCH_SIZE_BUCKETS, ["batcher"]))
+QUEUE_DELAY = REGISTRY.register(Histogram(
+    "fraudshield_micro_batch_queue_delay_seconds", "Time from submit until the request's batch started",
+    QUEUE_DELAY_BUCKETS, ["batcher"]))
+EVENTS = REGISTRY.register(Counter(
+    "fraudshield_micro_batch_events_total", "Requests, rows, errors and rejections per batcher", ["batcher", "event"]))
+
+
+class QueueFull(Exception):
+    """More rows are waiting than the batcher accepts"""
+
+
+class SLOExceeded(Exception):
+    """The request waited past the latency SLO before its batch could start"""
+
+
+class BatchMetrics:
+    """One batcher's share of the micro-batching metrics in the metrics registry"""
+
+    EVENTS = ["requests", "rows", "errors", "rejected_queue_full", "rejected_slo"]
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def count(self, event: str, amount: int = 1):
+        EVENTS.inc(self.name, event, amount=amount)
+
+    def observe_batch(self, rows: int):
+        BATCH_ROWS.observe(rows, self.name)
+        self.count("rows", rows)
+
+    def observe_queue_delay(self, seconds: float):
+        QUEUE_DELAY.observe(seconds, self.name)
+
+    def snapshot(self) -> Dict:
+        batch_size = BATCH_ROWS.snapshot(self.name)
+        return {
+            **{event: int(EVENTS.value(self.name, event)) for event in self.EVENTS},
+            "batches": batch_size["count"],
+            "batch_size": batch_size,
+            "queue_delay_seconds": QUEUE_DELAY.snapshot(self.name),
+        }
+
+
+class _Pending:
+    __slots__ = ["arrays", "rows", "future", "enqueued"]
+
+    def __init__(self, arrays: Sequence[np.ndarray], future: asyncio.Future):
+        self.arrays = arrays
+        self.rows = len(arrays[0])
+        self.future = future
+        self.enqueued = time.perf_counter()
+
+
+class MicroBatcher:
+    """Score requests in coalesced batches.
+
+    score(*matrices) -> list with one result per row; each submit() passes
+    the same number of matrices, row-aligned. execute(score, *matrices)
+    awaits the actual call (e.g. on an inference thread pool);
+    max_concurrency batches may be in flight at once.
+    """
+
+    def __init__(self, name: str, score: Callable, execute: Callable[..., Awaitable], max_rows: int = 64,
+                 max_wait_ms: float = 2.0, slo_ms: float = 50.0, max_queue: Optional[int] = None,
+                 max_concurrency: int = 1):
+        self.name = name
+        self.score = score
+        self.execute = execute
+        self.max_rows = max_rows
+        self.max_wait = max_wait_ms / 1000.0
+        self.slo = slo_ms / 1000.0
+        self.max_queue = max_queue if max_queue is not None else 8 * max_rows
+        self.max_concurrency = max_concurrency
+        self.metrics = BatchMetrics(name)
+        # Exponentially weighted batch service time, seeded with a guess until the first batch runs
+        self.service_time = min(self.max_wait, self.slo / 4)
+        self._queue: List[_Pending] = []
+        self._queued_rows = 0
+        self._arrived: Optional[asyncio.Event] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight = set()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start the collector on the running event loop"""
+        self._arrived = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._task = asyncio.get_running_loop().create_task(self._collect(), name=f"micro-batch-{self.name}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        for pending in self._queue:
+            if not pending.future.done():
+                pending.future.cancel()
+        self._queue, self._queued_rows = [], 0
+
+    async def submit(self, *arrays: np.ndarray) -> list:
+        """Queue one request's rows and wait for their results"""
+        rows = len(arrays[0])
+        if self._queued_rows + rows > self.max_queue:
+            self.metrics.count("rejected_queue_full")
+            raise QueueFull(f"{self.name}: {self._queued_rows} rows already waiting")
+        pending = _Pending(arrays, asyncio.get_running_loop().create_future())
+        self._queue.append(pending)
+        self._queued_rows += rows
+        self.metrics.count("requests")
+        self._arrived.set()
+        return await pending.future
+
+    def _deadline(self) -> float:
+        # Flush when the window closes, or earlier if the oldest request would otherwise miss the SLO
+        oldest = self._queue[0].enqueued
+        return min(oldest + self.max_wait, oldest + self.slo - self.service_time)
+
+    async def _collect(self):
+        while True:
+            # Wait for a free slot first: rows keep queueing while every slot is busy
+            await self._slots.acquire()
+            try:
+                while not self._queue:
+                    self._arrived.clear()
+                    await self._arrived.wait()
+                # Wait for more rows only when others are queued or a batch is being scored
+                while self._queued_rows < self.max_rows and (len(self._queue) > 1 or self._inflight):
+                    remaining = self._deadline() - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._arrived.clear()
+                    try:
+                        await asyncio.wait_for(self._arrived.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                batch = self._take_batch()
+            except BaseException:
+                self._slots.release()
+                raise
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    def _take_batch(self) -> List[_Pending]:
+        batch, rows = [], 0
+        # Always take at least one request, even one larger than max_rows
+        while self._queue and (not batch or rows + self._queue[0].rows <= self.max_rows):
+            pending = self._queue.pop(0)
+            batch.append(pending)
+            rows += pending.rows
+        self._queued_rows -= rows
+        return batch
+
+    async def _run(self, batch: List[_Pending]):
+        try:
+            now = time.perf_counter()
+            live = []
+            for pending in batch:
+                if pending.future.done():
+                    # The client went away while queued
+                    continue
+                self.metrics.observe_queue_delay(now - pending.enqueued)
+                if now - pending.enqueued > self.slo:
+                    self.metrics.count("rejected_slo")
+                    pending.future.set_exception(SLOExceeded(f"{self.name}: queued past the {self.slo * 1000:g} ms SLO"))
+                else:
+                    live.append(pending)
+            if not live:
+                return
+
+            arrays = [np.concatenate(parts) if len(live) > 1 else parts[0]
+                      for parts in zip(*(pending.arrays for pending in live))]
+            rows = len(arrays[0])
+            self.metrics.observe_batch(rows)
+            start = time.perf_counter()
+            try:
+                results = await self.execute(self.score, *arrays)
+            except Exception as e:
+                self.metrics.count("errors")
+                for pending in live:
+                    if not pending.future.done():
+                        pending.future.set_exception(e)
+                return
+            self.service_time = 0.8 * self.service_time + 0.2 * (time.perf_counter() - start)
+
+            offset = 0
+            for pending in live:
+                if not pending.future.done():
+                    pending.future.set_result(results[offset:offset + pending.rows])
+                offset += pending.rows
+        finally:
+            self._slots.release()
@@ -0,0 +1,406 @@
+"""Versioned manifest of the model artifacts and on-demand loading.
+
+models/manifest.json lists every artifact the API serves:
+
+    {"format": 1, "version": "20261018T201500-3f2a9c1d", "created": "...",
+     "artifacts": {"isolation_forest": {"file": "isolation_forest.pth", "role": "model",
+                                        "features": [...], "sha256": "...", "bytes": 749369,
+                                        "mmap": false}, ...}}
+
+Roles are "model" and "scaler" for the artifacts model_training.py writes,
+and "native" for tree ensembles precompiled by tree_engine (saved as
+<model>.native.joblib, keyed <model>_native, with "model" naming the
+library model they were compiled from). The feature schemas in the
+manifest are checked against features.py when the registry opens, before
+anything is unpickled. Each artifact's checksum and fitted feature names
+are checked when it is loaded.
+
+Artifacts load on first use through ModelRegistry.get, one lock per
+artifact, so a server can accept traffic before every model is in memory.
+Artifacts marked mmap are loaded with joblib's mmap_mode='r': their NumPy
+arrays stay in the page cache, shared by every worker process that maps
+the same file. Only the native ensembles are marked, because the library
+models copy their arrays into their own structures when unpickled.
+
+A models directory without a manifest is read the old way, from the known
+file names, without checksums.
+
+model_training.py publishes a new model set in one step. It trains into a
+staging directory under models/versions/, and write_manifest checksums
+that directory. publish() then renames it to models/versions/<version>/
+and atomically replaces models/manifest.json with one whose "file" entries
+point into it. Until that last rename, readers see the previous manifest
+and its files untouched. Afterwards they see only the new set. The
+previous versions stay on disk, so a server still loading the old set
+lazily keeps finding its files; only the newest PUBLISHED_VERSIONS_KEPT
+are kept. --write on a published directory publishes a copy of the
+current set as a new version instead of rewriting the manifest in place.
+
+Usage from backend/:
+    python model_registry.py --write [--native] [--version TAG]   # (re)write models/manifest.json
+    python model_registry.py --verify                             # load and check every artifact
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Mapping
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+import joblib
+
+from features import (
+    TRANSACTION_NUMERIC_FEATURES, ISOLATION_FOREST_FEATURES, TRANSACTION_FEATURES, BEHAVIORAL_FEATURES,
+    check_feature_names,
+)
+from logging_utils import configure_logging
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_FORMAT = 1
+UNVERSIONED = "unversioned"
+# Published model sets, one directory per version, under the models directory
+VERSIONS_DIR = "versions"
+PUBLISHED_VERSIONS_KEPT = 3
+
+logger = configure_logging("model_registry")
+
+
+class ArtifactSpec(NamedTuple):
+    file: str
+    role: str
+    features: Sequence[str]
+
+
+# Everything api.load_models needs, keyed like api.models and api.scalers
+ARTIFACTS = {
+    "isolation_forest": ArtifactSpec("isolation_forest.pth", "model", ISOLATION_FOREST_FEATURES),
+    "transaction_monitoring": ArtifactSpec("transaction_monitoring_agent.pth", "model", TRANSACTION_FEATURES),
+    "risk_scoring": ArtifactSpec("risk_scoring_agent.pth", "model", TRANSACTION_FEATURES),
+    "behavioral_analysis": ArtifactSpec("behavioral_analysis_agent.pth", "model", BEHAVIORAL_FEATURES),
+    "transaction_scaler": ArtifactSpec("transaction_scaler.pth", "scaler", TRANSACTION_NUMERIC_FEATURES),
+    "behavior_scaler": ArtifactSpec("behavior_scaler.pth", "scaler", BEHAVIORAL_FEATURES),
+}
+
+
+def native_name(model_name: str) -> str:
+    return f"{model_name}_native"
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def atomic_write(path: str, write):
+    """Call write(file) on a temporary file next to path, fsync it and rename it over path"""
+    directory, file_name = os.path.split(path)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{file_name}.", suffix=".tmp", dir=directory or ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates the file owner-only; give it the permissions a plain open() would
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_path, 0o666 & ~umask)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def save_artifact(obj, models_dir: str, file_name: str) -> str:
+    """joblib.dump, uncompressed so NumPy payloads can be memory-mapped, written atomically"""
+    path = os.path.join(models_dir, file_name)
+    atomic_write(path, lambda f: joblib.dump(obj, f))
+    return path
+
+
+def _entry(models_dir: str, file_name: str, role: str, features: Sequence[str], **extra) -> Dict:
+    path = os.path.join(models_dir, file_name)
+    return {"file": file_name, "role": role, "features": list(features), "sha256": file_sha256(path),
+            "bytes": os.path.getsize(path), "mmap": role == "native", **extra}
+
+
+def export_native(models_dir: str, artifacts: Dict[str, Dict]) -> Dict[str, Dict]:
+    """Precompile the tree models with tree_engine and save them next to the library artifacts"""
+    from tree_engine import NATIVE_MODELS, compile_model
+
+    entries = {}
+    for name in NATIVE_MODELS:
+        model = joblib.load(os.path.join(models_dir, artifacts[name]["file"]))
+        save_artifact(compile_model(name, model), models_dir, f"{name}.native.joblib")
+        entries[native_name(name)] = _entry(models_dir, f"{name}.native.joblib", "native", ARTIFACTS[name].features,
+                                            model=name)
+    return entries
+
+
+def write_manifest(models_dir: str, version: Optional[str] = None, native: bool = False) -> Dict:
+    """Checksum the artifacts in models_dir and atomically write its manifest"""
+    missing = [spec.file for spec in ARTIFACTS.values() if not os.path.exists(os.path.join(models_dir, spec.file))]
+    if missing:
+        raise ValueError(f"Cannot write a manifest for {models_dir}, missing artifacts: {missing}")
+    artifacts = {name: _entry(models_dir, spec.file, spec.role, spec.features) for name, spec in ARTIFACTS.items()}
+    if native:
+        artifacts.update(export_native(models_dir, artifacts))
+
+    if version is None:
+        # Timestamp plus a digest of the contents, so the same files always share a suffix
+        digest = hashlib.sha256("".join(entry["sha256"] for entry in artifacts.values()).encode()).hexdigest()
+        version = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{digest[:8]}"
+    manifest = {
+        "format": MANIFEST_FORMAT,
+        "version": version,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "artifacts": artifacts,
+    }
+    atomic_write(os.path.join(models_dir, MANIFEST_FILE), lambda f: f.write(json.dumps(manifest, indent=2).encode()))
+    return manifest
+
+
+def staging_dir(models_dir: str) -> str:
+    """A fresh directory to train into, on the same filesystem as models_dir's versions"""
+    versions = os.path.join(models_dir, VERSIONS_DIR)
+    os.makedirs(versions, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".staging-", dir=versions)
+    # mkdtemp creates the directory owner-only; give it the permissions a plain mkdir would
+    umask = os.umask(0)
+    os.umask(umask)
+    os.chmod(staging, 0o777 & ~umask)
+    return staging
+
+
+def publish(models_dir: str, staging: str, version: Optional[str] = None, native: bool = False,
+            keep: int = PUBLISHED_VERSIONS_KEPT) -> Dict:
+    """Make the artifacts in staging (from staging_dir) models_dir's model set in one rename.
+
+    staging becomes models_dir/versions/<version>, with its own manifest, and
+    models_dir/manifest.json is replaced by one pointing at it.
+    """
+    manifest = write_manifest(staging, version, native)
+    version_dir = os.path.join(VERSIONS_DIR, manifest["version"])
+    if os.path.exists(os.path.join(models_dir, version_dir)):
+        raise ValueError(f"Model version {manifest['version']} is already published in {models_dir}")
+    os.rename(staging, os.path.join(models_dir, version_dir))
+
+    published = {**manifest, "artifacts": {
+        name: {**entry, "file": f"{VERSIONS_DIR}/{manifest['version']}/{entry['file']}"}
+        for name, entry in manifest["artifacts"].items()
+    }}
+    atomic_write(os.path.join(models_dir, MANIFEST_FILE), lambda f: f.write(json.dumps(published, indent=2).encode()))
+    prune_versions(models_dir, keep)
+    return published
+
+
+def published_version_dir(models_dir: str) -> Optional[str]:
+    """The versions/<version> directory models_dir's manifest points into, None for a flat layout"""
+    path = os.path.join(models_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        files = [entry["file"] for entry in json.load(f)["artifacts"].values()]
+    if files and files[0].startswith(f"{VERSIONS_DIR}/"):
+        return os.path.join(models_dir, os.path.dirname(files[0]))
+    return None
+
+
+def republish(models_dir: str, version: Optional[str] = None, native: bool = False) -> Dict:
+    """Publish a copy of the current model set as a new version, e.g. to add the native ensembles"""
+    current = published_version_dir(models_dir)
+    staging = staging_dir(models_dir)
+    try:
+        for spec in ARTIFACTS.values():
+            shutil.copy2(os.path.join(current, spec.file), staging)
+        return publish(models_dir, staging, version, native)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def prune_versions(models_dir: str, keep: int = PUBLISHED_VERSIONS_KEPT) -> List[str]:
+    """Delete all but the newest keep published versions; returns the deleted versions.
+
+    Versions are ranked by the creation time and tag in their own manifests.
+    The version models_dir/manifest.json points at is never deleted, nor is a
+    directory without a readable manifest.
+    """
+    versions = os.path.join(models_dir, VERSIONS_DIR)
+    if not os.path.isdir(versions):
+        return []
+    active = published_version_dir(models_dir)
+    published = []
+    for name in os.listdir(versions):
+        if name.startswith("."):
+            continue
+        try:
+            with open(os.path.join(versions, name, MANIFEST_FILE)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            continue
+        published.append((manifest.get("created", ""), manifest.get("version", name), name))
+    published.sort(reverse=True)
+    active = os.path.normpath(active) if active is not None else None
+    stale = [name for _, _, name in published[keep:] if os.path.normpath(os.path.join(versions, name)) != active]
+    for name in stale:
+        shutil.rmtree(os.path.join(versions, name), ignore_errors=True)
+    return stale
+
+
+def _legacy_manifest(models_dir: str) -> Dict:
+    # Directories written before the manifest existed: known file names, no checksums
+    artifacts = {
+        name: {"file": spec.file, "role": spec.role, "features": list(spec.features), "sha256": None, "mmap": False}
+        for name, spec in ARTIFACTS.items() if os.path.exists(os.path.join(models_dir, spec.file))
+    }
+    return {"format": MANIFEST_FORMAT, "version": UNVERSIONED, "artifacts": artifacts}
+
+
+def read_manifest(models_dir: str) -> Dict:
+    """Read and validate models_dir's manifest; nothing is unpickled"""
+    path = os.path.join(models_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        logger.warning("No model manifest, using the known artifact names", extra={"fields": {
+            "models_dir": models_dir
+        }})
+        return _legacy_manifest(models_dir)
+
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest.get("format") != MANIFEST_FORMAT:
+        raise ValueError(f"Unsupported model manifest format {manifest.get('format')} in {path}")
+    for name, entry in manifest["artifacts"].items():
+        # Native ensembles share their library model's schema
+        spec = ARTIFACTS.get(entry.get("model", name))
+        if spec is not None and entry["features"] != list(spec.features):
+            raise ValueError(
+                f"Feature layout mismatch for {name}: "
+                f"manifest records {entry['features']}, layout declares {list(spec.features)}"
+            )
+    return manifest
+
+
+class ModelRegistry:
+    """The artifacts of one models directory, each loaded on first get()"""
+
+    def __init__(self, models_dir: str, verify_checksums: bool = True):
+        self.models_dir = models_dir
+        self.verify_checksums = verify_checksums
+        self.manifest = read_manifest(models_dir)
+        self.version = self.manifest["version"]
+        self.artifacts = self.manifest["artifacts"]
+        self._loaded = {}
+        self._locks = {name: threading.Lock() for name in self.artifacts}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.artifacts
+
+    def names(self, role: Optional[str] = None) -> List[str]:
+        return [name for name, entry in self.artifacts.items() if role is None or entry["role"] == role]
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._loaded
+
+    def get(self, name: str):
+        artifact = self._loaded.get(name)
+        if artifact is not None:
+            return artifact
+        entry = self.artifacts[name]
+        with self._locks[name]:
+            if name not in self._loaded:
+                self._loaded[name] = self._load(name, entry)
+        return self._loaded[name]
+
+    def _load(self, name: str, entry: Dict):
+        start = time.perf_counter()
+        path = os.path.join(self.models_dir, entry["file"])
+        if self.verify_checksums and entry.get("sha256") and file_sha256(path) != entry["sha256"]:
+            raise ValueError(f"Checksum mismatch for {name} ({path}), expected {entry['sha256']}")
+        artifact = joblib.load(path, mmap_mode="r" if entry.get("mmap") else None)
+        if entry["role"] != "native":
+            check_feature_names(artifact, entry["features"], name)
+        logger.info("Loaded artifact", extra={"fields": {
+            "name": name,
+            "path": path,
+            "version": self.version,
+            "mmap": bool(entry.get("mmap")),
+            "load_ms": round((time.perf_counter() - start) * 1000, 2)
+        }})
+        return artifact
+
+    def warm(self, names: Optional[Iterable[str]] = None):
+        """Load the given artifacts (default: all) now rather than on first use"""
+        for name in self.names() if names is None else names:
+            self.get(name)
+
+
+class RegistryView(Mapping):
+    """Read-only dict of one role's artifacts; looking a name up loads it on first use.
+
+    Membership and len() only consult the manifest, so `name in models` and
+    `if not models` never trigger a load.
+    """
+
+    def __init__(self, role: str, registry: Optional[ModelRegistry] = None):
+        self.role = role
+        self.registry = registry
+
+    def bind(self, registry: ModelRegistry):
+        self.registry = registry
+
+    def _names(self) -> List[str]:
+        return self.registry.names(self.role) if self.registry is not None else []
+
+    def __getitem__(self, name: str):
+        if name not in self._names():
+            raise KeyError(name)
+        return self.registry.get(name)
+
+    def __contains__(self, name) -> bool:
+        return name in self._names()
+
+    def __iter__(self):
+        return iter(self._names())
+
+    def __len__(self) -> int:
+        return len(self._names())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write or verify the model artifact manifest")
+    parser.add_argument("--models-dir", default="models")
+    parser.add_argument("--write", action="store_true", help="checksum the artifacts and write the manifest")
+    parser.add_argument("--native", action="store_true", help="also precompile the tree models (tree_engine)")
+    parser.add_argument("--version", default=None, help="version tag (default: timestamp and content digest)")
+    parser.add_argument("--verify", action="store_true", help="load every artifact and check it")
+    args = parser.parse_args()
+
+    if args.write:
+        # A published layout gets a new version; rewriting its manifest in place would point it
+        # back at the flat files
+        if published_version_dir(args.models_dir) is not None:
+            manifest = republish(args.models_dir, args.version, args.native)
+        else:
+            manifest = write_manifest(args.models_dir, args.version, args.native)
+        print(f"Wrote {os.path.join(args.models_dir, MANIFEST_FILE)} version={manifest['version']} "
+              f"artifacts={list(manifest['artifacts'])}")
+    if args.verify:
+        registry = ModelRegistry(args.models_dir)
+        try:
+            registry.warm()
+        except ValueError as e:
+            sys.exit(str(e))
+        print(f"version={registry.version} artifacts={registry.names()} OK")
+
+
+if __name__ == "__main__":
+    main()
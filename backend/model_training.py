@@ -1,230 +1,308 @@
 # -*- coding: utf-8 -*-
-"""Untitled3.ipynb
-
-Automatically generated by Colab.
-
-Original file is located at
-    https://colab.research.google.com/drive/18JDdzoHCW_rcjk_OLqWwy4HFv5FDkKKg
+"""Train the four fraud models and their scalers from a local Fraud.csv.
+
+Originally an exported Colab notebook (Untitled3.ipynb) that mounted Google
+Drive and fit every model in sequence. The fits only depend on two pieces
+of prepared data, so they run as separate jobs in a process pool:
+
+    transaction_data      SMOTE, train/test split, transaction_scaler.pth
+      -> isolation_forest          isolation_forest.pth
+      -> transaction_monitoring    transaction_monitoring_agent.pth (XGBoost)
+      -> risk_scoring              risk_scoring_agent.pth (LightGBM)
+    behavioral_analysis   SMOTE, split, behavior_scaler.pth, behavioral_analysis_agent.pth
+
+The behavioral model is trained on lifetime per-account aggregates, one row
+per account. With --behavior-window N it is trained instead on each
+transaction's features over its account's last N steps
+(window_features.window_feature_frame), the features agent_server.py and
+stream_consumer.py serve with BEHAVIOR_FEATURE_WINDOW=N. That path reads
+the columns it needs in one piece rather than in chunks. It defaults to
+BEHAVIOR_FEATURE_WINDOW, so a model set trained in the serving environment
+matches what is served.
+
+Every job runs in a fresh worker process, so the peak RSS it reports is
+that job's own. The --cores budget is split between the jobs that run at
+the same time: one core each for the single-threaded steps (data
+preparation, liblinear), the rest shared by IsolationForest, XGBoost and
+LightGBM through their n_jobs. Prepared arrays are handed to the model jobs
+as .npy files that the workers memory-map instead of pickling them.
+
+The jobs write into a staging directory under --output-dir/versions/.
+Once every job has finished, model_registry.publish renames it to
+versions/<version>/ and swaps in a manifest.json pointing at it. A server
+loading --output-dir therefore sees either the previous model set or the
+complete new one, never a mix. A failed run leaves the previous set
+published and removes its staging directory.
+
+Usage from backend/:
+    python model_training.py --data Fraud.csv [--output-dir models] [--cores N] [--version TAG]
+                             [--behavior-window STEPS] [--report report.json]
 """
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, List
 
-# CHUNK 1: IMPORTS AND DATA LOADING
-# Import required libraries
-import pandas as pd
 import numpy as np
+import pandas as pd
 import joblib
-from google.colab import drive
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
-from imblearn.over_sampling import SMOTE
-from sklearn.ensemble import IsolationForest
-from sklearn.linear_model import LogisticRegression
-import xgboost as xgb
-import lightgbm as lgb
-from sklearn.metrics import accuracy_score, classification_report
-
-# Mount Google Drive
-drive.mount('/content/drive', force_remount=True)
-
-# Path to CSV file in Google Drive
-file_path = "/content/drive/MyDrive/Fraud.csv"
-
-# Read the CSV file into a Pandas DataFrame
-df = pd.read_csv(file_path)
-
-# Display basic information about the data
-print("First few rows of the dataset:")
-print(df.head())
-
-# Check for missing values
-print("\nMissing values in each column:")
-print(df.isnull().sum())
-
-# CHUNK 2: DATA PREPROCESSING
-# Data preprocessing
-# DO NOT drop nameOrig and nameDest as they're needed for behavioral analysis
-# Create a copy of the original dataframe for behavioral analysis
-behavioral_df = df.copy()
-
-# For transaction pattern analysis and anomaly detection
-transaction_df = df.copy()
-# We'll drop identity columns only for non-behavioral models
-transaction_df.drop(['nameOrig', 'nameDest'], axis=1, inplace=True)
-
-# One-hot encode categorical variables
-transaction_df = pd.get_dummies(transaction_df, columns=['type'], drop_first=True)
-behavioral_df = pd.get_dummies(behavioral_df, columns=['type'], drop_first=True)
-
-# Feature engineering for transaction analysis
-transaction_df['balance_difference'] = transaction_df['oldbalanceOrg'] - transaction_df['newbalanceOrig']
-transaction_df['dest_balance_difference'] = transaction_df['oldbalanceDest'] - transaction_df['newbalanceDest']
-transaction_df['large_transaction'] = (transaction_df['amount'] > transaction_df['amount'].quantile(0.95)).astype(int)
-
-# Feature engineering for behavioral analysis
-behavioral_df['balance_difference'] = behavioral_df['oldbalanceOrg'] - behavioral_df['newbalanceOrig']
-behavioral_df['dest_balance_difference'] = behavioral_df['oldbalanceDest'] - behavioral_df['newbalanceDest']
-behavioral_df['large_transaction'] = (behavioral_df['amount'] > behavioral_df['amount'].quantile(0.95)).astype(int)
-
-# CHUNK 3: TRANSACTION MODEL PREPARATION
-# Select features for transaction-based models
-transaction_features = ['amount', 'oldbalanceOrg', 'newbalanceOrig', 'oldbalanceDest', 'newbalanceDest',
-                       'balance_difference', 'dest_balance_difference', 'large_transaction']
-if 'type_CASH_OUT' in transaction_df.columns:
-    transaction_features.extend([col for col in transaction_df.columns if col.startswith('type_')])
-
-# Define X and y for transaction analysis
-X_transaction = transaction_df[transaction_features]
-y_transaction = transaction_df['isFraud']
-
-# Handle class imbalance for transaction models
-smote = SMOTE(sampling_strategy=0.3, random_state=42)
-X_transaction_resampled, y_transaction_resampled = smote.fit_resample(X_transaction, y_transaction)
-
-# Split transaction data
-X_transaction_train, X_transaction_test, y_transaction_train, y_transaction_test = train_test_split(
-    X_transaction_resampled, y_transaction_resampled, test_size=0.3, random_state=42)
-
-print("Transaction training set size:", X_transaction_train.shape)
-print("Transaction testing set size:", X_transaction_test.shape)
-
-# Standardize features for transaction models
-numeric_features = ['amount', 'oldbalanceOrg', 'newbalanceOrig', 'oldbalanceDest', 'newbalanceDest',
-                   'balance_difference', 'dest_balance_difference']
-transaction_scaler = StandardScaler()
-X_transaction_train[numeric_features] = transaction_scaler.fit_transform(X_transaction_train[numeric_features])
-X_transaction_test[numeric_features] = transaction_scaler.transform(X_transaction_test[numeric_features])
-
-# Save the transaction scaler
-joblib.dump(transaction_scaler, "transaction_scaler.pth")
-
-# CHUNK 4: ISOLATION FOREST MODEL
-# Train Isolation Forest on transaction features only
-iso_forest_features = ['amount', 'oldbalanceOrg', 'newbalanceOrig', 'oldbalanceDest', 'newbalanceDest']
-X_iso = X_transaction_train[iso_forest_features]
-
-iso_forest = IsolationForest(contamination=0.02, random_state=42)
-iso_forest.fit(X_iso)
-
-# Save the model
-joblib.dump(iso_forest, "isolation_forest.pth")
-
-# CHUNK 5: XGBOOST TRANSACTION MODEL
-# Train XGBoost on all transaction features
-transaction_xgb = xgb.XGBClassifier(
-    n_estimators=100,
-    max_depth=6,
-    learning_rate=0.1,
-    subsample=0.8,
-    colsample_bytree=0.8,
-    n_jobs=-1,
-    random_state=42
-)
-transaction_xgb.fit(X_transaction_train, y_transaction_train)
-
-# Save the model
-joblib.dump(transaction_xgb, "transaction_monitoring_agent.pth")
-
-# CHUNK 6: BEHAVIORAL ANALYSIS DATA PREPARATION (OPTIMIZED)
-print("\nPreparing data for behavioral analysis...")
-
-# More efficient approach using pandas groupby
-# First, create a subset of needed columns to reduce memory usage
-columns_needed = ['nameOrig', 'amount', 'oldbalanceOrg', 'balance_difference', 'large_transaction', 'isFraud']
-columns_needed.extend([col for col in behavioral_df.columns if col.startswith('type_')])
-behavioral_subset = behavioral_df[columns_needed]
-
-# Group the data and calculate aggregated statistics
-behavior_features = behavioral_subset.groupby('nameOrig').agg(
-    avg_transaction_amount=('amount', 'mean'),
-    max_transaction_amount=('amount', 'max'),
-    transaction_amount_std=('amount', 'std'),
-    avg_balance=('oldbalanceOrg', 'mean'),
-    transaction_count=('amount', 'count'),
-    large_transaction_ratio=('large_transaction', 'mean'),
-    balance_change_mean=('balance_difference', 'mean'),
-    is_fraud=('isFraud', lambda x: 1 if x.sum() > 0 else 0)
-)
-
-# Add transaction type ratios
-for type_col in [col for col in behavioral_subset.columns if col.startswith('type_')]:
-    behavior_features[f'{type_col}_ratio'] = behavioral_subset.groupby('nameOrig')[type_col].mean()
-
-# Reset index to convert nameOrig from index to column
-behavior_features_df = behavior_features.reset_index()
-
-# Handle NaN values from std calculation when there's only one transaction
-behavior_features_df = behavior_features_df.fillna(0)
-
-# Store user_ids and drop from features
-user_ids = behavior_features_df['nameOrig']
-behavior_features_df = behavior_features_df.drop('nameOrig', axis=1)
-
-print(f"Created behavioral features for {len(behavior_features_df)} users")
-
-# CHUNK 7: BEHAVIORAL MODEL PREPARATION
-# Split behavioral data
-X_behavior = behavior_features_df.drop('is_fraud', axis=1)
-y_behavior = behavior_features_df['is_fraud']
-
-# Handle class imbalance for behavioral models if needed
-if sum(y_behavior) / len(y_behavior) < 0.1:  # If fraud ratio is less than 10%
-    behavior_smote = SMOTE(sampling_strategy=0.3, random_state=42)
-    X_behavior_resampled, y_behavior_resampled = behavior_smote.fit_resample(X_behavior, y_behavior)
-else:
-    X_behavior_resampled, y_behavior_resampled = X_behavior, y_behavior
-
-# Split behavior data
-X_behavior_train, X_behavior_test, y_behavior_train, y_behavior_test = train_test_split(
-    X_behavior_resampled, y_behavior_resampled, test_size=0.3, random_state=42)
-
-print("Behavioral training set size:", X_behavior_train.shape)
-print("Behavioral testing set size:", X_behavior_test.shape)
-
-# Standardize behavioral features
-behavior_scaler = StandardScaler()
-X_behavior_train = behavior_scaler.fit_transform(X_behavior_train)
-X_behavior_test = behavior_scaler.transform(X_behavior_test)
-
-# Save the behavioral scaler
-joblib.dump(behavior_scaler, "behavior_scaler.pth")
-
-# CHUNK 8: BEHAVIORAL MODEL TRAINING
-# Train Logistic Regression on behavioral features
-behavior_model = LogisticRegression(max_iter=1000, C=1.0, solver='liblinear', random_state=42)
-behavior_model.fit(X_behavior_train, y_behavior_train)
-
-# Save model
-joblib.dump(behavior_model, "behavioral_analysis_agent.pth")
-
-# CHUNK 9: RISK SCORING MODEL
-# Train LightGBM model for risk scoring based on transaction features
-risk_agent = lgb.LGBMClassifier(n_estimators=100, learning_rate=0.05, num_leaves=31, n_jobs=-1)
-risk_agent.fit(X_transaction_train, y_transaction_train)
-
-# Save model
-joblib.dump(risk_agent, "risk_scoring_agent.pth")
-
-# CHUNK 10: MODEL EVALUATION
-print("\nEvaluating Transaction Models:")
-# Predict on test data using transaction models
-y_pred_transaction = transaction_xgb.predict(X_transaction_test)
-y_pred_risk = risk_agent.predict(X_transaction_test)
-
-# Compute accuracy for transaction models
-acc_transaction = accuracy_score(y_transaction_test, y_pred_transaction)
-acc_risk = accuracy_score(y_transaction_test, y_pred_risk)
-
-print("XGBoost Transaction Model Accuracy:", acc_transaction)
-print("LightGBM Risk Model Accuracy:", acc_risk)
-print("\nXGBoost Classification Report:")
-print(classification_report(y_transaction_test, y_pred_transaction))
-
-print("\nEvaluating Behavioral Model:")
-# Predict on test data using behavioral model
-y_pred_behavior = behavior_model.predict(X_behavior_test)
-
-# Compute accuracy for behavioral model
-acc_behavior = accuracy_score(y_behavior_test, y_pred_behavior)
-
-print("Logistic Regression Behavioral Model Accuracy:", acc_behavior)
-print("\nBehavioral Model Classification Report:")
-print(classification_report(y_behavior_test, y_pred_behavior))
\ No newline at end of file
+
+from features import TRANSACTION_FEATURES, TRANSACTION_NUMERIC_FEATURES, ISOLATION_FOREST_FEATURES, BEHAVIORAL_FEATURES
+from feature_cache import FEATURE_CACHE_DIR, cached_training_data, prepare
+from model_registry import publish, save_artifact, staging_dir
+from training_data import CSV_DTYPES, peak_rss_mb
+from window_features import BEHAVIOR_FEATURE_WINDOW, window_feature_frame
+
+MODELS_DIR = "models"
+RANDOM_STATE = 42
+
+# Relative share of the parallel cores for the multi-threaded fits
+JOB_WEIGHTS = {"isolation_forest": 1, "transaction_monitoring": 2, "risk_scoring": 2}
+TRANSACTION_MODEL_JOBS = list(JOB_WEIGHTS)
+
+
+def split_cores(cores: int, weights: Dict[str, int]) -> Dict[str, int]:
+    """Share cores between jobs in proportion to weights, at least one each (largest remainder)"""
+    total = sum(weights.values())
+    shares = {name: max(cores, len(weights)) * weight / total for name, weight in weights.items()}
+    allocation = {name: max(int(share), 1) for name, share in shares.items()}
+    spare = cores - sum(allocation.values())
+    for name in sorted(shares, key=lambda name: shares[name] - allocation[name], reverse=True)[:max(spare, 0)]:
+        allocation[name] += 1
+    return allocation
+
+
+def _evaluation(model, X_test, y_test) -> Dict:
+    from sklearn.metrics import accuracy_score, classification_report
+
+    y_pred = model.predict(X_test)
+    return {"accuracy": float(accuracy_score(y_test, y_pred)), "report": classification_report(y_test, y_pred)}
+
+
+def _run_job(name: str, job, *args) -> Dict:
+    """Worker entry point: run one job and measure it in this (fresh) process"""
+    start = time.perf_counter()
+    result = job(*args)
+    result.update(name=name, seconds=round(time.perf_counter() - start, 2), peak_rss_mb=round(peak_rss_mb()))
+    return result
+
+
+def prepare_transaction_data(data_path: str, cache_dir: str, work_dir: str, output_dir: str) -> Dict:
+    """SMOTE, split and scale the transaction features; the model jobs read the result from work_dir"""
+    from imblearn.over_sampling import SMOTE
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    data = cached_training_data(data_path, cache_dir)
+    X_transaction = pd.DataFrame(data.X_transaction, columns=TRANSACTION_FEATURES, copy=False)
+    y_transaction = pd.Series(data.y_transaction, name='isFraud')
+
+    # Handle class imbalance for transaction models
+    smote = SMOTE(sampling_strategy=0.3, random_state=RANDOM_STATE)
+    X_resampled, y_resampled = smote.fit_resample(X_transaction, y_transaction)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X_resampled, y_resampled, test_size=0.3, random_state=RANDOM_STATE)
+    del X_resampled, y_resampled
+
+    # Standardize the numeric transaction features; the flags and one-hots stay 0/1
+    transaction_scaler = StandardScaler()
+    X_train = X_train.astype(np.float64)
+    X_test = X_test.astype(np.float64)
+    X_train[TRANSACTION_NUMERIC_FEATURES] = transaction_scaler.fit_transform(X_train[TRANSACTION_NUMERIC_FEATURES])
+    X_test[TRANSACTION_NUMERIC_FEATURES] = transaction_scaler.transform(X_test[TRANSACTION_NUMERIC_FEATURES])
+
+    for split_name, array in [("X_train", X_train), ("X_test", X_test), ("y_train", y_train), ("y_test", y_test)]:
+        np.save(os.path.join(work_dir, f"{split_name}.npy"), array.to_numpy())
+    artifact = save_artifact(transaction_scaler, output_dir, "transaction_scaler.pth")
+    return {"artifacts": [artifact], "train_rows": len(X_train), "test_rows": len(X_test)}
+
+
+def _transaction_split(work_dir: str):
+    splits = {name: np.load(os.path.join(work_dir, f"{name}.npy"), mmap_mode="r")
+              for name in ["X_train", "X_test", "y_train", "y_test"]}
+    # DataFrames so the fitted models keep feature_names_in_, which api.py checks at load time
+    X_train = pd.DataFrame(splits["X_train"], columns=TRANSACTION_FEATURES, copy=False)
+    X_test = pd.DataFrame(splits["X_test"], columns=TRANSACTION_FEATURES, copy=False)
+    return X_train, X_test, splits["y_train"], splits["y_test"]
+
+
+def train_isolation_forest(work_dir: str, output_dir: str, n_jobs: int) -> Dict:
+    from sklearn.ensemble import IsolationForest
+
+    X_train, _, _, _ = _transaction_split(work_dir)
+    iso_forest = IsolationForest(contamination=0.02, random_state=RANDOM_STATE, n_jobs=n_jobs)
+    iso_forest.fit(X_train[ISOLATION_FOREST_FEATURES])
+    return {"artifacts": [save_artifact(iso_forest, output_dir, "isolation_forest.pth")], "n_jobs": n_jobs}
+
+
+def train_transaction_monitoring(work_dir: str, output_dir: str, n_jobs: int) -> Dict:
+    import xgboost as xgb
+
+    X_train, X_test, y_train, y_test = _transaction_split(work_dir)
+    transaction_xgb = xgb.XGBClassifier(
+        n_estimators=100,
+        max_depth=6,
+        learning_rate=0.1,
+        subsample=0.8,
+        colsample_bytree=0.8,
+        n_jobs=n_jobs,
+        random_state=RANDOM_STATE
+    )
+    transaction_xgb.fit(X_train, y_train)
+    artifact = save_artifact(transaction_xgb, output_dir, "transaction_monitoring_agent.pth")
+    return {"artifacts": [artifact], "n_jobs": n_jobs, **_evaluation(transaction_xgb, X_test, y_test)}
+
+
+def train_risk_scoring(work_dir: str, output_dir: str, n_jobs: int) -> Dict:
+    import lightgbm as lgb
+
+    X_train, X_test, y_train, y_test = _transaction_split(work_dir)
+    risk_agent = lgb.LGBMClassifier(n_estimators=100, learning_rate=0.05, num_leaves=31, n_jobs=n_jobs)
+    risk_agent.fit(X_train, y_train)
+    artifact = save_artifact(risk_agent, output_dir, "risk_scoring_agent.pth")
+    return {"artifacts": [artifact], "n_jobs": n_jobs, **_evaluation(risk_agent, X_test, y_test)}
+
+
+def windowed_behavior_data(data_path: str, window: int):
+    """Each transaction's behavioral features over its account's last window steps, labelled with isFraud"""
+    columns = ['step', 'type', 'amount', 'nameOrig', 'oldbalanceOrg', 'newbalanceOrig', 'isFraud']
+    df = pd.read_csv(data_path, usecols=columns, dtype={column: CSV_DTYPES[column] for column in columns})
+    X_behavior = window_feature_frame(df, [window])
+    # The serving feature names, so the fitted model passes the same schema checks
+    X_behavior.columns = BEHAVIORAL_FEATURES
+    return X_behavior, df['isFraud'].rename('is_fraud')
+
+
+def train_behavioral_analysis(data_path: str, cache_dir: str, output_dir: str, window: int = 0) -> Dict:
+    """The behavioral model end to end: SMOTE, split, scaler and logistic regression.
+
+    window=0 trains on lifetime per-account aggregates, window=N on per-transaction
+    features over the last N steps.
+    """
+    from imblearn.over_sampling import SMOTE
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    if window:
+        X_behavior, y_behavior = windowed_behavior_data(data_path, window)
+    else:
+        data = cached_training_data(data_path, cache_dir)
+        X_behavior = pd.DataFrame(data.X_behavior, columns=BEHAVIORAL_FEATURES, copy=False)
+        y_behavior = pd.Series(data.y_behavior, name='is_fraud')
+
+    # Handle class imbalance for behavioral models if needed
+    if sum(y_behavior) / len(y_behavior) < 0.1:  # If fraud ratio is less than 10%
+        behavior_smote = SMOTE(sampling_strategy=0.3, random_state=RANDOM_STATE)
+        X_behavior, y_behavior = behavior_smote.fit_resample(X_behavior, y_behavior)
+
+    X_train, X_test, y_train, y_test = train_test_split(X_behavior, y_behavior, test_size=0.3,
+                                                        random_state=RANDOM_STATE)
+
+    behavior_scaler = StandardScaler()
+    X_train = behavior_scaler.fit_transform(X_train)
+    X_test = behavior_scaler.transform(X_test)
+
+    # liblinear is single-threaded
+    behavior_model = LogisticRegression(max_iter=1000, C=1.0, solver='liblinear', random_state=RANDOM_STATE)
+    behavior_model.fit(X_train, y_train)
+    artifacts = [save_artifact(behavior_scaler, output_dir, "behavior_scaler.pth"),
+                 save_artifact(behavior_model, output_dir, "behavioral_analysis_agent.pth")]
+    return {"artifacts": artifacts, "n_jobs": 1, "behavior_window": window, "train_rows": len(X_train),
+            "test_rows": len(X_test), **_evaluation(behavior_model, X_test, y_test)}
+
+
+def train_all(data_path: str, output_dir: str = MODELS_DIR, cores: int = None,
+              cache_dir: str = FEATURE_CACHE_DIR, version: str = None,
+              behavior_window: int = BEHAVIOR_FEATURE_WINDOW) -> List[Dict]:
+    """Run the training jobs concurrently, then publish the new model set; one result per job, in completion order"""
+    cores = cores or os.cpu_count() or 1
+    os.makedirs(output_dir, exist_ok=True)
+    # Build the feature cache once up front; every job then memory-maps it
+    prepare(data_path, cache_dir)
+
+    # While the behavioral job runs it keeps one core; the transaction fits share the rest
+    model_cores = split_cores(max(cores - 1, 1), JOB_WEIGHTS)
+    work_dir = tempfile.mkdtemp(prefix="training_", dir=cache_dir)
+    # Nothing is written to output_dir itself until publish
+    staging = staging_dir(output_dir)
+    results = []
+    try:
+        # A fresh process per job (spawn, one task per child) keeps each job's peak RSS its own
+        # and returns its memory to the OS as soon as it finishes
+        with ProcessPoolExecutor(max_workers=min(cores, 1 + len(TRANSACTION_MODEL_JOBS)),
+                                 mp_context=multiprocessing.get_context("spawn"), max_tasks_per_child=1) as pool:
+            try:
+                pending = {
+                    pool.submit(_run_job, "behavioral_analysis", train_behavioral_analysis, data_path, cache_dir,
+                                staging, behavior_window),
+                    pool.submit(_run_job, "transaction_data", prepare_transaction_data, data_path, cache_dir,
+                                work_dir, staging),
+                }
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        result = future.result()
+                        results.append(result)
+                        print_result(result)
+                        if result["name"] == "transaction_data":
+                            pending |= {
+                                pool.submit(_run_job, "isolation_forest", train_isolation_forest, work_dir, staging,
+                                            model_cores["isolation_forest"]),
+                                pool.submit(_run_job, "transaction_monitoring", train_transaction_monitoring, work_dir,
+                                            staging, model_cores["transaction_monitoring"]),
+                                pool.submit(_run_job, "risk_scoring", train_risk_scoring, work_dir, staging,
+                                            model_cores["risk_scoring"]),
+                            }
+            finally:
+                pool.shutdown(wait=True, cancel_futures=True)
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+        manifest = publish(output_dir, staging, version)
+    except BaseException:
+        # A failed run leaves the published model set as it was
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    print(f"Published {output_dir}/versions/{manifest['version']} and {output_dir}/manifest.json")
+    return results
+
+
+def print_result(result: Dict):
+    extra = f" accuracy={result['accuracy']:.4f}" if "accuracy" in result else ""
+    print(f"{result['name']:<24} seconds={result['seconds']:<8} peak_rss_mb={result['peak_rss_mb']:<6} "
+          f"n_jobs={result.get('n_jobs', 1)}{extra}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the fraud models from a local Fraud.csv")
+    parser.add_argument("--data", required=True, help="path to Fraud.csv")
+    parser.add_argument("--output-dir", default=MODELS_DIR, help="where to write the .pth artifacts")
+    parser.add_argument("--cores", type=int, default=None, help="core budget (default: all cores)")
+    parser.add_argument("--cache-dir", default=FEATURE_CACHE_DIR)
+    parser.add_argument("--version", default=None, help="manifest version tag (default: timestamp and digest)")
+    parser.add_argument("--behavior-window", type=int, default=BEHAVIOR_FEATURE_WINDOW,
+                        help="train the behavioral model on features over this many steps (0: lifetime)")
+    parser.add_argument("--report", default=None, help="write per-job timings, memory and metrics as JSON")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = train_all(args.data, args.output_dir, args.cores, args.cache_dir, args.version, args.behavior_window)
+    total_seconds = time.perf_counter() - start
+
+    for result in results:
+        if "report" in result:
+            print(f"\n{result['name']} classification report:\n{result['report']}")
+    sequential_seconds = sum(result["seconds"] for result in results)
+    print(f"Total wall-clock {total_seconds:.1f}s (sum of job times {sequential_seconds:.1f}s)")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"total_seconds": round(total_seconds, 2), "jobs": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Fold the StandardScalers into the models they feed.
+
+Every model in api.py reads StandardScaler output, z = (x - mean) / scale.
+A fused model reads the raw features directly, so the transform step goes away:
+
+- Tree models (native engine from tree_engine.py): a split "z <= t" becomes
+  "x <= t'", where t' is the largest float64 x whose scaled value still
+  goes left. It is found with split_boundaries, so routing is exact,
+  including float rounding in the scaler.
+- LogisticRegression: w.z + b = (w / scale).x + (b - sum(w * mean / scale)).
+  This is exact up to float64 rounding in the dot product.
+
+tests/test_scaler_fusion.py checks the parity against the two-step path.
+"""
+import copy
+from typing import Dict
+
+import numpy as np
+
+from features import NUMERIC_COLUMNS, ISOLATION_FOREST_COLUMNS
+from tree_engine import NATIVE_MODELS, TreeEnsemble, compile_model, split_boundaries
+
+
+def fold_scaler_into_trees(native, mean: np.ndarray, scale: np.ndarray, columns):
+    """Copy of a native tree model that reads unscaled features.
+
+    columns are the model's input columns that the scaler produced, in
+    scaler order; any other input column passes through unscaled.
+    """
+    ensemble = native.ensemble
+    column_mean = np.zeros(ensemble.n_features)
+    column_scale = np.ones(ensemble.n_features)
+    column_mean[columns] = mean
+    column_scale[columns] = scale
+
+    # Unscaled columns and leaves (threshold inf) keep their thresholds: (x - 0) / 1 == x
+    node_mean = column_mean[ensemble.feature]
+    node_scale = column_scale[ensemble.feature]
+    threshold = split_boundaries(
+        lambda x: (x - node_mean) / node_scale <= ensemble.threshold, ensemble.threshold.size
+    )
+
+    fused = copy.copy(native)
+    fused.ensemble = TreeEnsemble(
+        **{name: getattr(ensemble, name) for name in TreeEnsemble.ARRAYS if name != "threshold"},
+        threshold=threshold,
+        n_features=ensemble.n_features,
+    )
+    return fused
+
+
+def fold_scaler_into_linear_model(model, mean: np.ndarray, scale: np.ndarray):
+    """Copy of a fitted linear model (coef_, intercept_) that reads unscaled features"""
+    fused = copy.deepcopy(model)
+    fused.coef_ = model.coef_ / scale
+    fused.intercept_ = model.intercept_ - (model.coef_ * (mean / scale)).sum(axis=1)
+    return fused
+
+
+def fuse_models(models: Dict[str, object], scalers: Dict[str, object]) -> Dict[str, object]:
+    """Fused versions of the four API models, keyed like api.models"""
+    transaction_scaler = scalers["transaction_scaler"]
+    behavior_scaler = scalers["behavior_scaler"]
+    fused = {}
+
+    for name in NATIVE_MODELS:
+        if name == "isolation_forest":
+            # Isolation Forest reads a column slice of the scaler output
+            mean = transaction_scaler.mean_[ISOLATION_FOREST_COLUMNS]
+            scale = transaction_scaler.scale_[ISOLATION_FOREST_COLUMNS]
+            columns = ISOLATION_FOREST_COLUMNS
+        else:
+            mean, scale, columns = transaction_scaler.mean_, transaction_scaler.scale_, NUMERIC_COLUMNS
+        fused[name] = fold_scaler_into_trees(compile_model(name, models[name]), mean, scale, columns)
+
+    fused["behavioral_analysis"] = fold_scaler_into_linear_model(
+        models["behavioral_analysis"], behavior_scaler.mean_, behavior_scaler.scale_
+    )
+    return fused
+
@@ -0,0 +1,175 @@
+"""Pre-fork multi-worker serving for api.py and agent_server.py.
+
+`uvicorn --workers N` starts every worker as a fresh interpreter that
+imports the app and loads the models itself, so N workers hold N private
+copies of every model. This launcher imports the app and loads the models
+once in the parent, then forks N workers that serve one shared listening
+socket. The children inherit the parent's memory copy-on-write: the
+XGBoost and LightGBM boosters, the Isolation Forest trees and the NumPy
+arrays stay shared pages until something writes to them. gc.freeze()
+before the fork keeps the garbage collector from touching (and so copying)
+the preloaded objects.
+
+Each worker scores on one core (OMP_NUM_THREADS defaults to 1 here), so
+the workers, not the libraries' thread pools, provide the parallelism.
+The parent only supervises: it restarts a worker that dies and forwards
+SIGINT/SIGTERM for a graceful shutdown.
+
+Models a worker hot-reloads later (api.py's /admin/reload or
+MODEL_WATCH_INTERVAL) are private to that worker; restart the server to
+share a new version again.
+
+Usage from backend/:
+    python serve.py api:app --workers 4 [--host 0.0.0.0] [--port 8000]
+    python serve.py agent_server:app --workers 2 --port 8001
+"""
+import os
+
+# Must be set before numpy, xgboost or lightgbm start their thread pools
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+
+import argparse
+import gc
+import importlib
+import signal
+import socket
+import sys
+import time
+from typing import Dict
+
+from logging_utils import configure_logging
+
+logger = configure_logging("serve")
+
+# Seconds to wait before replacing a worker that died, so a crash loop cannot spin
+RESPAWN_DELAY = 1.0
+
+
+def preload_api():
+    import api
+    # Workers must inherit fully loaded models; lazy or background loading would load after the fork
+    api.MODEL_LOADING = "eager"
+    api.load_models()
+
+
+def preload_agent_server():
+    import agents
+    agents.get_fraud_detection_graph(use_async=True)
+    if agents.MODEL_BACKEND == "local":
+        agents.get_local_models()
+
+
+PRELOADERS = {"api": preload_api, "agent_server": preload_agent_server}
+
+
+def load_app(app_path: str):
+    module_name, _, attribute = app_path.partition(":")
+    module = importlib.import_module(module_name)
+    preload = PRELOADERS.get(module_name)
+    if preload is not None:
+        preload()
+    return getattr(module, attribute or "app")
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock: socket.socket, log_level: str):
+    """Child process: serve the preloaded app on the shared socket until told to stop"""
+    import uvicorn
+
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    server = uvicorn.Server(uvicorn.Config(app, log_level=log_level, lifespan="on"))
+    server.run(sockets=[sock])
+
+
+def spawn_worker(app, sock: socket.socket, log_level: str) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            run_worker(app, sock, log_level)
+        except BaseException:
+            logger.exception("Worker crashed")
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def serve(app_path: str, workers: int, host: str, port: int, log_level: str = "warning", backlog: int = 2048):
+    app = load_app(app_path)
+    sock = bind_socket(host, port, backlog)
+
+    # Everything loaded so far is long-lived: move it out of the collector's reach so
+    # collections in the workers do not write to (and so un-share) its pages
+    gc.collect()
+    gc.freeze()
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    children: Dict[int, int] = {}
+    for index in range(workers):
+        children[spawn_worker(app, sock, log_level)] = index
+    logger.info("Serving", extra={"fields": {
+        "app": app_path, "host": host, "port": port, "workers": workers, "pids": list(children)
+    }})
+
+    while children:
+        if stopping:
+            for pid in children:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+            for pid in list(children):
+                os.waitpid(pid, 0)
+                children.pop(pid)
+            break
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            time.sleep(0.2)
+            continue
+        index = children.pop(pid)
+        if not stopping:
+            logger.warning("Worker exited, restarting", extra={"fields": {
+                "pid": pid, "worker": index, "status": os.waitstatus_to_exitcode(status)
+            }})
+            time.sleep(RESPAWN_DELAY)
+            children[spawn_worker(app, sock, log_level)] = index
+    sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a backend app from pre-forked workers sharing its models")
+    parser.add_argument("app", help="module:attribute, e.g. api:app or agent_server:app")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default=os.getenv("API_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("API_PORT", 8000)))
+    parser.add_argument("--log-level", default="warning")
+    args = parser.parse_args()
+
+    # Import the app modules from backend/ wherever the launcher is started from
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    serve(args.app, args.workers, args.host, args.port, args.log_level)
+
+
+if __name__ == "__main__":
+    main()
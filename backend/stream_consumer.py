@@ -0,0 +1,250 @@
+"""Kafka consumer that scores the financial_transactions topic.
+
+kafka/src/producer.ts publishes one JSON message per dataset row, keyed by
+nameOrig. This service polls the topic in micro-batches, scores each batch
+with one vectorized api.score_all call, and writes one decision message per
+transaction to the output topic. Offsets are committed only after a
+batch's decisions have been flushed, so a crash replays unscored
+transactions instead of dropping them.
+
+Behavioral features come from an AccountFeatureStore keyed by nameOrig,
+updated with every consumed transaction. The topic is keyed by nameOrig,
+so each account's history stays with the consumer that owns its
+partition. Delivery is at least once; each transaction carries its
+partition:offset as transaction id, so a replayed batch gets the features
+it had the first time instead of being added to the account histories
+again (for up to FEATURE_STORE_RECENT_TRANSACTIONS transactions per account).
+With BEHAVIOR_FEATURE_WINDOW set, the features come from a
+window_features.WindowedFeatureStore over that many steps instead.
+
+Configuration (environment):
+    KAFKA_BOOTSTRAP_SERVERS  broker list (default localhost:9092)
+    KAFKA_INPUT_TOPIC        default financial_transactions
+    KAFKA_OUTPUT_TOPIC       default fraud_decisions
+    KAFKA_GROUP_ID           default fraudshield-scorer
+    STREAM_BATCH_SIZE        max transactions per micro-batch (default 500)
+    STREAM_POLL_TIMEOUT_MS   poll wait when the topic is idle (default 100)
+    STREAM_REPORT_INTERVAL   seconds between throughput reports (default 10)
+    FEATURE_STORE_MAX_ACCOUNTS  accounts kept in the feature store (default 100000)
+    FEATURE_STORE_RECENT_TRANSACTIONS  transactions per account remembered for replays (default 16)
+    BEHAVIOR_FEATURE_WINDOW  window length in steps for the behavioral features (default 0: lifetime)
+
+Run from backend/:  python stream_consumer.py
+"""
+import argparse
+import functools
+import json
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+import api
+from features import BEHAVIORAL_FEATURES, ISOLATION_FOREST_FEATURES, transaction_matrix
+from feature_store import FEATURE_STORE_RECENT_TRANSACTIONS, AccountFeatureStore, AccountState
+from logging_utils import configure_logging
+from window_features import BEHAVIOR_FEATURE_WINDOW, serving_window_store
+
+load_dotenv()
+
+logger = configure_logging("stream_consumer")
+
+KAFKA_BOOTSTRAP_SERVERS = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "localhost:9092")
+INPUT_TOPIC = os.getenv("KAFKA_INPUT_TOPIC", "financial_transactions")
+OUTPUT_TOPIC = os.getenv("KAFKA_OUTPUT_TOPIC", "fraud_decisions")
+GROUP_ID = os.getenv("KAFKA_GROUP_ID", "fraudshield-scorer")
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", 500))
+STREAM_POLL_TIMEOUT_MS = int(os.getenv("STREAM_POLL_TIMEOUT_MS", 100))
+STREAM_REPORT_INTERVAL = float(os.getenv("STREAM_REPORT_INTERVAL", 10))
+
+
+def parse_transaction(value: bytes) -> Dict:
+    """Decode a producer.ts message; csv-parser sends every field as a string"""
+    message = json.loads(value)
+    # The five raw amount/balance columns; the other features are derived from them
+    transaction = {name: float(message[name]) for name in ISOLATION_FOREST_FEATURES}
+    transaction["transaction_type"] = message.get("type")
+    transaction["step"] = int(float(message.get("step", 0)))
+    transaction["nameOrig"] = message.get("nameOrig")
+    transaction["nameDest"] = message.get("nameDest")
+    return transaction
+
+
+def single_transaction_behavior(transactions: List[Dict]) -> np.ndarray:
+    """Behavioral matrix treating each transaction as its account's whole history
+    (stateless; the service itself uses an AccountFeatureStore). Built with the
+    store's own AccountState, so the features match training for a one-row history."""
+    out = np.empty((len(transactions), len(BEHAVIORAL_FEATURES)))
+    for i, transaction in enumerate(transactions):
+        state = AccountState()
+        state.update(transaction)
+        state.features(out[i])
+    return out
+
+
+def account_behavior_source() -> Callable[[List[Dict]], np.ndarray]:
+    """The service's behavior_source: per-account history keyed by nameOrig, lifetime or over
+    BEHAVIOR_FEATURE_WINDOW steps, with replayed records (same transaction_id) counted once"""
+    window_store = serving_window_store()
+    if window_store is None:
+        store = AccountFeatureStore(recent_transactions=FEATURE_STORE_RECENT_TRANSACTIONS)
+        return functools.partial(store.observe_batch, id_field="transaction_id")
+
+    def windowed(transactions: List[Dict]) -> np.ndarray:
+        return window_store.observe_batch(transactions, id_field="transaction_id")[BEHAVIOR_FEATURE_WINDOW]
+    return windowed
+
+
+class ThroughputMeter:
+    """Running transaction count and rate, logged every report_interval seconds"""
+
+    def __init__(self, report_interval: float = STREAM_REPORT_INTERVAL):
+        self.report_interval = report_interval
+        self.transactions = 0
+        self.batches = 0
+        self.busy_seconds = 0.0
+        self.started = time.perf_counter()
+        self._last_report = self.started
+        self._last_count = 0
+
+    def record(self, transactions: int, seconds: float):
+        self.transactions += transactions
+        self.batches += 1
+        self.busy_seconds += seconds
+        now = time.perf_counter()
+        if now - self._last_report >= self.report_interval:
+            logger.info("Stream throughput", extra={"fields": self.snapshot(now)})
+            self._last_report, self._last_count = now, self.transactions
+
+    def snapshot(self, now: Optional[float] = None) -> Dict:
+        now = now if now is not None else time.perf_counter()
+        interval = now - self._last_report
+        return {
+            "transactions": self.transactions,
+            "batches": self.batches,
+            # Wall-clock rate since the last report, including idle polls
+            "interval_tps": round((self.transactions - self._last_count) / interval, 1) if interval > 0 else 0.0,
+            # Rate while scoring, i.e. what the consumer sustains when the topic is backlogged
+            "sustained_tps": round(self.transactions / self.busy_seconds, 1) if self.busy_seconds > 0 else 0.0,
+            "avg_batch_size": round(self.transactions / self.batches, 1) if self.batches else 0.0,
+        }
+
+
+class StreamScorer:
+    """Poll -> score -> produce -> flush -> commit, one micro-batch at a time.
+
+    consumer and producer follow the kafka-python API (KafkaConsumer created
+    with enable_auto_commit=False); memory_broker.InMemoryBroker provides
+    compatible stand-ins. behavior_source builds the behavioral matrix for a
+    batch of parsed transactions, e.g. AccountFeatureStore().observe_batch.
+    """
+
+    def __init__(self, consumer, producer, output_topic: str = OUTPUT_TOPIC,
+                 batch_size: int = STREAM_BATCH_SIZE, poll_timeout_ms: int = STREAM_POLL_TIMEOUT_MS,
+                 behavior_source: Callable[[List[Dict]], np.ndarray] = single_transaction_behavior,
+                 meter: Optional[ThroughputMeter] = None):
+        self.consumer = consumer
+        self.producer = producer
+        self.output_topic = output_topic
+        self.batch_size = batch_size
+        self.poll_timeout_ms = poll_timeout_ms
+        self.behavior_source = behavior_source
+        self.meter = meter or ThroughputMeter()
+
+    def score_records(self, records: List) -> List[Dict]:
+        """Decision messages for a list of consumer records (unparseable records are skipped)"""
+        transactions, sources = [], []
+        for record in records:
+            try:
+                transaction = parse_transaction(record.value)
+                # Same id when the record is delivered again
+                transaction["transaction_id"] = f"{record.partition}:{record.offset}"
+                transactions.append(transaction)
+                sources.append(record)
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning("Skipping malformed transaction message", extra={"fields": {
+                    "partition": record.partition, "offset": record.offset, "error": str(e)
+                }})
+        if not transactions:
+            return []
+
+        scores = api.score_all(transaction_matrix(transactions), self.behavior_source(transactions))
+        return [
+            {
+                "nameOrig": t["nameOrig"],
+                "nameDest": t["nameDest"],
+                "step": t["step"],
+                "partition": record.partition,
+                "offset": record.offset,
+                **score.model_dump(),
+            }
+            for t, record, score in zip(transactions, sources, scores)
+        ]
+
+    def run_once(self) -> int:
+        """Process one micro-batch; returns the number of records consumed"""
+        polled = self.consumer.poll(timeout_ms=self.poll_timeout_ms, max_records=self.batch_size)
+        records = [record for partition_records in polled.values() for record in partition_records]
+        if not records:
+            return 0
+
+        start = time.perf_counter()
+        for decision in self.score_records(records):
+            self.producer.send(
+                self.output_topic,
+                key=decision["nameOrig"].encode() if decision["nameOrig"] else None,
+                value=json.dumps(decision).encode(),
+            )
+        # Decisions must be durable before the input offsets move past them
+        self.producer.flush()
+        self.consumer.commit()
+        self.meter.record(len(records), time.perf_counter() - start)
+        return len(records)
+
+    def run(self, max_batches: Optional[int] = None, stop_when_idle: bool = False):
+        batches = 0
+        try:
+            while max_batches is None or batches < max_batches:
+                consumed = self.run_once()
+                if consumed:
+                    batches += 1
+                elif stop_when_idle:
+                    break
+        finally:
+            logger.info("Stream consumer stopped", extra={"fields": self.meter.snapshot()})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score the financial_transactions topic")
+    parser.add_argument("--max-batches", type=int, default=None, help="stop after this many micro-batches")
+    parser.add_argument("--stop-when-idle", action="store_true", help="stop at the first empty poll")
+    args = parser.parse_args()
+
+    from kafka import KafkaConsumer, KafkaProducer
+
+    api.load_models()
+    consumer = KafkaConsumer(
+        INPUT_TOPIC,
+        bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS,
+        group_id=GROUP_ID,
+        enable_auto_commit=False,
+        auto_offset_reset="earliest",
+        max_poll_records=STREAM_BATCH_SIZE,
+    )
+    producer = KafkaProducer(bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS, linger_ms=5)
+    logger.info("Stream consumer started", extra={"fields": {
+        "bootstrap_servers": KAFKA_BOOTSTRAP_SERVERS, "input_topic": INPUT_TOPIC,
+        "output_topic": OUTPUT_TOPIC, "group_id": GROUP_ID, "batch_size": STREAM_BATCH_SIZE
+    }})
+    try:
+        scorer = StreamScorer(consumer, producer, behavior_source=account_behavior_source())
+        scorer.run(args.max_batches, args.stop_when_idle)
+    finally:
+        producer.close()
+        consumer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+"""Shared fixtures: the backend modules are flat, so backend/ goes on sys.path"""
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+SAMPLE_DATASET = os.path.join(BACKEND_DIR, "..", "frontend", "public", "trimmed_dataset.csv")
+
+
+@pytest.fixture(scope="session")
+def sample_dataset() -> str:
+    return SAMPLE_DATASET
+
+
+@pytest.fixture(scope="session")
+def loaded_api():
+    """api.py with the models in backend/models loaded"""
+    import api
+
+    api.MODELS_DIR = os.path.join(BACKEND_DIR, "models")
+    api.load_models()
+    return api
@@ -0,0 +1,94 @@
+"""The online feature store against the training groupby, and retried transactions"""
+import zlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_store import AccountFeatureStore, FEATURE_STORE_RECENT_TRANSACTIONS
+from features import BEHAVIORAL_FEATURES, LARGE_TRANSACTION_THRESHOLD, TRANSACTION_TYPES
+
+TOLERANCE = 1e-6
+
+# None keeps the sample's accounts, mostly one transaction each; 50 folds them into longer histories
+ACCOUNTS = [None, 50]
+
+
+def read_sample(path, accounts):
+    df = pd.read_csv(path)
+    if accounts is not None:
+        df["nameOrig"] = [f"A{zlib.crc32(name.encode()) % accounts}" for name in df["nameOrig"]]
+    return df
+
+
+def sample_transactions(df):
+    return [
+        {"nameOrig": row.nameOrig, "amount": row.amount, "oldbalanceOrg": row.oldbalanceOrg,
+         "newbalanceOrig": row.newbalanceOrig, "transaction_type": row.type, "id": str(i)}
+        for i, row in enumerate(df.itertuples())
+    ]
+
+
+def training_features(df):
+    """CHUNK 6 of model_training.py, with the serving large-transaction threshold"""
+    df = df.copy()
+    df["balance_difference"] = df["oldbalanceOrg"] - df["newbalanceOrig"]
+    df["large_transaction"] = (df["amount"] > LARGE_TRANSACTION_THRESHOLD).astype(int)
+    for t_type in TRANSACTION_TYPES:
+        df[f"type_{t_type}"] = (df["type"] == t_type).astype(int)
+    grouped = df.groupby("nameOrig")
+    expected = grouped.agg(
+        avg_transaction_amount=("amount", "mean"),
+        max_transaction_amount=("amount", "max"),
+        transaction_amount_std=("amount", "std"),
+        avg_balance=("oldbalanceOrg", "mean"),
+        transaction_count=("amount", "count"),
+        large_transaction_ratio=("large_transaction", "mean"),
+        balance_change_mean=("balance_difference", "mean"),
+    )
+    for t_type in TRANSACTION_TYPES:
+        expected[f"type_{t_type}_ratio"] = grouped[f"type_{t_type}"].mean()
+    return expected.fillna(0)[BEHAVIORAL_FEATURES]
+
+
+@pytest.mark.parametrize("accounts", ACCOUNTS)
+def test_matches_training_groupby(sample_dataset, accounts):
+    df = read_sample(sample_dataset, accounts)
+    store = AccountFeatureStore(max_accounts=len(df))
+    store.observe_batch(sample_transactions(df))
+
+    expected = training_features(df)
+    actual = np.array([list(store.features(name).values()) for name in expected.index])
+    # Relative error: amounts and balances run to 1e7
+    scale = np.maximum(np.abs(expected.to_numpy()), 1.0)
+    assert np.max(np.abs(actual - expected.to_numpy()) / scale) <= TOLERANCE
+
+
+@pytest.mark.parametrize("accounts", ACCOUNTS)
+def test_retries_with_ids_count_once(sample_dataset, accounts):
+    df = read_sample(sample_dataset, accounts)
+    transactions = sample_transactions(df)
+    reference = AccountFeatureStore(max_accounts=len(df))
+    expected = reference.observe_batch(transactions)
+
+    # Each transaction after the first is followed by a retry of the one before it
+    replay = transactions[:1] + [transaction for i in range(1, len(transactions))
+                                 for transaction in (transactions[i], transactions[i - 1])]
+    store = AccountFeatureStore(max_accounts=len(df), recent_transactions=FEATURE_STORE_RECENT_TRANSACTIONS)
+    rows = store.observe_batch(replay, id_field="id")
+
+    np.testing.assert_array_equal(np.vstack([rows[:1], rows[1::2]]), expected)
+    np.testing.assert_array_equal(rows[2::2], expected[:-1])
+    assert store.duplicates == len(transactions) - 1
+    for name in set(df["nameOrig"]):
+        assert store.features(name) == reference.features(name)
+
+
+def test_without_ids_every_observation_counts():
+    # Two genuine transactions can share every field
+    transaction = {"nameOrig": "C1", "amount": 100.0, "oldbalanceOrg": 0.0, "newbalanceOrig": 0.0,
+                   "transaction_type": "PAYMENT"}
+    store = AccountFeatureStore(recent_transactions=FEATURE_STORE_RECENT_TRANSACTIONS)
+    store.observe_batch([transaction, dict(transaction)])
+    assert store.duplicates == 0
+    assert store.features("C1")["transaction_count"] == 2
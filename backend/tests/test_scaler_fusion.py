@@ -0,0 +1,53 @@
+"""The scaler-fused models score the sample data like the scaler + model path"""
+import numpy as np
+import pytest
+
+from benchmarks.common import read_sample_rows, transaction_payload, behavioral_payload
+from features import NUMERIC_COLUMNS, ISOLATION_FOREST_COLUMNS, transaction_matrix, behavioral_matrix
+from scaler_fusion import fuse_models
+from tree_engine import NATIVE_MODELS, compile_model
+
+# For the linear model; tree folds are exact
+TOLERANCE = 1e-9
+
+
+@pytest.fixture(scope="module")
+def sample(loaded_api, sample_dataset):
+    rows = read_sample_rows(sample_dataset)
+    X = transaction_matrix([transaction_payload(row) for row in rows])
+    B = behavioral_matrix([behavioral_payload(row) for row in rows])
+    scaled = X.copy()
+    scaled[:, NUMERIC_COLUMNS] = loaded_api.scalers["transaction_scaler"].transform(X[:, NUMERIC_COLUMNS])
+    return X, scaled, B
+
+
+@pytest.fixture(scope="module")
+def fused(loaded_api):
+    return fuse_models(loaded_api.models, loaded_api.scalers)
+
+
+@pytest.mark.parametrize("name", NATIVE_MODELS)
+def test_fused_trees_match(name, loaded_api, sample, fused):
+    X, scaled, _ = sample
+    library = loaded_api.models[name]
+    if name == "isolation_forest":
+        expected = library.decision_function(scaled[:, ISOLATION_FOREST_COLUMNS])
+        native = compile_model(name, library).decision_function(scaled[:, ISOLATION_FOREST_COLUMNS])
+        actual = fused[name].decision_function(X[:, ISOLATION_FOREST_COLUMNS])
+        np.testing.assert_array_equal(expected < 0, actual < 0)
+    else:
+        expected = library.predict_proba(scaled)[:, 1]
+        native = compile_model(name, library).predict_proba(scaled)[:, 1]
+        actual = fused[name].predict_proba(X)[:, 1]
+        np.testing.assert_array_equal(expected > 0.5, actual > 0.5)
+    # The fold must not move any split, so the fused and unfused native trees agree bit for bit
+    np.testing.assert_array_equal(native, actual)
+
+
+def test_fused_linear_model_matches(loaded_api, sample, fused):
+    _, _, B = sample
+    expected = loaded_api.models["behavioral_analysis"].predict_proba(
+        loaded_api.scalers["behavior_scaler"].transform(B))[:, 1]
+    actual = fused["behavioral_analysis"].predict_proba(B)[:, 1]
+    np.testing.assert_array_equal(expected > 0.5, actual > 0.5)
+    assert np.max(np.abs(expected - actual)) <= TOLERANCE
@@ -0,0 +1,39 @@
+"""The native tree engine scores the sample data like the library models"""
+import csv
+
+import numpy as np
+import pytest
+
+from features import NUMERIC_COLUMNS, ISOLATION_FOREST_COLUMNS, transaction_matrix
+from tree_engine import NATIVE_MODELS, compile_model
+
+TOLERANCE = 1e-6
+
+
+@pytest.fixture(scope="module")
+def scaled_sample(loaded_api, sample_dataset):
+    with open(sample_dataset, newline="") as f:
+        rows = [
+            {**{key: float(row[key]) for key in ["amount", "oldbalanceOrg", "newbalanceOrig",
+                                                 "oldbalanceDest", "newbalanceDest"]},
+             "transaction_type": row["type"]}
+            for row in csv.DictReader(f)
+        ]
+    X = transaction_matrix(rows)
+    scaled = X.copy()
+    scaled[:, NUMERIC_COLUMNS] = loaded_api.scalers["transaction_scaler"].transform(X[:, NUMERIC_COLUMNS])
+    return scaled
+
+
+@pytest.mark.parametrize("name", NATIVE_MODELS)
+def test_native_matches_library(name, loaded_api, scaled_sample):
+    library = loaded_api.models[name]
+    native = compile_model(name, library)
+    if name == "isolation_forest":
+        inputs = scaled_sample[:, ISOLATION_FOREST_COLUMNS]
+        expected, actual = library.decision_function(inputs), native.decision_function(inputs)
+        np.testing.assert_array_equal(expected < 0, actual < 0)
+    else:
+        expected, actual = library.predict_proba(scaled_sample)[:, 1], native.predict_proba(scaled_sample)[:, 1]
+        np.testing.assert_array_equal(expected > 0.5, actual > 0.5)
+    assert np.max(np.abs(expected - actual)) <= TOLERANCE
@@ -0,0 +1,92 @@
+"""Sliding-window features against a brute-force rescan, late events, and retried transactions"""
+import zlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_store import FEATURE_STORE_RECENT_TRANSACTIONS
+from features import LARGE_TRANSACTION_THRESHOLD, TRANSACTION_TYPES
+from window_features import BEHAVIOR_WINDOWS, WindowedFeatureStore, window_feature_frame
+
+TOLERANCE = 1e-9
+
+# None keeps the sample's accounts, mostly one transaction each; 50 folds them into longer histories
+ACCOUNTS = [None, 50]
+
+
+def read_sample(path, accounts):
+    df = pd.read_csv(path)
+    if accounts is not None:
+        df["nameOrig"] = [f"A{zlib.crc32(name.encode()) % accounts}" for name in df["nameOrig"]]
+    return df
+
+
+def brute_force_row(history, step, length):
+    # All of the account's transactions so far with step in (step - length, step]
+    window = history[history["step"] > step - length]
+    amounts = window["amount"]
+    n = len(window)
+    return np.array([
+        amounts.mean(), amounts.max(), amounts.std() if n > 1 else 0.0, window["oldbalanceOrg"].mean(), n,
+        (amounts > LARGE_TRANSACTION_THRESHOLD).mean(), (window["oldbalanceOrg"] - window["newbalanceOrig"]).mean(),
+        *[(window["type"] == t_type).mean() for t_type in TRANSACTION_TYPES],
+    ])
+
+
+@pytest.mark.parametrize("accounts", ACCOUNTS)
+def test_matches_brute_force_rescan(sample_dataset, accounts):
+    df = read_sample(sample_dataset, accounts)
+    actual = window_feature_frame(df, BEHAVIOR_WINDOWS, bucket_width=1)
+
+    ordered = df.sort_values("step", kind="stable")
+    position = pd.Series(np.arange(len(ordered)), index=ordered.index)
+    expected = np.empty(actual.shape)
+    for i, (index, row) in enumerate(df.iterrows()):
+        same_account = ordered[ordered["nameOrig"] == row["nameOrig"]]
+        history = same_account[position[same_account.index] <= position[index]]
+        expected[i] = np.concatenate([brute_force_row(history, row["step"], length) for length in BEHAVIOR_WINDOWS])
+
+    scale = np.maximum(np.abs(expected), 1.0)
+    assert np.max(np.abs(actual.to_numpy() - expected) / scale) <= TOLERANCE
+
+
+def test_late_events_counted_per_window():
+    store = WindowedFeatureStore(windows=[2, 8], bucket_width=1)
+    transaction = {"amount": 10.0, "oldbalanceOrg": 50.0, "newbalanceOrig": 40.0, "transaction_type": "PAYMENT"}
+    store.observe("C1", {**transaction, "step": 10})
+    # Outside the 2-step window (9, 10] but inside the 8-step one
+    features = store.observe("C1", {**transaction, "step": 5})
+    assert store.late_events == {2: 1, 8: 0}
+    assert features[2]["transaction_count"] == 1
+    assert features[8]["transaction_count"] == 2
+
+
+@pytest.mark.parametrize("accounts", ACCOUNTS)
+def test_retries_with_ids_count_once(sample_dataset, accounts):
+    df = read_sample(sample_dataset, accounts)
+    transactions = [
+        {"nameOrig": row.nameOrig, "step": row.step, "amount": row.amount, "oldbalanceOrg": row.oldbalanceOrg,
+         "newbalanceOrig": row.newbalanceOrig, "transaction_type": row.type, "id": str(i)}
+        for i, row in enumerate(df.sort_values("step", kind="stable").itertuples())
+    ]
+    expected = np.hstack(list(WindowedFeatureStore(max_accounts=len(df)).observe_batch(transactions).values()))
+
+    # Each transaction after the first is followed by a retry of the one before it
+    replay = transactions[:1] + [transaction for i in range(1, len(transactions))
+                                 for transaction in (transactions[i], transactions[i - 1])]
+    store = WindowedFeatureStore(max_accounts=len(df), recent_transactions=FEATURE_STORE_RECENT_TRANSACTIONS)
+    rows = np.hstack(list(store.observe_batch(replay, id_field="id").values()))
+
+    np.testing.assert_array_equal(np.vstack([rows[:1], rows[1::2]]), expected)
+    np.testing.assert_array_equal(rows[2::2], expected[:-1])
+    assert store.duplicates == len(transactions) - 1
+
+
+def test_without_ids_every_observation_counts():
+    transaction = {"nameOrig": "C1", "step": 1, "amount": 100.0, "oldbalanceOrg": 0.0, "newbalanceOrig": 0.0,
+                   "transaction_type": "PAYMENT"}
+    store = WindowedFeatureStore(recent_transactions=FEATURE_STORE_RECENT_TRANSACTIONS)
+    rows = store.observe_batch([transaction, dict(transaction)])
+    assert store.duplicates == 0
+    assert all(matrix[-1, 4] == 2 for matrix in rows.values())
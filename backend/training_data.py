@@ -0,0 +1,324 @@
+"""Chunked, bounded-memory ingestion of the PaySim-style Fraud.csv for training.
+
+model_training.py used to read the whole CSV into one DataFrame, copy it
+twice and one-hot encode both copies, which runs out of memory on the
+full 6M+ row file. This module reads the CSV in chunks with narrow dtypes
+(float32 amounts, categorical type, int32 step, int8 flags) and builds the
+same training inputs. Balances are read as float64: the balance
+differences subtract two large balances, and in float32 each balance is
+already rounded by up to 4 for a 1e8 balance. The differences are computed
+in float64 and only then stored as float32.
+
+- Transaction features (TRANSACTION_FEATURES, float32) and isFraud labels.
+  Chunks are written into one preallocated matrix. The large_transaction
+  flag needs the 95th percentile of amount over the whole file, so a first
+  pass reads only the amount column.
+- Per-account behavioral features (BEHAVIORAL_FEATURES, float32) and
+  is_fraud labels. Each chunk is reduced to mergeable partial aggregates
+  per nameOrig: count, Welford mean/M2, max, sums and type counts. The
+  partials are spilled to disk, hash-partitioned by nameOrig, and every
+  partition is merged on its own (Chan's formula for the variance). Only
+  one partition's partials are in memory at a time.
+
+Usage from backend/:
+    python training_data.py --data Fraud.csv [--chunksize 500000]   # build and report peak RSS
+    python training_data.py --data X --compare   # parity with the in-memory pandas pipeline
+"""
+import argparse
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from features import (
+    TRANSACTION_TYPES, TRANSACTION_NUMERIC_FEATURES, TRANSACTION_FEATURES, BEHAVIORAL_FEATURES,
+    LARGE_TRANSACTION_COLUMN, TYPE_COLUMNS,
+)
+
+DEFAULT_CHUNKSIZE = 500000
+DEFAULT_PARTITIONS = 16
+# model_training.py flags amounts above this quantile of the training data as large
+LARGE_TRANSACTION_QUANTILE = 0.95
+
+# The dataset's transaction types; CASH_IN is the baseline dropped by the one-hot encoding
+DATASET_TYPES = ['CASH_IN'] + TRANSACTION_TYPES
+
+CSV_DTYPES = {
+    'step': np.int32,
+    'type': pd.CategoricalDtype(DATASET_TYPES),
+    'amount': np.float32,
+    'nameOrig': object,
+    'oldbalanceOrg': np.float64,
+    'newbalanceOrig': np.float64,
+    'nameDest': object,
+    'oldbalanceDest': np.float64,
+    'newbalanceDest': np.float64,
+    'isFraud': np.int8,
+    'isFlaggedFraud': np.int8,
+}
+
+# Columns each pass needs; nameDest and isFlaggedFraud are never read
+TRANSACTION_COLUMNS = ['type', 'amount', 'oldbalanceOrg', 'newbalanceOrig', 'oldbalanceDest', 'newbalanceDest',
+                       'isFraud']
+BEHAVIORAL_COLUMNS = ['type', 'amount', 'nameOrig', 'oldbalanceOrg', 'newbalanceOrig', 'isFraud']
+
+# Partial aggregate columns per account
+_PARTIAL_COLUMNS = ['count', 'mean', 'm2', 'max', 'balance_sum', 'change_sum', 'large_count'] + \
+    [f'type_{t_type}_count' for t_type in TRANSACTION_TYPES] + ['fraud']
+
+
+class TrainingData(NamedTuple):
+    X_transaction: np.ndarray  # (rows, len(TRANSACTION_FEATURES)) float32, unscaled
+    y_transaction: np.ndarray  # (rows,) int8
+    X_behavior: np.ndarray     # (accounts, len(BEHAVIORAL_FEATURES)) float32, unscaled
+    y_behavior: np.ndarray     # (accounts,) int8
+    large_threshold: float
+    accounts: Optional[np.ndarray] = None  # nameOrig per X_behavior row, if requested
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (ru_maxrss is in KiB on Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def read_csv_chunks(path: str, columns: List[str], chunksize: int = DEFAULT_CHUNKSIZE) -> Iterator[pd.DataFrame]:
+    return pd.read_csv(path, usecols=columns, dtype={c: CSV_DTYPES[c] for c in columns}, chunksize=chunksize)
+
+
+def scan_amounts(path: str, chunksize: int = DEFAULT_CHUNKSIZE) -> Tuple[int, float]:
+    """First pass: row count and the large-transaction amount threshold"""
+    amounts = [chunk['amount'].to_numpy() for chunk in read_csv_chunks(path, ['amount'], chunksize)]
+    amounts = np.concatenate(amounts) if amounts else np.empty(0, dtype=np.float32)
+    # Same linear interpolation as pandas' Series.quantile
+    threshold = float(np.quantile(amounts, LARGE_TRANSACTION_QUANTILE)) if amounts.size else 0.0
+    return amounts.size, threshold
+
+
+def transaction_features(chunk: pd.DataFrame, large_threshold: float, out: np.ndarray):
+    """Fill out (len(chunk), len(TRANSACTION_FEATURES)) with the model_training.py CHUNK 2-3 features"""
+    for i, name in enumerate(TRANSACTION_NUMERIC_FEATURES[:5]):
+        out[:, i] = chunk[name].to_numpy()
+    # Subtract the float64 balances, not the float32 copies in out
+    out[:, 5] = chunk['oldbalanceOrg'].to_numpy() - chunk['newbalanceOrig'].to_numpy()
+    out[:, 6] = chunk['oldbalanceDest'].to_numpy() - chunk['newbalanceDest'].to_numpy()
+    np.greater(out[:, 0], large_threshold, out=out[:, LARGE_TRANSACTION_COLUMN])
+    codes = chunk['type'].cat.codes.to_numpy()
+    for t_type, column in TYPE_COLUMNS.items():
+        np.equal(codes, DATASET_TYPES.index(t_type), out=out[:, column])
+
+
+def _partial_aggregates(chunk: pd.DataFrame, large_threshold: float) -> pd.DataFrame:
+    # Aggregate in float64 so sums over long histories do not lose precision
+    amount = chunk['amount'].to_numpy(np.float64)
+    old_balance = chunk['oldbalanceOrg'].to_numpy(np.float64)
+    codes = chunk['type'].cat.codes.to_numpy()
+    frame = pd.DataFrame({
+        'nameOrig': chunk['nameOrig'].to_numpy(),
+        'amount': amount,
+        'balance': old_balance,
+        'change': old_balance - chunk['newbalanceOrig'].to_numpy(np.float64),
+        'large': (amount > large_threshold).astype(np.float64),
+        **{f'type_{t_type}': (codes == DATASET_TYPES.index(t_type)).astype(np.float64) for t_type in TRANSACTION_TYPES},
+        'fraud': chunk['isFraud'].to_numpy(np.float64),
+    })
+    grouped = frame.groupby('nameOrig', sort=False)
+    partial = grouped.agg(
+        count=('amount', 'count'),
+        mean=('amount', 'mean'),
+        var=('amount', 'var'),
+        max=('amount', 'max'),
+        balance_sum=('balance', 'sum'),
+        change_sum=('change', 'sum'),
+        large_count=('large', 'sum'),
+        **{f'type_{t_type}_count': (f'type_{t_type}', 'sum') for t_type in TRANSACTION_TYPES},
+        fraud=('fraud', 'max'),
+    )
+    partial['m2'] = partial.pop('var').fillna(0.0) * (partial['count'] - 1)
+    return partial[_PARTIAL_COLUMNS]
+
+
+def _merge_partials(partials: pd.DataFrame) -> pd.DataFrame:
+    """Combine partial aggregates that share a nameOrig index"""
+    grouped = partials.groupby(level=0, sort=True)
+    sums = grouped[['count', 'balance_sum', 'change_sum', 'large_count']
+                   + [f'type_{t_type}_count' for t_type in TRANSACTION_TYPES]].sum()
+    merged = sums.assign(
+        mean=(partials['count'] * partials['mean']).groupby(level=0, sort=True).sum() / sums['count'],
+        max=grouped['max'].max(),
+        fraud=grouped['fraud'].max(),
+    )
+    # Chan et al.: M2 of the union = sum of M2s + each part's count * (part mean - overall mean)^2
+    spread = partials['mean'] - merged['mean'].reindex(partials.index).to_numpy()
+    merged['m2'] = (partials['m2'] + partials['count'] * spread * spread).groupby(level=0, sort=True).sum()
+    return merged[_PARTIAL_COLUMNS]
+
+
+def _behavioral_features(merged: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """model_training.py CHUNK 6 features from merged aggregates"""
+    count = merged['count'].to_numpy()
+    X = np.empty((len(merged), len(BEHAVIORAL_FEATURES)), dtype=np.float32)
+    X[:, 0] = merged['mean']
+    X[:, 1] = merged['max']
+    # Sample std (ddof=1); pandas gives NaN for a single transaction, which training fills with 0
+    X[:, 2] = np.sqrt(merged['m2'].to_numpy() / np.maximum(count - 1, 1)) * (count > 1)
+    X[:, 3] = merged['balance_sum'] / count
+    X[:, 4] = count
+    X[:, 5] = merged['large_count'] / count
+    X[:, 6] = merged['change_sum'] / count
+    for i, t_type in enumerate(TRANSACTION_TYPES):
+        X[:, 7 + i] = merged[f'type_{t_type}_count'] / count
+    return X, (merged['fraud'].to_numpy() > 0).astype(np.int8)
+
+
+class BehavioralAggregator:
+    """Mergeable per-nameOrig aggregation, spilled to disk in hash partitions"""
+
+    def __init__(self, spill_dir: str, n_partitions: int = DEFAULT_PARTITIONS):
+        self.spill_dir = spill_dir
+        self.n_partitions = n_partitions
+        self._pieces = [0] * n_partitions
+
+    def add(self, chunk: pd.DataFrame, large_threshold: float):
+        partial = _partial_aggregates(chunk, large_threshold)
+        partition = pd.util.hash_array(partial.index.to_numpy(dtype=object)) % self.n_partitions
+        for p in np.unique(partition):
+            piece = partial[partition == p]
+            path = os.path.join(self.spill_dir, f"partition{p}_{self._pieces[p]}.pkl")
+            piece.to_pickle(path)
+            self._pieces[p] += 1
+
+    def finalize(self, keep_accounts: bool = False) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+        """Merge one partition at a time into (X_behavior, y_behavior, accounts or None)"""
+        features, labels, accounts = [], [], []
+        for p in range(self.n_partitions):
+            paths = [os.path.join(self.spill_dir, f"partition{p}_{i}.pkl") for i in range(self._pieces[p])]
+            if not paths:
+                continue
+            merged = _merge_partials(pd.concat([pd.read_pickle(path) for path in paths]))
+            for path in paths:
+                os.remove(path)
+            X, y = _behavioral_features(merged)
+            features.append(X)
+            labels.append(y)
+            if keep_accounts:
+                accounts.append(merged.index.to_numpy())
+        if not features:
+            return np.empty((0, len(BEHAVIORAL_FEATURES)), dtype=np.float32), np.empty(0, dtype=np.int8), None
+        return np.concatenate(features), np.concatenate(labels), np.concatenate(accounts) if keep_accounts else None
+
+
+def _allocate_in_memory(name: str, shape: Tuple[int, ...], dtype) -> np.ndarray:
+    return np.empty(shape, dtype=dtype)
+
+
+def load_training_data(path: str, chunksize: int = DEFAULT_CHUNKSIZE, spill_dir: Optional[str] = None,
+                       n_partitions: int = DEFAULT_PARTITIONS, keep_accounts: bool = False,
+                       allocate: Callable[..., np.ndarray] = _allocate_in_memory) -> TrainingData:
+    """Two chunked passes over the CSV: the amount quantile, then the features
+
+    allocate(name, shape, dtype) provides the X_transaction and y_transaction
+    arrays the second pass writes into (feature_cache.py passes memmaps).
+    """
+    n_rows, large_threshold = scan_amounts(path, chunksize)
+
+    X_transaction = allocate('X_transaction', (n_rows, len(TRANSACTION_FEATURES)), np.float32)
+    y_transaction = allocate('y_transaction', (n_rows,), np.int8)
+    work_dir = tempfile.mkdtemp(prefix="behavior_", dir=spill_dir)
+    try:
+        aggregator = BehavioralAggregator(work_dir, n_partitions)
+        row = 0
+        columns = sorted(set(TRANSACTION_COLUMNS) | set(BEHAVIORAL_COLUMNS), key=list(CSV_DTYPES).index)
+        for chunk in read_csv_chunks(path, columns, chunksize):
+            end = row + len(chunk)
+            transaction_features(chunk, large_threshold, X_transaction[row:end])
+            y_transaction[row:end] = chunk['isFraud'].to_numpy()
+            aggregator.add(chunk, large_threshold)
+            row = end
+        X_behavior, y_behavior, accounts = aggregator.finalize(keep_accounts)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return TrainingData(X_transaction, y_transaction, X_behavior, y_behavior, large_threshold, accounts)
+
+
+def _in_memory_reference(path: str):
+    # model_training.py CHUNK 2, 3 and 6 as they were, for --compare
+    df = pd.read_csv(path)
+    transaction_df = pd.get_dummies(df.drop(['nameOrig', 'nameDest'], axis=1), columns=['type'], drop_first=True)
+    transaction_df['balance_difference'] = transaction_df['oldbalanceOrg'] - transaction_df['newbalanceOrig']
+    transaction_df['dest_balance_difference'] = transaction_df['oldbalanceDest'] - transaction_df['newbalanceDest']
+    transaction_df['large_transaction'] = (
+        transaction_df['amount'] > transaction_df['amount'].quantile(LARGE_TRANSACTION_QUANTILE)
+    ).astype(int)
+    for t_type in TRANSACTION_TYPES:
+        if f'type_{t_type}' not in transaction_df:
+            transaction_df[f'type_{t_type}'] = False
+    X_transaction = transaction_df[TRANSACTION_FEATURES].to_numpy(np.float64)
+
+    behavioral_df = transaction_df.assign(nameOrig=df['nameOrig'])
+    grouped = behavioral_df.groupby('nameOrig')
+    behavior = grouped.agg(
+        avg_transaction_amount=('amount', 'mean'),
+        max_transaction_amount=('amount', 'max'),
+        transaction_amount_std=('amount', 'std'),
+        avg_balance=('oldbalanceOrg', 'mean'),
+        transaction_count=('amount', 'count'),
+        large_transaction_ratio=('large_transaction', 'mean'),
+        balance_change_mean=('balance_difference', 'mean'),
+        is_fraud=('isFraud', lambda x: 1 if x.sum() > 0 else 0),
+    )
+    for t_type in TRANSACTION_TYPES:
+        behavior[f'type_{t_type}_ratio'] = grouped[f'type_{t_type}'].mean()
+    behavior = behavior.fillna(0)
+    return X_transaction, behavior
+
+
+def compare(path: str, chunksize: int) -> bool:
+    """Check the chunked pipeline against the in-memory pandas pipeline (float32 tolerance)"""
+    data = load_training_data(path, chunksize, keep_accounts=True)
+    X_reference, behavior = _in_memory_reference(path)
+    # Accounts come back grouped by partition
+    behavior = behavior.loc[data.accounts]
+
+    def rel_diff(actual, expected):
+        # float32 storage rounds amounts and balances, so measure against each column's magnitude
+        scale = np.maximum(np.abs(expected).max(axis=0, initial=0.0), 1.0)
+        return float(np.max(np.abs(actual.astype(np.float64) - expected) / scale, initial=0.0))
+
+    transaction_diff = rel_diff(data.X_transaction, X_reference)
+    behavior_diff = rel_diff(data.X_behavior, behavior[BEHAVIORAL_FEATURES].to_numpy(np.float64))
+    labels_ok = (np.array_equal(data.y_behavior, behavior['is_fraud'].to_numpy())
+                 and data.X_transaction.shape == X_reference.shape)
+    passed = transaction_diff <= 1e-5 and behavior_diff <= 1e-5 and labels_ok
+    print(f"rows={len(data.X_transaction)} accounts={len(data.X_behavior)} "
+          f"transaction_rel_diff={transaction_diff:.3e} behavior_rel_diff={behavior_diff:.3e} "
+          f"labels_ok={labels_ok} {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the training inputs from Fraud.csv in bounded memory")
+    parser.add_argument("--data", required=True, help="path to Fraud.csv")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--partitions", type=int, default=DEFAULT_PARTITIONS)
+    parser.add_argument("--compare", action="store_true", help="check against the in-memory pandas pipeline")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(0 if compare(args.data, args.chunksize) else 1)
+
+    start = time.perf_counter()
+    data = load_training_data(args.data, args.chunksize, n_partitions=args.partitions)
+    print(f"rows={len(data.X_transaction)} fraud_rows={int(data.y_transaction.sum())} "
+          f"accounts={len(data.X_behavior)} large_threshold={data.large_threshold:.2f} "
+          f"seconds={time.perf_counter() - start:.1f} peak_rss_mb={peak_rss_mb():.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""Native inference for the tree-ensemble models.
+
+The XGBoost, LightGBM and Isolation Forest models are flattened into NumPy
+node arrays (feature, threshold, left/right child, leaf value) and scored by
+a vectorized traversal of all trees at once. This avoids each library's
+per-call input validation and dispatch overhead, which dominates
+single-row requests.
+
+Every split is normalised to "go left iff x <= threshold" on float64 input.
+XGBoost (float32(x) < t) and scikit-learn (float32(x) <= t) compare after
+casting to float32. Their thresholds are replaced by the largest float64
+value that still goes left (see split_boundaries), so the float64
+comparison routes every input the same way the library does.
+
+The compiled models ship as <model>.native.joblib artifacts, written by
+model_registry.export_native (python model_registry.py --write --native)
+and listed in the manifest; api.py compiles them in-process when the
+manifest has none. tests/test_tree_engine.py checks the parity against the
+library models on the sample data.
+"""
+import json
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+# Models handled by this engine, keyed by their name in models/
+NATIVE_MODELS = ["isolation_forest", "transaction_monitoring", "risk_scoring"]
+
+_EULER_GAMMA = np.euler_gamma
+_SIGN_BIT = np.int64(-0x8000000000000000)
+
+
+def _ordered_keys(values: np.ndarray) -> np.ndarray:
+    # Map float64 to int64 so that integer order equals float order (-0.0 == 0.0)
+    bits = np.ascontiguousarray(values, dtype=np.float64).view(np.int64)
+    return np.where(bits < 0, -(bits & np.int64(0x7FFFFFFFFFFFFFFF)), bits)
+
+
+def _from_ordered_keys(keys: np.ndarray) -> np.ndarray:
+    bits = np.where(keys < 0, (-keys) | _SIGN_BIT, keys)
+    return bits.astype(np.int64).view(np.float64)
+
+
+def split_boundaries(goes_left: Callable[[np.ndarray], np.ndarray], count: int) -> np.ndarray:
+    """Largest float64 x per split for which goes_left(x) is still True.
+
+    goes_left maps an array of `count` candidate inputs (one per split) to a
+    boolean array and must be monotone: True up to some x, False after.
+    Bisects over the ordered float64 bit patterns, so the result is exact.
+    """
+    lo = np.full(count, _ordered_keys(np.array([-np.inf]))[0], dtype=np.int64)
+    hi = np.full(count, _ordered_keys(np.array([np.inf]))[0], dtype=np.int64)
+    # Invariant: goes_left(lo) is True (or lo is -inf), goes_left(hi) is False (or hi is +inf)
+    with np.errstate(over="ignore"):  # float32 casts of huge candidates overflow to inf
+        always_left = goes_left(_from_ordered_keys(hi))
+        for _ in range(64):
+            # floor((lo + hi) / 2) without int64 overflow
+            mid = (lo >> 1) + (hi >> 1) + (lo & hi & 1)
+            left = goes_left(_from_ordered_keys(mid))
+            lo = np.where(left, mid, lo)
+            hi = np.where(left, hi, mid)
+    return np.where(always_left, np.inf, _from_ordered_keys(lo))
+
+
+class TreeEnsemble:
+    """Flattened trees with a shared node table.
+
+    Leaves point to themselves, so traversal runs a fixed max_depth steps.
+    """
+
+    ARRAYS = ["feature", "threshold", "left", "right", "value", "default_left", "roots"]
+
+    def __init__(self, feature, threshold, left, right, value, default_left, roots, n_features: int):
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.right = np.asarray(right, dtype=np.int32)
+        self.value = np.asarray(value, dtype=np.float64)
+        self.default_left = np.asarray(default_left, dtype=bool)
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.n_features = n_features
+        self.max_depth = self._max_depth()
+
+    def _max_depth(self) -> int:
+        depth = 0
+        frontier = self.roots
+        while True:
+            internal = frontier[self.left[frontier] != frontier]
+            if internal.size == 0:
+                return depth
+            frontier = np.concatenate([self.left[internal], self.right[internal]])
+            depth += 1
+
+    @classmethod
+    def from_trees(cls, trees: List[Dict[str, np.ndarray]], n_features: int) -> "TreeEnsemble":
+        """Concatenate per-tree arrays (children as local indices, -1 for leaves)"""
+        columns = {name: [] for name in ["feature", "threshold", "left", "right", "value", "default_left"]}
+        roots = []
+        offset = 0
+        for tree in trees:
+            n_nodes = len(tree["left"])
+            index = np.arange(n_nodes) + offset
+            is_leaf = np.asarray(tree["left"]) < 0
+            columns["feature"].append(np.where(is_leaf, 0, tree["feature"]))
+            columns["threshold"].append(np.where(is_leaf, np.inf, tree["threshold"]))
+            columns["left"].append(np.where(is_leaf, index, np.asarray(tree["left"]) + offset))
+            columns["right"].append(np.where(is_leaf, index, np.asarray(tree["right"]) + offset))
+            columns["value"].append(np.where(is_leaf, tree["value"], 0.0))
+            columns["default_left"].append(tree["default_left"])
+            roots.append(offset)
+            offset += n_nodes
+        return cls(**{name: np.concatenate(parts) for name, parts in columns.items()},
+                   roots=roots, n_features=n_features)
+
+    def leaf_values(self, X: np.ndarray) -> np.ndarray:
+        """(n_rows, n_trees) leaf values for a float64 matrix"""
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        flat = X.ravel()
+        row_offsets = (np.arange(X.shape[0]) * X.shape[1])[:, None]
+        node = np.broadcast_to(self.roots, (X.shape[0], self.roots.size))
+        for depth in range(self.max_depth):
+            x = flat[row_offsets + self.feature[node]]
+            go_left = x <= self.threshold[node]
+            # NaN compares False; send it down the default branch instead
+            missing = np.isnan(x)
+            if missing.any():
+                go_left = np.where(missing, self.default_left[node], go_left)
+            next_node = np.where(go_left, self.left[node], self.right[node])
+            # Deep ensembles often finish well before max_depth
+            if depth % 4 == 3 and np.array_equal(next_node, node):
+                node = next_node
+                break
+            node = next_node
+        return self.value[node]
+
+
+def _sigmoid(margin: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-margin))
+
+
+def _float32_less(thresholds: np.ndarray) -> Callable[[np.ndarray], np.ndarray]:
+    t = thresholds.astype(np.float32)
+    return lambda x: x.astype(np.float32) < t
+
+
+def _float32_less_equal(thresholds: np.ndarray) -> Callable[[np.ndarray], np.ndarray]:
+    return lambda x: x.astype(np.float32) <= thresholds
+
+
+class NativeXGBClassifier:
+    """binary:logistic XGBoost model; XGBoost compares float32(x) < split_condition"""
+
+    def __init__(self, ensemble: TreeEnsemble, base_margin: float):
+        self.ensemble = ensemble
+        self.base_margin = base_margin
+
+    @classmethod
+    def from_model(cls, model) -> "NativeXGBClassifier":
+        learner = json.loads(model.get_booster().save_raw(raw_format="json"))["learner"]
+        objective = learner["objective"]["name"]
+        if objective != "binary:logistic":
+            raise NotImplementedError(f"Unsupported XGBoost objective: {objective}")
+
+        base_score = float(learner["learner_model_param"]["base_score"].strip("[]"))
+        n_features = int(learner["learner_model_param"]["num_feature"])
+        trees = []
+        for tree in learner["gradient_booster"]["model"]["trees"]:
+            if any(tree["split_type"]):
+                raise NotImplementedError("Categorical XGBoost splits are not supported")
+            conditions = np.asarray(tree["split_conditions"], dtype=np.float64)
+            left = np.asarray(tree["left_children"])
+            is_leaf = left < 0
+            trees.append({
+                "feature": tree["split_indices"],
+                "threshold": np.where(is_leaf, np.inf, split_boundaries(_float32_less(conditions), conditions.size)),
+                "left": left,
+                "right": tree["right_children"],
+                "value": conditions,  # leaf values are stored in split_conditions
+                "default_left": np.asarray(tree["default_left"], dtype=bool),
+            })
+        return cls(TreeEnsemble.from_trees(trees, n_features), float(np.log(base_score / (1.0 - base_score))))
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        p = _sigmoid(self.base_margin + self.ensemble.leaf_values(X).sum(axis=1))
+        return np.column_stack([1.0 - p, p])
+
+
+class NativeLGBMClassifier:
+    """Binary LightGBM model; LightGBM compares float64 x <= threshold"""
+
+    def __init__(self, ensemble: TreeEnsemble, sigmoid: float):
+        self.ensemble = ensemble
+        self.sigmoid = sigmoid
+
+    @classmethod
+    def from_model(cls, model) -> "NativeLGBMClassifier":
+        dump = model.booster_.dump_model()
+        objective = dump["objective"].split()
+        if objective[0] != "binary" or dump["num_tree_per_iteration"] != 1 or dump["average_output"]:
+            raise NotImplementedError(f"Unsupported LightGBM model: {dump['objective']}")
+        sigmoid = float(dict(part.split(":") for part in objective[1:]).get("sigmoid", 1.0))
+
+        trees = []
+        for info in dump["tree_info"]:
+            nodes = []
+
+            def visit(node) -> int:
+                index = len(nodes)
+                nodes.append(None)
+                if "leaf_value" in node:
+                    nodes[index] = (0, np.inf, -1, -1, node["leaf_value"], True)
+                    return index
+                if node["decision_type"] != "<=" or node["missing_type"] == "Zero":
+                    raise NotImplementedError(
+                        f"Unsupported LightGBM split: {node['decision_type']} / {node['missing_type']}"
+                    )
+                left = visit(node["left_child"])
+                right = visit(node["right_child"])
+                # missing_type None: LightGBM scores NaN as 0.0
+                default_left = node["default_left"] if node["missing_type"] == "NaN" else 0.0 <= node["threshold"]
+                nodes[index] = (node["split_feature"], node["threshold"], left, right, 0.0, default_left)
+                return index
+
+            visit(info["tree_structure"])
+            feature, threshold, left, right, value, default_left = map(np.asarray, zip(*nodes))
+            trees.append({"feature": feature, "threshold": threshold, "left": left, "right": right,
+                          "value": value, "default_left": default_left})
+        return cls(TreeEnsemble.from_trees(trees, dump["max_feature_idx"] + 1), sigmoid)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        p = _sigmoid(self.sigmoid * self.ensemble.leaf_values(X).sum(axis=1))
+        return np.column_stack([1.0 - p, p])
+
+
+def _average_path_length(n_samples: np.ndarray) -> np.ndarray:
+    # Expected path length of an unsuccessful BST search (same as scikit-learn's _average_path_length)
+    n = np.asarray(n_samples, dtype=np.float64)
+    result = np.zeros_like(n)
+    result[n == 2] = 1.0
+    large = n > 2
+    result[large] = 2.0 * (np.log(n[large] - 1.0) + _EULER_GAMMA) - 2.0 * (n[large] - 1.0) / n[large]
+    return result
+
+
+class NativeIsolationForest:
+    """scikit-learn IsolationForest; trees compare float32(x) <= threshold.
+
+    A leaf's value is its depth plus the average path length of the samples
+    it holds, so the per-row path length is a sum of leaf values.
+    """
+
+    def __init__(self, ensemble: TreeEnsemble, normalizer: float, offset: float):
+        self.ensemble = ensemble
+        self.normalizer = normalizer
+        self.offset = offset
+
+    @classmethod
+    def from_model(cls, model) -> "NativeIsolationForest":
+        trees = []
+        for estimator, features in zip(model.estimators_, model.estimators_features_):
+            tree = estimator.tree_
+            left, right = tree.children_left, tree.children_right
+            depth = np.zeros(tree.node_count)
+            for node in range(tree.node_count):  # children always have larger ids than parents
+                if left[node] >= 0:
+                    depth[left[node]] = depth[right[node]] = depth[node] + 1
+            is_leaf = left < 0
+            trees.append({
+                # Trees see the estimator's feature subset; map back to input columns
+                "feature": np.asarray(features)[np.where(is_leaf, 0, tree.feature)],
+                "threshold": np.where(
+                    is_leaf, np.inf,
+                    split_boundaries(_float32_less_equal(tree.threshold), tree.node_count)
+                ),
+                "left": left,
+                "right": right,
+                "value": depth + _average_path_length(tree.n_node_samples),
+                "default_left": np.zeros(tree.node_count, dtype=bool),
+            })
+        normalizer = len(model.estimators_) * _average_path_length([model.max_samples_])[0]
+        return cls(TreeEnsemble.from_trees(trees, model.n_features_in_), float(normalizer), float(model.offset_))
+
+    def score_samples(self, X: np.ndarray) -> np.ndarray:
+        return -(2.0 ** (-self.ensemble.leaf_values(X).sum(axis=1) / self.normalizer))
+
+    def decision_function(self, X: np.ndarray) -> np.ndarray:
+        return self.score_samples(X) - self.offset
+
+
+_NATIVE_CLASSES = {
+    "isolation_forest": NativeIsolationForest,
+    "transaction_monitoring": NativeXGBClassifier,
+    "risk_scoring": NativeLGBMClassifier,
+}
+
+
+def compile_model(name: str, model):
+    """Flatten a loaded library model into its native equivalent"""
+    return _NATIVE_CLASSES[name].from_model(model)
+
@@ -0,0 +1,273 @@
+"""Sliding-window behavioral features over the `step` time axis.
+
+feature_store.py keeps lifetime aggregates per account, the way
+model_training.py (CHUNK 6) computes them. WindowedFeatureStore produces the
+same eleven features restricted to the last N steps, for several window
+lengths at once (default 24 and 168 steps, i.e. a day and a week).
+
+Each account holds, per window, a ring of buckets of bucket_width steps.
+A bucket stores count, amount mean/M2/max (Welford), sums for the balance
+means and ratios, and per-type counts. An event updates one bucket. The
+window's features are merged from the buckets still inside the window
+(Chan's parallel variance formula for the std). The per-event cost
+therefore depends on the number of buckets, not on how long the history is,
+and memory per account is fixed.
+
+With bucket_width=1 a window of L steps covers exactly steps (s - L, s],
+where s is the newest step seen for the account. Wider buckets trade
+precision at the window's old edge for less memory and work. An event
+older than a window is left out of that window and counted in
+late_events[window length]; it still counts toward the longer windows it
+falls inside.
+
+Retries and replays: as in feature_store.py, recent_transactions > 0 makes
+each account remember the features returned for its last
+recent_transactions transaction ids, and a repeated id gets them back
+without being added again. Transactions without an id always count.
+
+Streaming (serving): observe() / observe_batch() update and return features.
+Batch (training): window_feature_frame() runs a DataFrame through the same
+code in step order, so training and serving features agree.
+
+agent_server.py and stream_consumer.py serve the lifetime features of
+feature_store.py unless BEHAVIOR_FEATURE_WINDOW is set to a window length.
+Then the behavioral model gets that window's features instead, so the
+model set must come from python model_training.py --behavior-window N with
+the same N, which trains the behavioral model on window_feature_frame().
+
+tests/test_window_features.py checks the parity against a brute-force
+rescan, late events and the handling of retries.
+"""
+import math
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from feature_store import FEATURE_STORE_RECENT_TRANSACTIONS
+from features import BEHAVIORAL_FEATURES, LARGE_TRANSACTION_THRESHOLD, TRANSACTION_TYPES
+
+BEHAVIOR_WINDOWS = [int(length) for length in os.getenv("BEHAVIOR_WINDOWS", "24,168").split(",")]
+BEHAVIOR_WINDOW_BUCKET_WIDTH = int(os.getenv("BEHAVIOR_WINDOW_BUCKET_WIDTH", 1))
+WINDOW_STORE_MAX_ACCOUNTS = int(os.getenv("WINDOW_STORE_MAX_ACCOUNTS", 100000))
+# Window length the services build the behavioral features over; 0 serves lifetime aggregates
+BEHAVIOR_FEATURE_WINDOW = int(os.getenv("BEHAVIOR_FEATURE_WINDOW", 0))
+
+# Per-bucket statistics columns
+_COUNT, _MEAN, _M2, _MAX, _BALANCE, _CHANGE, _LARGE = range(7)
+_TYPES = slice(7, 7 + len(TRANSACTION_TYPES))
+_N_STATS = 7 + len(TRANSACTION_TYPES)
+
+_TYPE_COLUMN = {t_type: 7 + i for i, t_type in enumerate(TRANSACTION_TYPES)}
+
+# An empty bucket: zero counts and sums, and a max that any amount replaces
+_EMPTY_STATS = np.zeros(_N_STATS)
+_EMPTY_STATS[_MAX] = -np.inf
+
+
+class AccountWindows:
+    """Bucket rings for one account; slot bucket % n_buckets holds that bucket.
+
+    Slots that leave the window are cleared when the newest bucket
+    advances, so every slot is either empty or inside the window.
+    """
+    __slots__ = ["stats", "newest_bucket", "recent"]
+
+    def __init__(self, n_buckets: Sequence[int]):
+        self.stats = [np.tile(_EMPTY_STATS, (n, 1)) for n in n_buckets]
+        self.newest_bucket = None
+        # Transaction id -> features returned for it (one row per window); only when deduplicating
+        self.recent: Optional[OrderedDict] = None
+
+    def advance(self, bucket: int):
+        if self.newest_bucket is not None and bucket <= self.newest_bucket:
+            return
+        for stats in self.stats:
+            n_buckets = len(stats)
+            if self.newest_bucket is None or bucket - self.newest_bucket >= n_buckets:
+                stats[:] = _EMPTY_STATS
+            else:
+                # Buckets newest+1 .. bucket reuse the slots of buckets that just expired
+                slots = np.arange(self.newest_bucket + 1, bucket + 1) % n_buckets
+                stats[slots] = _EMPTY_STATS
+        self.newest_bucket = bucket
+
+
+def _add_to_bucket(row: np.ndarray, transaction: Dict):
+    amount = transaction["amount"]
+    count, mean, m2, maximum, balance, change, large = row[:_TYPES.start].tolist()
+    count += 1
+    # Welford's update within the bucket
+    delta = amount - mean
+    mean += delta / count
+    m2 += delta * (amount - mean)
+    row[:_TYPES.start] = (
+        count, mean, m2, max(maximum, amount),
+        balance + transaction["oldbalanceOrg"],
+        change + transaction["oldbalanceOrg"] - transaction["newbalanceOrig"],
+        large + (amount > LARGE_TRANSACTION_THRESHOLD),
+    )
+    column = _TYPE_COLUMN.get(transaction.get("transaction_type"))
+    if column is not None:
+        row[column] += 1
+
+
+def _merge_buckets(buckets: np.ndarray, out: np.ndarray):
+    """Write BEHAVIORAL_FEATURES for the union of the buckets into out (empty buckets add nothing)"""
+    totals = buckets.sum(axis=0)
+    n = totals[_COUNT]
+    if n == 0:
+        out[:] = 0.0
+        return
+    counts = buckets[:, _COUNT]
+    means = buckets[:, _MEAN]
+    mean = counts @ means / n
+    # Chan et al.: combined M2 = sum of M2s + between-bucket spread of the means
+    spread = means - mean
+    m2 = totals[_M2] + counts @ (spread * spread)
+    out[0] = mean
+    out[1] = buckets[:, _MAX].max()
+    out[2] = math.sqrt(max(m2, 0.0) / (n - 1)) if n > 1 else 0.0
+    out[3] = totals[_BALANCE] / n
+    out[4] = n
+    out[5] = totals[_LARGE] / n
+    out[6] = totals[_CHANGE] / n
+    out[7:] = totals[_TYPES] / n
+
+
+class WindowedFeatureStore:
+    """Per-account behavioral features over sliding `step` windows, LRU-bounded"""
+
+    def __init__(self, windows: Sequence[int] = BEHAVIOR_WINDOWS,
+                 bucket_width: int = BEHAVIOR_WINDOW_BUCKET_WIDTH,
+                 max_accounts: int = WINDOW_STORE_MAX_ACCOUNTS, recent_transactions: int = 0):
+        for length in windows:
+            if length % bucket_width:
+                raise ValueError(f"Window length {length} is not a multiple of bucket width {bucket_width}")
+        self.windows = list(windows)
+        self.bucket_width = bucket_width
+        self.n_buckets = [length // bucket_width for length in self.windows]
+        self.max_accounts = max_accounts
+        self.recent_transactions = recent_transactions
+        self.evictions = 0
+        self.duplicates = 0
+        # Window length -> events that arrived too old for that window
+        self.late_events = {length: 0 for length in self.windows}
+        self._accounts: "OrderedDict[str, AccountWindows]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._accounts)
+
+    def _account(self, account_id: str) -> AccountWindows:
+        account = self._accounts.get(account_id)
+        if account is None:
+            if len(self._accounts) >= self.max_accounts:
+                self._accounts.popitem(last=False)
+                self.evictions += 1
+            account = self._accounts[account_id] = AccountWindows(self.n_buckets)
+        else:
+            self._accounts.move_to_end(account_id)
+        return account
+
+    def _update(self, account_id: str, transaction: Dict, transaction_id: Optional[str], out: List[np.ndarray]):
+        """Add one transaction and write each window's features into the matching out row"""
+        account = self._account(account_id)
+        dedupe = bool(self.recent_transactions) and transaction_id is not None
+        if dedupe:
+            if account.recent is None:
+                account.recent = OrderedDict()
+            seen = account.recent.get(transaction_id)
+            if seen is not None:
+                # A retry or replay: same features as the first time, windows unchanged
+                for row, saved in zip(out, seen):
+                    row[:] = saved
+                self.duplicates += 1
+                return
+
+        bucket = int(transaction["step"]) // self.bucket_width
+        account.advance(bucket)
+        newest = account.newest_bucket
+        for length, stats, n_buckets, row in zip(self.windows, account.stats, self.n_buckets, out):
+            if bucket > newest - n_buckets:
+                _add_to_bucket(stats[bucket % n_buckets], transaction)
+            else:
+                self.late_events[length] += 1
+            _merge_buckets(stats, row)
+
+        if dedupe:
+            account.recent[transaction_id] = np.array(out)
+            if len(account.recent) > self.recent_transactions:
+                account.recent.popitem(last=False)
+
+    def observe(self, account_id: str, transaction: Dict,
+                transaction_id: Optional[str] = None) -> Dict[int, Dict[str, float]]:
+        """Add a transaction (with a `step`) and return {window length: features}"""
+        rows = [np.empty(len(BEHAVIORAL_FEATURES)) for _ in self.windows]
+        with self._lock:
+            self._update(account_id, transaction, transaction_id, rows)
+        result = {}
+        for length, row in zip(self.windows, rows):
+            features = dict(zip(BEHAVIORAL_FEATURES, row.tolist()))
+            features["transaction_count"] = int(features["transaction_count"])
+            result[length] = features
+        return result
+
+    def observe_batch(self, transactions: List[Dict], account_field: str = "nameOrig",
+                      id_field: Optional[str] = None) -> Dict[int, np.ndarray]:
+        """observe() for a batch in order; returns {window length: (n, 11) matrix}"""
+        out = {length: np.empty((len(transactions), len(BEHAVIORAL_FEATURES))) for length in self.windows}
+        matrices = [out[length] for length in self.windows]
+        with self._lock:
+            for i, transaction in enumerate(transactions):
+                transaction_id = transaction.get(id_field) if id_field is not None else None
+                self._update(transaction[account_field], transaction, transaction_id,
+                             [matrix[i] for matrix in matrices])
+        return out
+
+    def expire(self, step: int) -> int:
+        """Drop accounts with no event inside the longest window as of `step`"""
+        horizon = int(step) // self.bucket_width - max(self.n_buckets)
+        with self._lock:
+            idle = [account_id for account_id, account in self._accounts.items() if account.newest_bucket <= horizon]
+            for account_id in idle:
+                del self._accounts[account_id]
+        return len(idle)
+
+
+def serving_window_store() -> Optional[WindowedFeatureStore]:
+    """The services' store for BEHAVIOR_FEATURE_WINDOW, None when they serve lifetime features"""
+    if not BEHAVIOR_FEATURE_WINDOW:
+        return None
+    return WindowedFeatureStore([BEHAVIOR_FEATURE_WINDOW], recent_transactions=FEATURE_STORE_RECENT_TRANSACTIONS)
+
+
+def window_feature_columns(windows: Sequence[int]) -> List[str]:
+    return [f"{name}_{length}" for length in windows for name in BEHAVIORAL_FEATURES]
+
+
+def window_feature_frame(df, windows: Sequence[int] = BEHAVIOR_WINDOWS,
+                         bucket_width: int = BEHAVIOR_WINDOW_BUCKET_WIDTH):
+    """Batch mode: windowed features as of each transaction, aligned with df's index.
+
+    df needs the raw dataset columns (step, type, amount, nameOrig,
+    oldbalanceOrg, newbalanceOrig). Rows are replayed in step order; rows
+    with the same step keep their order in df.
+    """
+    import pandas as pd
+
+    ordered = df.sort_values("step", kind="stable")
+    transactions = [
+        {"nameOrig": row.nameOrig, "step": row.step, "amount": row.amount, "oldbalanceOrg": row.oldbalanceOrg,
+         "newbalanceOrig": row.newbalanceOrig, "transaction_type": row.type}
+        for row in ordered.itertuples()
+    ]
+    # Every account must stay resident for the replay
+    store = WindowedFeatureStore(windows, bucket_width, max_accounts=max(len(df), 1))
+    matrices = store.observe_batch(transactions)
+    frame = pd.DataFrame(np.hstack([matrices[length] for length in store.windows]),
+                         index=ordered.index, columns=window_feature_columns(store.windows))
+    return frame.loc[df.index]
+